@@ -1,5 +1,6 @@
 import os
 
+import pyarrow as pa
 import streamlit as st
 import requests
 
@@ -27,9 +28,18 @@ def main():
         if st.button("Fetch Stock Data"):
             if ticker:
                 try:
-                    response = requests.get(f"{FASTAPI_BASE_URL}/stock/{ticker}/all-rows/{query}")
+                    if query:
+                        response = requests.get(f"{FASTAPI_BASE_URL}/stock/{ticker}/all-rows/{query}")
+                    else:
+                        # Plain row listing: fetch it as a gzip-compressed Arrow stream
+                        response = requests.get(f"{FASTAPI_BASE_URL}/stock/{ticker}/all-rows",
+                                                headers={"Accept": "application/vnd.apache.arrow.stream",
+                                                         "Accept-Encoding": "gzip"})
                     if response.status_code == 200:
-                        data = response.json()
+                        if query:
+                            data = response.json()
+                        else:
+                            data = pa.ipc.open_stream(response.content).read_pandas()
                         st.write(f"Results for ticker: {ticker}")
                         st.dataframe(data)
                     else:
@@ -0,0 +1,115 @@
+import re
+
+import lxml.html
+
+# Text nodes that look like code rather than prose, as one precompiled alternation:
+# JS statements, inline objects, call-like parentheses, semicolons, '==' / '::' operators
+UNWANTED_TEXT = re.compile(
+    r"(?i:window\.|document\.|function\(|var\s|let\s|const\s)|\{.*?\}|\(.*?\)|;|[=:]{2,}"
+)
+NON_ALNUM = re.compile(r"[\W_]+")
+WHITESPACE = re.compile(r"\s+")
+
+# Subtrees that never hold article text
+BOILERPLATE_TAGS = {"script", "style", "noscript", "template", "nav", "header", "footer", "aside",
+                    "form", "button", "iframe", "svg", "select", "dialog"}
+# class/id hints for boilerplate containers, and for the article body
+BOILERPLATE_HINT = re.compile(
+    r"comment|footer|header|menu|(?:^|[-_ ])nav|sidebar|related|recommend|promo|(?:^|[-_ ])ads?(?:$|[-_ ])|"
+    r"share|social|subscribe|newsletter|ticker|consent|banner|breadcrumb|caption|disclaimer",
+    re.IGNORECASE,
+)
+CONTENT_HINT = re.compile(r"article|caas|body|content|story|main|post", re.IGNORECASE)
+# Paragraph-like elements that are scored
+PARAGRAPH_TAGS = {"p", "pre", "blockquote", "li", "h2", "h3"}
+
+# Paragraphs shorter than this don't count towards a container's score
+MIN_PARAGRAPH_LENGTH = 25
+# Siblings of the best container are kept if they score at least this share of it
+SIBLING_SCORE_RATIO = 0.2
+
+
+def is_unwanted(text):
+    """
+    Check if a text node is unwanted (e.g. JavaScript, inline JSON, or mostly symbols).
+
+    Parameters:
+    - text (str): A stripped text node.
+
+    Returns:
+    - bool: True if the node should be dropped.
+    """
+    if len(text) < 5 or UNWANTED_TEXT.search(text):
+        return True
+    return len(NON_ALNUM.sub("", text)) / len(text) < 0.5
+
+
+def _is_boilerplate(element):
+    if element.tag in BOILERPLATE_TAGS:
+        return True
+    hints = f"{element.get('class', '')} {element.get('id', '')} {element.get('role', '')}"
+    return bool(hints.strip()) and bool(BOILERPLATE_HINT.search(hints)) and not CONTENT_HINT.search(hints)
+
+
+def _paragraph_score(text):
+    # Longer, comma-rich paragraphs are prose; short ones are labels and links
+    return 1 + text.count(",") + min(len(text) / 100, 3)
+
+
+def extract_article(html):
+    """
+    Readability-style main-content extraction in a single walk of the lxml tree.
+
+    Boilerplate subtrees (navigation, scripts, comments, related links, ...) are skipped
+    without being descended into. Each paragraph adds a score to its parent and half to its
+    grandparent; the best-scoring container and its strong siblings are the article body.
+
+    Parameters:
+    - html (str | bytes): The page.
+
+    Returns:
+    - dict: {'text': article text ('' if no paragraphs), 'paragraphs': int, 'nodes': int
+      elements visited}.
+    """
+    root = lxml.html.fromstring(html)
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    paragraphs = []  # (parent, grandparent, text)
+    scores = {}
+    nodes = 0
+    stack = [body]
+    while stack:
+        element = stack.pop()
+        nodes += 1
+        if not isinstance(element.tag, str) or _is_boilerplate(element):
+            # Comments and processing instructions have non-string tags
+            continue
+        if element.tag in PARAGRAPH_TAGS:
+            text = WHITESPACE.sub(" ", element.text_content()).strip()
+            if len(text) >= MIN_PARAGRAPH_LENGTH:
+                parent = element.getparent()
+                grandparent = parent.getparent() if parent is not None else None
+                score = _paragraph_score(text)
+                scores[parent] = scores.get(parent, 0) + score
+                if grandparent is not None:
+                    scores[grandparent] = scores.get(grandparent, 0) + score / 2
+                paragraphs.append((parent, grandparent, text))
+            continue
+        # Reversed so paragraphs come off the stack in document order
+        stack.extend(reversed(element))
+
+    if not paragraphs:
+        return {"text": "", "paragraphs": 0, "nodes": nodes}
+
+    best = max(scores, key=scores.get)
+    selected = {best}
+    parent = best.getparent()
+    if parent is not None:
+        threshold = scores[best] * SIBLING_SCORE_RATIO
+        selected.update(sibling for sibling in parent if scores.get(sibling, 0) >= threshold)
+
+    kept = [text for parent, grandparent, text in paragraphs if parent in selected or grandparent in selected]
+    return {"text": " ".join(kept), "paragraphs": len(kept), "nodes": nodes}
+
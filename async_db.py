@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import aiomysql
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db_connector import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+from instrumentation import DB_POOL_WAIT_SECONDS, DB_QUERY_SECONDS, timed
+
+# Async MySQL pool bounds (the sync pool in db_connector is only used by scripts and migrations)
+ASYNC_MYSQL_POOL_MIN = int(os.getenv("ASYNC_MYSQL_POOL_MIN", "1"))
+ASYNC_MYSQL_POOL_SIZE = int(os.getenv("ASYNC_MYSQL_POOL_SIZE", "20"))
+# MongoDB connection and pool size for the news collection
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_POOL_SIZE = int(os.getenv("MONGO_POOL_SIZE", "50"))
+
+# Error type raised by the async MySQL driver
+MySQLError = aiomysql.MySQLError
+
+
+class PoolWaitStats:
+    """
+    Time spent waiting for a pooled connection: totals plus percentiles over recent samples.
+    """
+
+    def __init__(self, window=2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000 if ordered else 0.0
+
+        return {
+            "acquisitions": self.count,
+            "wait_ms_total": self.total * 1000,
+            "wait_ms_max": self.max * 1000,
+            "wait_ms_p50": percentile(0.50),
+            "wait_ms_p99": percentile(0.99),
+        }
+
+
+mysql_pool_wait = PoolWaitStats()
+
+_mysql_pool = None
+_mysql_pool_lock = asyncio.Lock()
+_mongo_client = None
+
+
+async def get_mysql_pool():
+    """Create the async MySQL pool on first use and return it."""
+    global _mysql_pool
+    if _mysql_pool is None:
+        async with _mysql_pool_lock:
+            if _mysql_pool is None:
+                _mysql_pool = await aiomysql.create_pool(
+                    host=MYSQL_HOST,
+                    user=MYSQL_USER,
+                    password=MYSQL_PASSWORD,
+                    db=MYSQL_DATABASE,
+                    minsize=ASYNC_MYSQL_POOL_MIN,
+                    maxsize=ASYNC_MYSQL_POOL_SIZE,
+                    autocommit=True,
+                )
+    return _mysql_pool
+
+
+@asynccontextmanager
+async def acquire():
+    """Borrow a connection from the async pool, recording how long the borrow waited."""
+    pool = await get_mysql_pool()
+    started = time.perf_counter()
+    connection = await pool.acquire()
+    waited = time.perf_counter() - started
+    mysql_pool_wait.observe(waited)
+    DB_POOL_WAIT_SECONDS.observe(waited)
+    try:
+        yield connection
+    finally:
+        pool.release(connection)
+
+
+async def fetch_one(query, params=()):
+    """Run a query and return the first row as a dict (or None)."""
+    async with acquire() as connection:
+        async with connection.cursor(aiomysql.DictCursor) as cursor:
+            with timed(DB_QUERY_SECONDS, "mysql.fetch_one", operation="fetch_one"):
+                await cursor.execute(query, params)
+                return await cursor.fetchone()
+
+
+async def fetch_all(query, params=()):
+    """Run a query and return all rows as dicts."""
+    async with acquire() as connection:
+        async with connection.cursor(aiomysql.DictCursor) as cursor:
+            with timed(DB_QUERY_SECONDS, "mysql.fetch_all", operation="fetch_all"):
+                await cursor.execute(query, params)
+                return await cursor.fetchall()
+
+
+async def fetch_rows(query, params=(), text=False):
+    """
+    Run a query and return plain row tuples, skipping the per-row dict building.
+
+    Parameters:
+    - text (bool): Leave every value as the text MySQL sent (None for NULL) instead of
+      building a Decimal or datetime per value; db_connector.rows_to_arrays parses the
+      columns in bulk.
+
+    Returns:
+    - tuple: (column names, list of row tuples).
+    """
+    async with acquire() as connection:
+        decoders = connection.decoders
+        if text:
+            # Read by the result parser for each query; restored before the connection is released
+            connection.decoders = {}
+        try:
+            async with connection.cursor() as cursor:
+                with timed(DB_QUERY_SECONDS, "mysql.fetch_rows", operation="fetch_rows"):
+                    await cursor.execute(query, params)
+                    return [column[0] for column in cursor.description], await cursor.fetchall()
+        finally:
+            connection.decoders = decoders
+
+
+async def iter_chunks(query, params=(), chunk_size=10000):
+    """
+    Run a query on a server-side (unbuffered) cursor and yield the rows in chunks.
+
+    Only one chunk is held in memory at a time, however large the result. The pooled
+    connection stays borrowed until the generator is exhausted or closed.
+
+    Yields:
+    - tuple: (column names, list of row tuples).
+    """
+    async with acquire() as connection:
+        cursor = await connection.cursor(aiomysql.SSCursor)
+        finished = False
+        try:
+            await cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield columns, rows
+            finished = True
+        finally:
+            if finished:
+                await cursor.close()
+            else:
+                # The client went away mid-stream: drop the connection instead of reading the
+                # rest of the result just to make it reusable
+                connection.close()
+
+
+async def get_ticker_versions():
+    """Async counterpart of db_connector.get_ticker_versions."""
+    rows = await fetch_all("SELECT ticker, last_write FROM ticker_writes")
+    return {row["ticker"]: row["last_write"] for row in rows}
+
+
+def get_news_collection():
+    """The Mongo news collection on a shared async client."""
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=MONGO_POOL_SIZE)
+    return _mongo_client.get_database()["news"]
+
+
+def pool_stats():
+    """Current pool sizes and wait-time statistics."""
+    stats = {"mysql": {"maxsize": ASYNC_MYSQL_POOL_SIZE, **mysql_pool_wait.snapshot()}}
+    if _mysql_pool is not None:
+        stats["mysql"].update(size=_mysql_pool.size, free=_mysql_pool.freesize)
+    stats["mongo"] = {"max_pool_size": MONGO_POOL_SIZE}
+    return stats
+
+
+async def close():
+    """Close the async pools (application shutdown)."""
+    global _mysql_pool, _mongo_client
+    if _mysql_pool is not None:
+        _mysql_pool.close()
+        await _mysql_pool.wait_closed()
+        _mysql_pool = None
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
@@ -0,0 +1,184 @@
+import asyncio
+import os
+
+import numpy as np
+
+import async_db
+from db_connector import rows_to_arrays
+from parquet_store import read_price_row, read_stock_table
+from stock_queries import (READ_BACKEND, _window_bounds, build_batch_closing_query, build_batch_ohlc_query,
+                           build_batch_stats_closing_query)
+
+# Most tickers one batch request may name
+BATCH_TICKERS_MAX = int(os.getenv("BATCH_TICKERS_MAX", "500"))
+# Most bars one /stocks/ohlc response may hold; narrow the window beyond that
+BATCH_ROWS_MAX = int(os.getenv("BATCH_ROWS_MAX", "1000000"))
+
+OHLC_COLUMNS = ["open_price", "high_price", "low_price", "close_price", "volume"]
+
+
+class TooManyRows(Exception):
+    """The batch would return more than BATCH_ROWS_MAX bars."""
+
+
+def parse_tickers(tickers):
+    """
+    Split a comma-separated ?tickers= value into unique symbols (order kept).
+
+    Symbols keep the requested casing, which Parquet partitions match exactly; duplicates
+    differing only in case are dropped, since MySQL compares tickers case-insensitively.
+
+    Raises:
+    - ValueError: If no ticker is given or more than BATCH_TICKERS_MAX are.
+    """
+    symbols = {}
+    for t in tickers.split(","):
+        if t.strip():
+            symbols.setdefault(t.strip().upper(), t.strip())
+    symbols = list(symbols.values())
+    if not symbols:
+        raise ValueError("Give at least one ticker, e.g. ?tickers=AAPL,MSFT")
+    if len(symbols) > BATCH_TICKERS_MAX:
+        raise ValueError(f"At most {BATCH_TICKERS_MAX} tickers per request")
+    return symbols
+
+
+def json_floats(array, integer=False):
+    """float64 array -> list for JSON, NaN (NULL) as None; `integer` for volumes."""
+    missing = np.isnan(array)
+    values = (np.where(missing, 0, array).astype(np.int64) if integer else array).tolist()
+    if missing.any():
+        values = [None if gap else v for v, gap in zip(values, missing.tolist())]
+    return values
+
+
+def json_timestamps(array):
+    return np.datetime_as_string(array, unit="s").tolist()
+
+
+def as_requested(names, tickers):
+    """
+    Spell result tickers the way they were requested.
+
+    MySQL matches tickers case-insensitively, so rows may carry the stored casing
+    (e.g. 'AAPL' for a request for 'aapl').
+
+    Returns:
+    - list: The names, each replaced by the requested ticker it matches.
+    """
+    requested = {t.upper(): t for t in tickers}
+    return [requested.get(name.upper(), name) for name in names]
+
+
+def group_by_ticker(arrays):
+    """
+    Split ticker-ordered columns into per-ticker columns with one pass over the ticker array.
+
+    Returns:
+    - dict: ticker -> {column: array}.
+    """
+    tickers = arrays["ticker"]
+    if not len(tickers):
+        return {}
+    boundaries = np.flatnonzero(tickers[1:] != tickers[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(tickers)]))
+    return {
+        tickers[start]: {name: array[start:end] for name, array in arrays.items() if name != "ticker"}
+        for start, end in zip(starts, ends)
+    }
+
+
+async def batch_closing_prices(tickers, start=None, end=None):
+    """
+    Latest close of every ticker (within an optional window) in one round-trip.
+
+    Without a window the answers come from ticker_stats; tickers without stats yet are
+    resolved with the windowed query's latest-row join.
+
+    Returns:
+    - dict: Columnar {'ticker': [...], 'timestamp': [...], 'close_price': [...], 'missing': [...]}.
+    """
+    if READ_BACKEND == "parquet":
+        arrays = await asyncio.to_thread(_parquet_closing_prices, tickers, start, end)
+    else:
+        arrays = None
+        if start is None and end is None:
+            arrays = rows_to_arrays(*await async_db.fetch_rows(*build_batch_stats_closing_query(tickers), text=True))
+            arrays["ticker"] = np.array(as_requested(arrays["ticker"].tolist(), tickers), dtype=object)
+            found = set(arrays["ticker"].tolist())
+            pending = [t for t in tickers if t not in found]
+        else:
+            pending = tickers
+        if pending:
+            more = rows_to_arrays(*await async_db.fetch_rows(*build_batch_closing_query(pending, start, end), text=True))
+            more["ticker"] = np.array(as_requested(more["ticker"].tolist(), tickers), dtype=object)
+            arrays = more if arrays is None else {name: np.concatenate((arrays[name], more[name])) for name in more}
+
+    # Answer in the order the tickers were asked for
+    position = {ticker: i for i, ticker in enumerate(tickers)}
+    order = np.argsort([position[t] for t in arrays["ticker"].tolist()], kind="stable")
+    found = set(arrays["ticker"].tolist())
+    return {
+        "ticker": arrays["ticker"][order].tolist(),
+        "timestamp": json_timestamps(arrays["timestamp"][order]),
+        "close_price": json_floats(arrays["close_price"][order]),
+        "missing": [t for t in tickers if t not in found],
+    }
+
+
+def _parquet_closing_prices(tickers, start, end):
+    rows = []
+    for ticker in tickers:
+        row = read_price_row("closing", ticker, *_window_bounds(start, end))
+        if row is not None:
+            rows.append((ticker, row["timestamp"], row["close_price"]))
+    return rows_to_arrays(["ticker", "timestamp", "close_price"], rows)
+
+
+async def batch_ohlc(tickers, start=None, end=None):
+    """
+    Bars of every ticker (within an optional window) in one round-trip, grouped per ticker.
+
+    Returns:
+    - dict: {'tickers': {ticker: {'timestamp': [...], 'open_price': [...], ...}}, 'missing': [...]}.
+
+    Raises:
+    - TooManyRows: If the result would exceed BATCH_ROWS_MAX bars.
+    """
+    if READ_BACKEND == "parquet":
+        grouped = await asyncio.to_thread(_parquet_ohlc, tickers, start, end)
+    else:
+        # One row past the cap tells a full answer from a truncated one
+        columns, rows = await async_db.fetch_rows(*build_batch_ohlc_query(tickers, start, end, BATCH_ROWS_MAX + 1),
+                                                  text=True)
+        if len(rows) > BATCH_ROWS_MAX:
+            raise TooManyRows(f"More than {BATCH_ROWS_MAX} bars; narrow the start/end window")
+        grouped = group_by_ticker(rows_to_arrays(columns, rows))
+        grouped = dict(zip(as_requested(grouped, tickers), grouped.values()))
+
+    return {
+        "tickers": {
+            ticker: {"timestamp": json_timestamps(grouped[ticker]["timestamp"]),
+                     **{name: json_floats(grouped[ticker][name], name == "volume") for name in OHLC_COLUMNS}}
+            for ticker in tickers if ticker in grouped
+        },
+        "missing": [t for t in tickers if t not in grouped],
+    }
+
+
+def _parquet_ohlc(tickers, start, end):
+    grouped = {}
+    total = 0
+    start, end = _window_bounds(start, end)
+    for ticker in tickers:
+        table = read_stock_table(ticker, ["timestamp", *OHLC_COLUMNS], start, end)
+        if table.num_rows == 0:
+            continue
+        total += table.num_rows
+        if total > BATCH_ROWS_MAX:
+            raise TooManyRows(f"More than {BATCH_ROWS_MAX} bars; narrow the start/end window")
+        grouped[ticker] = {"timestamp": table["timestamp"].to_numpy().astype("datetime64[s]"),
+                           **{name: table[name].to_numpy(zero_copy_only=False).astype(np.float64)
+                              for name in OHLC_COLUMNS}}
+    return grouped
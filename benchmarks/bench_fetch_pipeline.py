@@ -0,0 +1,148 @@
+"""
+Wall-clock benchmark for the concurrent fetch pipeline against a fake yfinance provider.
+
+Runs the old sequential fetch-then-write loop and fetch_pipeline.run_fetch_pipeline with
+the same injected network latency and write latency, fully offline.
+
+Before timing anything it checks the pipeline's behaviour against the fake provider (and
+exits with an AssertionError if one fails): retries with backoff recover from failures or
+give up, tickers that fail to download or to write are reported in summary["failed"],
+writer batches never exceed batch_size, and the per-host rate limit holds.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_fetch_pipeline
+
+Environment:
+- BENCH_TICKERS: number of tickers (default 500).
+- BENCH_FETCH_LATENCY: seconds per fake history() call (default 0.2).
+- BENCH_WRITE_LATENCY: seconds per fake write call (default 0.02).
+- BENCH_FAILURE_RATE: probability that a fake call fails and is retried (default 0.02).
+- FETCH_WORKERS / FETCH_RATE_LIMIT / FETCH_WRITE_BATCH: pipeline settings, as in production.
+"""
+import contextlib
+import io
+import os
+import random
+import time
+
+from benchmarks.fakes import FakeHistoryProvider
+from fetch_pipeline import (FETCH_RATE_LIMIT, FETCH_WORKERS, FETCH_WRITE_BATCH,
+                            run_fetch_pipeline)
+
+BENCH_TICKERS = int(os.getenv("BENCH_TICKERS", "500"))
+BENCH_FETCH_LATENCY = float(os.getenv("BENCH_FETCH_LATENCY", "0.2"))
+BENCH_WRITE_LATENCY = float(os.getenv("BENCH_WRITE_LATENCY", "0.02"))
+BENCH_FAILURE_RATE = float(os.getenv("BENCH_FAILURE_RATE", "0.02"))
+
+
+def fake_writer(batch):
+    """Stands in for save_frames_to_mysql: one round-trip per batch."""
+    time.sleep(BENCH_WRITE_LATENCY)
+
+
+def sequential(tickers, provider):
+    """The original fetch_stock_data loop: fetch, then write, one ticker at a time."""
+    for ticker in tickers:
+        data = provider.history(ticker, period="1mo")
+        fake_writer([(ticker, data)])
+
+
+def _run_quietly(*args, **kwargs):
+    # The pipeline prints every retry; keep the check output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_fetch_pipeline(*args, **kwargs)
+
+
+def check_retries():
+    """Failures are retried with backoff until they succeed, or the ticker is given up on."""
+    tickers = [f"R{i:03d}" for i in range(50)]
+    jobs = [(ticker, {"period": "1mo"}) for ticker in tickers]
+
+    # Half of all calls fail; 20 retries make giving up on a ticker a 1-in-2-million event
+    random.seed(0)
+    provider = FakeHistoryProvider(0, failure_rate=0.5)
+    summary = _run_quietly(jobs, lambda batch: None, provider=provider, rate_limit=0,
+                           max_retries=20, backoff=0.001)
+    assert summary["failed"] == [], summary
+    assert summary["fetched"] == summary["written"] == len(tickers), summary
+    assert provider.calls > len(tickers), "no call failed, so nothing was retried"
+
+    # Every call fails: each ticker gets max_retries + 1 attempts, with backoff in between
+    provider = FakeHistoryProvider(0, failure_rate=1.0)
+    max_retries, backoff = 3, 0.01
+    started = time.perf_counter()
+    summary = _run_quietly(jobs[:2], lambda batch: None, provider=provider, workers=1, rate_limit=0,
+                           max_retries=max_retries, backoff=backoff)
+    elapsed = time.perf_counter() - started
+    assert sorted(summary["failed"]) == tickers[:2], summary
+    assert summary["fetched"] == summary["written"] == 0, summary
+    assert provider.calls == 2 * (max_retries + 1), provider.calls
+    # Delays are backoff * 2**attempt with jitter in [0.5, 1.5)
+    min_backoff = 2 * sum(backoff * 2 ** attempt * 0.5 for attempt in range(max_retries))
+    assert elapsed >= min_backoff, f"{elapsed:.3f} s of retries, expected at least {min_backoff:.3f} s"
+
+
+def check_write_failures():
+    """A batch whose write raises is reported as failed, not as written."""
+    tickers = [f"W{i:03d}" for i in range(40)]
+
+    def writer(batch):
+        if any(ticker == "W007" for ticker, _ in batch):
+            raise ConnectionError("injected write failure")
+
+    summary = _run_quietly([(ticker, {"period": "1mo"}) for ticker in tickers], writer,
+                           provider=FakeHistoryProvider(0), rate_limit=0, batch_size=5)
+    assert "W007" in summary["failed"], summary
+    assert 1 <= len(summary["failed"]) <= 5, summary
+    assert summary["written"] + len(summary["failed"]) == len(tickers), summary
+
+
+def check_batches():
+    """The writer gets every fetched frame, in batches of at most batch_size."""
+    tickers = [f"B{i:03d}" for i in range(103)]
+    sizes = []
+    summary = _run_quietly([(ticker, {"period": "1mo"}) for ticker in tickers],
+                           lambda batch: sizes.append(len(batch)),
+                           provider=FakeHistoryProvider(0.001), rate_limit=0, batch_size=10)
+    assert sizes and max(sizes) <= 10, sizes
+    assert sum(sizes) == summary["written"] == len(tickers), (sizes, summary)
+
+
+def check_rate_limit():
+    """Requests to one host never outpace the token bucket: `burst` at once, then `rate` per second."""
+    rate, tickers = 200, [f"L{i:03d}" for i in range(300)]
+    started = time.perf_counter()
+    summary = _run_quietly([(ticker, {"period": "1mo"}) for ticker in tickers], lambda batch: None,
+                           provider=FakeHistoryProvider(0), workers=16, rate_limit=rate)
+    elapsed = time.perf_counter() - started
+    assert summary["fetched"] == len(tickers), summary
+    # RateLimiter's burst defaults to one second's worth of requests
+    minimum = (len(tickers) - rate) / rate
+    assert elapsed >= minimum, f"{len(tickers)} requests took {elapsed:.3f} s, expected at least {minimum:.3f} s"
+
+
+def main():
+    for check in (check_retries, check_write_failures, check_batches, check_rate_limit):
+        check()
+        print(f"{check.__name__}: ok")
+
+    tickers = [f"T{i:04d}" for i in range(BENCH_TICKERS)]
+
+    started = time.perf_counter()
+    sequential(tickers, FakeHistoryProvider(BENCH_FETCH_LATENCY))
+    sequential_s = time.perf_counter() - started
+    print(f"sequential: {sequential_s:8.2f} s ({len(tickers) / sequential_s:7.1f} tickers/s)")
+
+    provider = FakeHistoryProvider(BENCH_FETCH_LATENCY, failure_rate=BENCH_FAILURE_RATE)
+    started = time.perf_counter()
+    summary = run_fetch_pipeline([(ticker, {"period": "1mo"}) for ticker in tickers], fake_writer,
+                                 provider=provider, backoff=0.05)
+    pipeline_s = time.perf_counter() - started
+    print(f"pipeline:   {pipeline_s:8.2f} s ({len(tickers) / pipeline_s:7.1f} tickers/s) "
+          f"workers={FETCH_WORKERS} rate={FETCH_RATE_LIMIT}/s batch={FETCH_WRITE_BATCH} "
+          f"calls={provider.calls} failed={len(summary['failed'])}")
+    print(f"speed-up: {sequential_s / pipeline_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Cost of /stock/{ticker}/ohlc indicators: a full build from the stored rows vs extending the
+cached series when a few new bars arrive (indicators.IndicatorSeries).
+
+Runs offline on benchmarks.fakes.synthetic_history; the rows are decoded as the MySQL path
+does, from the text values async_db.fetch_rows(text=True) returns.
+
+Before timing anything it checks indicators.IndicatorCache against an in-memory store (and
+exits with an AssertionError if one fails): a tail append extends the cached series, while
+a backfill before its newest bar, or several writes since it was read, rebuild it, and the
+result always matches a series built from scratch.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_indicators
+
+Environment:
+- BENCH_ROWS: stored hourly bars (default 1,000,000).
+- BENCH_NEW_ROWS: bars added per extend (default 24).
+- BENCH_INDICATORS: indicator list (default 'sma20,ema50,rsi14,atr14,vol20').
+"""
+import asyncio
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fakes import synthetic_history
+from db_connector import rows_to_arrays
+from indicators import BAR_COLUMNS, INTERVALS, IndicatorCache, IndicatorSeries, parse_indicators
+
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", "1000000"))
+BENCH_NEW_ROWS = int(os.getenv("BENCH_NEW_ROWS", "24"))
+BENCH_INDICATORS = os.getenv("BENCH_INDICATORS", "sma20,ema50,rsi14,atr14,vol20")
+
+COLUMNS = ["timestamp", "open_price", "high_price", "low_price", "close_price", "volume"]
+
+
+def stored_rows(count):
+    """Rows as fetch_rows(text=True) returns them: every value the text MySQL sends."""
+    history = synthetic_history(count)
+    timestamps = history.index.tz_localize(None).strftime("%Y-%m-%d %H:%M:%S")
+    prices = [history[c].map("{:.2f}".format) for c in ("Open", "High", "Low", "Close")]
+    return list(zip(timestamps, *prices, history["Volume"].astype(str)))
+
+
+def frame(rows):
+    return pd.DataFrame(rows_to_arrays(COLUMNS, rows)).set_index("timestamp")
+
+
+class MemoryStore:
+    """Daily bars of one ticker with ticker_writes-style marks, standing in for MySQL."""
+
+    def __init__(self):
+        history = synthetic_history(80, freq="D")
+        history.index = history.index.tz_localize(None)
+        self.bars = history.rename(columns={"Open": "open_price", "High": "high_price", "Low": "low_price",
+                                            "Close": "close_price", "Volume": "volume"}).astype(np.float64)
+        self.stored = self.bars.iloc[:0]
+        self.write_count = 0
+        self.min_written = None
+
+    def write(self, positions):
+        written = self.bars.iloc[positions]
+        self.stored = pd.concat([self.stored[~self.stored.index.isin(written.index)], written]).sort_index()
+        self.write_count += 1
+        self.min_written = written.index.min().to_pydatetime()
+        return str(self.write_count)
+
+    async def loader(self, ticker, since=None):
+        return self.stored if since is None else self.stored[self.stored.index >= since]
+
+    async def writes(self, ticker):
+        return self.write_count, self.min_written
+
+
+def _same_as_fresh_build(series, store, indicators):
+    fresh = IndicatorSeries(series.rule)
+    fresh.extend(store.stored)
+    fresh.ensure(indicators)
+    assert np.array_equal(series.timestamps, fresh.timestamps), (len(series.timestamps), len(fresh.timestamps))
+    for _, kind, period in indicators:
+        assert np.allclose(series.columns[kind, period][""], fresh.columns[kind, period][""], equal_nan=True), kind
+
+
+def check_cache_writes():
+    """Tail appends extend the cached series; backfills and missed writes rebuild it."""
+    indicators = parse_indicators(BENCH_INDICATORS)
+    store = MemoryStore()
+    cache = IndicatorCache(loader=store.loader, writes=store.writes)
+
+    async def get(version):
+        return await cache.get("BENCH", "raw", indicators, version)
+
+    # 50 bars with a 10-day gap, then the backfill of that gap
+    version = store.write(list(range(0, 20)) + list(range(30, 60)))
+    assert len(asyncio.run(get(version)).timestamps) == 50
+    version = store.write(list(range(20, 30)))
+    series = asyncio.run(get(version))
+    assert len(series.timestamps) == 60, len(series.timestamps)
+    assert cache.counters["rebuilds"] == 1, cache.counters
+    _same_as_fresh_build(series, store, indicators)
+
+    # An incremental fetch: re-reads the newest bar and adds the ones after it
+    version = store.write(list(range(59, 65)))
+    series = asyncio.run(get(version))
+    assert len(series.timestamps) == 65 and cache.counters["extends"] == 1, cache.counters
+    _same_as_fresh_build(series, store, indicators)
+
+    # Two writes between requests: only the last one's range is known, so rebuild
+    store.write(list(range(10, 15)))
+    version = store.write(list(range(64, 70)))
+    series = asyncio.run(get(version))
+    assert len(series.timestamps) == 70 and cache.counters["rebuilds"] == 2, cache.counters
+    _same_as_fresh_build(series, store, indicators)
+
+
+def main():
+    check_cache_writes()
+    print("check_cache_writes: ok")
+
+    indicators = parse_indicators(BENCH_INDICATORS)
+    rows = stored_rows(BENCH_ROWS + BENCH_NEW_ROWS)
+    old, new = rows[:BENCH_ROWS], rows[BENCH_ROWS:]
+    print(f"{BENCH_ROWS:,} bars, indicators {BENCH_INDICATORS}")
+
+    for interval in ("raw", "1d", "1w"):
+        started = time.perf_counter()
+        prices = frame(old)
+        decode_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        series = IndicatorSeries(INTERVALS[interval])
+        series.extend(prices)
+        series.ensure(indicators)
+        build_s = time.perf_counter() - started
+
+        # What the cache reads back on a new version: rows from the newest bar on
+        since = f"{series.last_bar_from:%Y-%m-%d %H:%M:%S}"
+        tail = [row for row in old if row[0] >= since] + new
+        started = time.perf_counter()
+        series.extend(frame(tail))
+        extend_s = time.perf_counter() - started
+
+        print(f"  {interval:>4}: {len(series.timestamps):>9,} bars  decode {decode_s * 1000:8.1f} ms  "
+              f"full build {build_s * 1000:8.1f} ms  extend {extend_s * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: AI-relevance filtering of scraped articles, per-keyword substring scans vs
+the compiled keyword_matcher regex.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_keyword_matcher
+
+Environment:
+- BENCH_ARTICLES: corpus size (default 10000).
+- BENCH_ARTICLE_WORDS: words per article (default 600).
+- BENCH_EXTRA_KEYWORDS: synthetic terms added to the real list for the large-list run
+  (default 300).
+"""
+import os
+import time
+
+from benchmarks.fakes import news_corpus
+from keyword_matcher import KeywordMatcher, load_keywords
+
+BENCH_ARTICLES = int(os.getenv("BENCH_ARTICLES", "10000"))
+BENCH_ARTICLE_WORDS = int(os.getenv("BENCH_ARTICLE_WORDS", "600"))
+BENCH_EXTRA_KEYWORDS = int(os.getenv("BENCH_EXTRA_KEYWORDS", "300"))
+
+EXTRA_FIRST = ("transformer diffusion agentic inference foundation multimodal reinforcement vector "
+               "embedding copilot autonomous predictive cognitive synthetic conversational robotic "
+               "speech vision federated quantized").split()
+EXTRA_SECOND = "model models chip platform system agent stack engine pipeline network tooling startup accelerator assistant workload".split()
+
+
+def legacy_is_ai_related(content, keywords):
+    """The original filter: lowercase the text, then one substring scan per keyword."""
+    content = content.lower()
+    for keyword in keywords:
+        if keyword in content:
+            return True
+    return False
+
+
+def run(label, keywords, corpus):
+    started = time.perf_counter()
+    legacy = sum(legacy_is_ai_related(text, keywords) for text in corpus)
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    build_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    scores = [matcher.score(text) for text in corpus]
+    matcher_s = time.perf_counter() - started
+    matched = sum(1 for score in scores if score["hits"])
+
+    print(f"{label}: {len(keywords)} keywords, {len(corpus)} articles")
+    print(f"  substring scans: {legacy_s:7.2f} s ({len(corpus) / legacy_s:9.0f} articles/s) "
+          f"{legacy} AI-related (boolean only)")
+    print(f"  keyword_matcher: {matcher_s:7.2f} s ({len(corpus) / matcher_s:9.0f} articles/s) "
+          f"{matched} AI-related, with hit counts and scores; regex built in {build_ms:.1f} ms")
+
+
+def main():
+    keywords = load_keywords()
+    # Plausible two-word terms that never occur in the corpus, so every one is scanned in full
+    extra = [f"{first} {second}" for first in EXTRA_FIRST for second in EXTRA_SECOND][:BENCH_EXTRA_KEYWORDS]
+    # Include words containing 'llm' to show the substring false positives
+    corpus = news_corpus(BENCH_ARTICLES, BENCH_ARTICLE_WORDS, keywords=keywords + ["skillmap", "fullmoon"])
+
+    run("configured list", keywords, corpus)
+    run("large list", keywords + extra, corpus)
+
+
+if __name__ == "__main__":
+    main()
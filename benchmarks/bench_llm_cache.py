@@ -0,0 +1,61 @@
+"""
+Model calls and latency for a burst of identical questions: one model call per request (as
+before) vs llm_cache's cached, coalesced calls.
+
+Runs offline against fakes.StubGenerativeModel; the questions differ only in case,
+spacing and punctuation, as typed by different users.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_llm_cache
+
+Environment:
+- BENCH_BURST: concurrent identical requests (default 50).
+- BENCH_MODEL_LATENCY: stub model seconds per call (default 2).
+- LLM_CACHE_SQLITE: also exercise the SQLite tier (path to a scratch file).
+"""
+import asyncio
+import os
+import time
+
+from benchmarks.fakes import StubGenerativeModel
+from llm_cache import create_llm_cache, llm_cache_key
+
+BENCH_BURST = int(os.getenv("BENCH_BURST", "50"))
+BENCH_MODEL_LATENCY = float(os.getenv("BENCH_MODEL_LATENCY", "2"))
+
+QUESTIONS = ["What is the trend this year?", "what is the trend this year", "What is the  trend this year ?!"]
+
+
+async def burst(ask):
+    started = time.perf_counter()
+    await asyncio.gather(*(ask(QUESTIONS[i % len(QUESTIONS)]) for i in range(BENCH_BURST)))
+    return time.perf_counter() - started
+
+
+async def main():
+    model = StubGenerativeModel(base_latency=BENCH_MODEL_LATENCY, latency_per_1k_tokens=0)
+
+    async def uncached(query):
+        response = await model.generate_content_async(f"query : {query}")
+        return {"response": response.text}
+
+    seconds = await burst(uncached)
+    print(f"no cache:     {seconds:6.2f} s  {len(model.prompt_tokens)} model calls for {BENCH_BURST} requests")
+
+    cache = create_llm_cache()
+
+    async def cached(query):
+        return await cache.get_or_generate(llm_cache_key("all-rows", "BENCH", query, "v1"), lambda: uncached(query))
+
+    calls = len(model.prompt_tokens)
+    seconds = await burst(cached)
+    print(f"cold burst:   {seconds:6.2f} s  {len(model.prompt_tokens) - calls} model calls, "
+          f"{cache.counters['coalesced']} coalesced")
+    calls = len(model.prompt_tokens)
+    seconds = await burst(cached)
+    print(f"warm burst:   {seconds:6.2f} s  {len(model.prompt_tokens) - calls} model calls")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
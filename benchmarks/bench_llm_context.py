@@ -0,0 +1,131 @@
+"""
+Prompt size and answer latency for the Gemini query endpoints: every row / article in the
+prompt (as before) vs the token-budgeted context from llm_context.
+
+Runs offline: prices and news are synthetic, and the model is fakes.StubGenerativeModel,
+whose latency grows with the prompt's token count.
+
+Before timing anything it checks the context builders (and exits with an AssertionError if
+one fails): the contexts stay within their token budget, price rollups coarsen from daily
+to weekly to monthly as the history grows, and the context token count the endpoints report
+matches the prompt the stub model receives.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_llm_context
+
+Environment:
+- BENCH_HISTORY_ROWS: hourly bars in the price history (default 20000).
+- BENCH_NEWS_ARTICLES: stored articles for the ticker (default 2000).
+- BENCH_MODEL_LATENCY_PER_1K: stub model seconds per 1,000 prompt tokens (default 0.02).
+- LLM_CONTEXT_TOKENS / LLM_NEWS_TOP_K: context budget, as in production.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fakes import StubGenerativeModel, news_corpus, synthetic_history
+from llm_context import (LLM_CONTEXT_TOKENS, ROLLUPS, build_prompt, count_tokens, news_context,
+                         price_context)
+
+BENCH_HISTORY_ROWS = int(os.getenv("BENCH_HISTORY_ROWS", "20000"))
+BENCH_NEWS_ARTICLES = int(os.getenv("BENCH_NEWS_ARTICLES", "2000"))
+BENCH_MODEL_LATENCY_PER_1K = float(os.getenv("BENCH_MODEL_LATENCY_PER_1K", "0.02"))
+
+QUERY = "What did the company say about generative AI demand?"
+
+
+def stock_rows(rows):
+    """Rows shaped like query_stock_data's result."""
+    history = synthetic_history(rows, start="2020-01-01").round(2)
+    df = history.reset_index().rename(columns={"Date": "timestamp", "Open": "open_price", "High": "high_price",
+                                               "Low": "low_price", "Close": "close_price"})
+    df["timestamp"] = df["timestamp"].dt.tz_localize(None)
+    df.insert(0, "ticker", "BENCH")
+    df.insert(0, "id", range(1, rows + 1))
+    return df.drop(columns=["Volume"])
+
+
+def news_articles(count):
+    """Stored-article dicts, newest first."""
+    texts = news_corpus(count, keywords=["generative ai", "machine learning", "data center"], seed=1)
+    now = datetime(2024, 12, 1)
+    return [{"content": text, "published_at": now - timedelta(hours=i)} for i, text in enumerate(texts)]
+
+
+async def answer(model, prompt):
+    started = time.perf_counter()
+    try:
+        await model.generate_content_async(prompt)
+        return f"{time.perf_counter() - started:6.2f} s"
+    except ValueError:
+        return "context overflow"
+
+
+def report(name, build, model, prompt):
+    tokens = count_tokens(prompt)
+    outcome = asyncio.run(answer(model, prompt))
+    print(f"  {name:10s} build {build * 1000:8.1f} ms  prompt {tokens:>10,} tokens  answer {outcome}")
+
+
+def check_budget():
+    """Price and news contexts never exceed the budget, however much history there is."""
+    for budget in (500, 2000, 8000):
+        for rows in (10, 2_000, 50_000):
+            context = price_context(stock_rows(rows), "BENCH", budget=budget)
+            assert context["tokens"] <= budget, (budget, rows, context["tokens"])
+            assert context["tokens"] == count_tokens(context["text"]), context["tokens"]
+        for count in (1, 50, 1_000):
+            context = news_context(QUERY, news_articles(count), budget=budget)
+            assert context["tokens"] <= budget, (budget, count, context["tokens"])
+
+
+def check_granularity():
+    """With a fixed budget, a longer history is rolled up to coarser bars, never finer ones."""
+    order = [name for name, _, _ in ROLLUPS]
+    levels = [price_context(stock_rows(days * 24), "BENCH", budget=2000)["granularity"]
+              for days in (30, 60, 120, 250, 400, 1000)]
+    ranks = [order.index(level) for level in levels]
+    assert ranks == sorted(ranks), levels
+    assert {"daily", "weekly", "monthly"} <= set(levels), levels
+
+
+def check_reported_tokens():
+    """The context_tokens an endpoint reports is what the context adds to the prompt the model gets."""
+    model = StubGenerativeModel(base_latency=0, latency_per_1k_tokens=0)
+    overhead = count_tokens(build_prompt(QUERY, ""))
+    for context in (price_context(stock_rows(5_000), "BENCH"), news_context(QUERY, news_articles(200))):
+        asyncio.run(model.generate_content_async(build_prompt(QUERY, context["text"])))
+        assert model.prompt_tokens[-1] == overhead + context["tokens"], (model.prompt_tokens[-1], context["tokens"])
+
+
+def main():
+    for check in (check_budget, check_granularity, check_reported_tokens):
+        check()
+        print(f"{check.__name__}: ok")
+
+    model = StubGenerativeModel(latency_per_1k_tokens=BENCH_MODEL_LATENCY_PER_1K)
+
+    df = stock_rows(BENCH_HISTORY_ROWS)
+    print(f"/all-rows/{{query}}: {len(df)} rows, budget {LLM_CONTEXT_TOKENS} tokens")
+    started = time.perf_counter()
+    prompt = build_prompt(QUERY, df.to_dict(orient="records"))
+    report("all rows", time.perf_counter() - started, model, prompt)
+    started = time.perf_counter()
+    context = price_context(df, "BENCH")
+    report("budgeted", time.perf_counter() - started, model, build_prompt(QUERY, context["text"]))
+    print(f"  {context['granularity']} bars: {context['rows']}")
+
+    news = news_articles(BENCH_NEWS_ARTICLES)
+    print(f"/ai-news/{{query}}: {len(news)} articles")
+    started = time.perf_counter()
+    prompt = build_prompt(QUERY, [{"content": a["content"], "ticker": "BENCH"} for a in news])
+    report("all news", time.perf_counter() - started, model, prompt)
+    started = time.perf_counter()
+    context = news_context(QUERY, news)
+    report("top-k", time.perf_counter() - started, model, build_prompt(QUERY, context["text"]))
+    print(f"  chunks: {context['chunks']}")
+
+
+if __name__ == "__main__":
+    main()
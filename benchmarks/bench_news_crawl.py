@@ -0,0 +1,84 @@
+"""
+Articles per minute for the news crawl: one Scrapy process per ticker vs one crawl per run.
+
+Both variants use the real spider and crawl_articles, pointed at a local stub server that
+stands in for Splash (see fakes.FakeSplashServer), fully offline.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_news_crawl
+
+Environment:
+- BENCH_NEWS_TICKERS: number of tickers (default 5).
+- BENCH_NEWS_PER_TICKER: news items per ticker, as returned by yfinance (default 10).
+- BENCH_NEWS_SHARED: share of a ticker's items also listed under the next ticker (default 0.3).
+- BENCH_TICKER_DELAY: pause between tickers in the old loop (default 5, as in production).
+- BENCH_SPLASH_LATENCY: stub render time per page in seconds (default 0.2).
+- NEWS_CONCURRENT_REQUESTS / NEWS_AUTOTHROTTLE_TARGET: crawl settings, as in production.
+"""
+import os
+import time
+
+from benchmarks.fakes import FakeSplashServer
+
+BENCH_NEWS_TICKERS = int(os.getenv("BENCH_NEWS_TICKERS", "5"))
+BENCH_NEWS_PER_TICKER = int(os.getenv("BENCH_NEWS_PER_TICKER", "10"))
+BENCH_NEWS_SHARED = float(os.getenv("BENCH_NEWS_SHARED", "0.3"))
+BENCH_TICKER_DELAY = float(os.getenv("BENCH_TICKER_DELAY", "5"))
+BENCH_SPLASH_LATENCY = float(os.getenv("BENCH_SPLASH_LATENCY", "0.2"))
+
+# Scrapy's defaults, which the per-ticker crawls ran with
+LEGACY_SETTINGS = {
+    "CONCURRENT_REQUESTS": 16,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+    "AUTOTHROTTLE_ENABLED": False,
+    "DOWNLOAD_TIMEOUT": 180,
+    # Every page went through Splash
+    "NEWS_PLAIN_HTTP": False,
+}
+QUIET = {"LOG_LEVEL": "WARNING"}
+
+
+def ticker_urls(server):
+    """Per-ticker URL lists where part of each list is shared with the next ticker."""
+    shared = int(BENCH_NEWS_PER_TICKER * BENCH_NEWS_SHARED)
+    own = BENCH_NEWS_PER_TICKER - shared
+    lists = {}
+    for t in range(BENCH_NEWS_TICKERS):
+        base = t * own
+        lists[f"T{t}"] = [server.article_url(base + i) for i in range(BENCH_NEWS_PER_TICKER)]
+    return lists
+
+
+def main():
+    with FakeSplashServer(latency=BENCH_SPLASH_LATENCY) as server:
+        # scrapy_news_spider reads SPLASH_URL at import
+        os.environ["SPLASH_URL"] = server.url
+        from stock_news_fetcher import crawl_articles
+
+        lists = ticker_urls(server)
+        url_tickers = {}
+        for ticker, urls in lists.items():
+            for url in urls:
+                url_tickers.setdefault(url, []).append(ticker)
+
+        started = time.perf_counter()
+        scraped = 0
+        for ticker, urls in lists.items():
+            scraped += sum(1 for _ in crawl_articles(urls, settings={**LEGACY_SETTINGS, **QUIET}))
+            time.sleep(BENCH_TICKER_DELAY)
+        legacy_s = time.perf_counter() - started
+        legacy_renders = server.renders
+        print(f"per-ticker crawls: {legacy_s:7.2f} s  {scraped} pages scraped, {legacy_renders} renders, "
+              f"{len(url_tickers) / legacy_s * 60:7.1f} articles/min")
+
+        started = time.perf_counter()
+        scraped = sum(1 for _ in crawl_articles(list(url_tickers), settings=QUIET))
+        single_s = time.perf_counter() - started
+        print(f"single crawl:      {single_s:7.2f} s  {scraped} pages scraped, "
+              f"{server.renders - legacy_renders} renders, {len(url_tickers) / single_s * 60:7.1f} articles/min")
+        print(f"{len(url_tickers)} unique articles for {len(lists)} tickers; "
+              f"speed-up: {legacy_s / single_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
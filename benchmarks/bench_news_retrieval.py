@@ -0,0 +1,89 @@
+"""
+Prompt size and answer latency for /stock/{ticker}/ai-news/{query}: every stored article in
+the prompt (as before) vs the top-k chunks from the retrieval index (news_index).
+
+Runs offline: articles are synthetic, embeddings come from fakes.hashing_embedder (in a
+temporary directory), and the model is fakes.StubGenerativeModel.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_news_retrieval
+
+Environment:
+- BENCH_NEWS_ARTICLES: stored articles for the ticker (default 5000).
+- BENCH_QUERIES: queries timed against the index (default 50).
+- BENCH_MODEL_LATENCY_PER_1K: stub model seconds per 1,000 prompt tokens (default 0.02).
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fakes import StubGenerativeModel, hashing_embedder, news_corpus
+from llm_context import build_prompt, chunk_text, count_tokens, select_chunks
+from news_index import EmbeddingStore, TickerIndex, fuse_rankings, index_embeddings
+
+BENCH_NEWS_ARTICLES = int(os.getenv("BENCH_NEWS_ARTICLES", "5000"))
+BENCH_QUERIES = int(os.getenv("BENCH_QUERIES", "50"))
+BENCH_MODEL_LATENCY_PER_1K = float(os.getenv("BENCH_MODEL_LATENCY_PER_1K", "0.02"))
+
+QUERIES = ["What did the company say about generative AI demand?", "data center capex outlook",
+           "machine learning revenue growth in china", "dividend and buyback plans"]
+
+
+def stored_articles(count):
+    """Article documents as save_news_to_mongo writes them, newest first."""
+    texts = news_corpus(count, keywords=["generative ai", "machine learning", "data center"], seed=3)
+    now = datetime(2024, 12, 1)
+    return [{"url_hash": f"{i:040x}", "content": text, "published_at": now - timedelta(hours=i),
+             "chunks": chunk_text(text)} for i, text in enumerate(texts)]
+
+
+async def answer(model, prompt):
+    started = time.perf_counter()
+    try:
+        await model.generate_content_async(prompt)
+        return f"{time.perf_counter() - started:6.2f} s"
+    except ValueError:
+        return "context overflow"
+
+
+def main():
+    model = StubGenerativeModel(latency_per_1k_tokens=BENCH_MODEL_LATENCY_PER_1K)
+    articles = stored_articles(BENCH_NEWS_ARTICLES)
+    query = QUERIES[0]
+
+    prompt = build_prompt(query, [{"content": a["content"], "ticker": "BENCH"} for a in articles])
+    print(f"{len(articles)} articles")
+    print(f"  all articles  prompt {count_tokens(prompt):>10,} tokens  answer {asyncio.run(answer(model, prompt))}")
+
+    started = time.perf_counter()
+    index = TickerIndex()
+    for article in articles:
+        index.add_article(article["url_hash"], article["chunks"], article["published_at"])
+    build_s = time.perf_counter() - started
+
+    embed = hashing_embedder()
+    with tempfile.TemporaryDirectory() as directory:
+        store = EmbeddingStore(directory)
+        started = time.perf_counter()
+        index_embeddings(articles, store, embed)
+        embed_s = time.perf_counter() - started
+        print(f"  index: {len(index.chunks)} chunks, BM25 build {build_s:.2f} s, embeddings {embed_s:.2f} s")
+
+        for name, hybrid in (("bm25", False), ("bm25+embed", True)):
+            started = time.perf_counter()
+            for i in range(BENCH_QUERIES):
+                q = QUERIES[i % len(QUERIES)]
+                ranked = index.search(q, 32)
+                if hybrid:
+                    ranked = fuse_rankings(ranked, store.search(embed([q], "retrieval_query")[0], index, 32))
+                context = select_chunks(ranked, index.chunks, index.dates)
+            per_query_ms = (time.perf_counter() - started) / BENCH_QUERIES * 1000
+            prompt = build_prompt(query, context["text"])
+            print(f"  top-k {name:11s} search {per_query_ms:6.1f} ms/query  prompt {count_tokens(prompt):>6,} tokens  "
+                  f"answer {asyncio.run(answer(model, prompt))}")
+
+
+if __name__ == "__main__":
+    main()
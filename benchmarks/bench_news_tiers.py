@@ -0,0 +1,70 @@
+"""
+Articles per minute and coverage for the news crawl: Splash for every page vs a direct fetch
+with Splash as the fallback.
+
+Both variants crawl the same URLs with the real spider and crawl_articles, against a local
+stub server that serves the article pages and stands in for Splash (see
+fakes.FakeSplashServer). A share of the pages are script shells that only have a story
+once rendered, so the fallback path is exercised too.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_news_tiers
+
+Environment:
+- BENCH_NEWS_ARTICLES: number of articles (default 100).
+- BENCH_JS_RATIO: share of pages that need rendering (default 0.1).
+- BENCH_SPLASH_LATENCY: stub render time per page in seconds (default 0.2).
+- BENCH_FETCH_LATENCY: stub direct fetch time per page in seconds (default 0.02).
+- NEWS_CONCURRENT_REQUESTS / NEWS_MIN_ARTICLE_CHARS / ...: crawl settings, as in production.
+"""
+import os
+import time
+from collections import Counter
+
+from benchmarks.fakes import FakeSplashServer
+
+BENCH_NEWS_ARTICLES = int(os.getenv("BENCH_NEWS_ARTICLES", "100"))
+BENCH_JS_RATIO = float(os.getenv("BENCH_JS_RATIO", "0.1"))
+BENCH_SPLASH_LATENCY = float(os.getenv("BENCH_SPLASH_LATENCY", "0.2"))
+BENCH_FETCH_LATENCY = float(os.getenv("BENCH_FETCH_LATENCY", "0.02"))
+
+QUIET = {"LOG_LEVEL": "WARNING"}
+
+
+def crawl(urls, plain_http):
+    """Crawl urls; returns (seconds, url -> text, Counter of tiers)."""
+    from stock_news_fetcher import crawl_articles
+
+    started = time.perf_counter()
+    texts = {}
+    tiers = Counter()
+    for item in crawl_articles(urls, settings={**QUIET, "NEWS_PLAIN_HTTP": plain_http}):
+        texts[item["url"]] = item["text"]
+        tiers[item["tier"]] += 1
+    return time.perf_counter() - started, texts, tiers
+
+
+def main():
+    with FakeSplashServer(latency=BENCH_SPLASH_LATENCY, fetch_latency=BENCH_FETCH_LATENCY,
+                          js_ratio=BENCH_JS_RATIO) as server:
+        # scrapy_news_spider reads SPLASH_URL at import
+        os.environ["SPLASH_URL"] = server.url
+        urls = [server.article_url(i) for i in range(BENCH_NEWS_ARTICLES)]
+
+        results = {}
+        for name, plain_http in (("splash only", False), ("tiered", True)):
+            renders = server.renders
+            seconds, texts, tiers = crawl(urls, plain_http)
+            results[name] = (seconds, texts)
+            covered = sum(1 for text in texts.values() if text)
+            print(f"{name:12s} {seconds:7.2f} s  {len(urls) / seconds * 60:8.1f} articles/min  "
+                  f"{covered}/{len(urls)} with text, {server.renders - renders} renders, tiers {dict(tiers)}")
+
+        splash_s, splash_texts = results["splash only"]
+        tiered_s, tiered_texts = results["tiered"]
+        same = sum(1 for url, text in splash_texts.items() if text and tiered_texts.get(url) == text)
+        print(f"speed-up: {splash_s / tiered_s:.1f}x; {same}/{len(splash_texts)} articles extracted identically")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Latency benchmark: price endpoints through pandas (old path) vs. targeted SQL (stock_queries).
+
+Builds a synthetic `stock_prices` table in a separate database and times both paths for
+random tickers. Needs a running MySQL (e.g. the `mysql` service from docker-compose).
+
+Usage (from the repository root):
+    BENCH_ROWS=10000000 python -m benchmarks.bench_price_queries
+
+Environment:
+- BENCH_DATABASE: database to (re)create for the benchmark (default 'stock_data_bench').
+- BENCH_ROWS: total rows in the synthetic table (default 10,000,000).
+- BENCH_TICKERS: number of distinct tickers (default 500).
+- BENCH_SAMPLES: timed requests per endpoint and path (default 50).
+- BENCH_REUSE: set to '1' to reuse an already populated benchmark table.
+- BENCH_BATCH_TICKERS: tickers per screen for the batch comparison (default 300).
+"""
+import os
+import random
+import statistics
+import time
+from datetime import date
+
+import pandas as pd
+
+from benchmarks.common import recreate_database, use_bench_database
+
+BENCH_DATABASE = os.getenv("BENCH_DATABASE", "stock_data_bench")
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", "10000000"))
+BENCH_TICKERS = int(os.getenv("BENCH_TICKERS", "500"))
+BENCH_SAMPLES = int(os.getenv("BENCH_SAMPLES", "50"))
+BENCH_REUSE = os.getenv("BENCH_REUSE", "0") == "1"
+BENCH_BATCH_TICKERS = int(os.getenv("BENCH_BATCH_TICKERS", "300"))
+
+use_bench_database(BENCH_DATABASE)
+
+# One statement per ticker: a recursive CTE generates a daily random-ish walk on the server,
+# so populating 10M rows does not round-trip every row through Python.
+POPULATE = """
+INSERT INTO stock_prices (ticker, timestamp, open_price, high_price, low_price, close_price)
+WITH RECURSIVE seq (n) AS (
+    SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < %s
+)
+SELECT %s,
+       TIMESTAMP('1990-01-01') + INTERVAL n DAY,
+       p, p + 1.5, p - 1.5, p + 0.25
+FROM (SELECT n, 100 + 40 * SIN(n / 90 + %s) + RAND() * 5 AS p FROM seq) AS walk
+"""
+
+
+def populate():
+    """Create the benchmark database and fill it with BENCH_ROWS synthetic rows."""
+    rows_per_ticker = max(1, BENCH_ROWS // BENCH_TICKERS)
+    connection, cursor = recreate_database(BENCH_DATABASE)
+    cursor.execute(f"SET SESSION cte_max_recursion_depth = {rows_per_ticker + 1}")
+
+    started = time.perf_counter()
+    for i in range(BENCH_TICKERS):
+        cursor.execute(POPULATE, (rows_per_ticker - 1, f"T{i:04d}", i))
+        connection.commit()
+    cursor.execute("ANALYZE TABLE stock_prices")
+    cursor.fetchall()
+    print(f"Populated {rows_per_ticker * BENCH_TICKERS} rows in {time.perf_counter() - started:.1f}s")
+    cursor.close()
+    connection.close()
+
+
+def legacy_price_row(kind, ticker):
+    """The pre-stock_queries path: SELECT * for the ticker, then reduce in pandas."""
+    from db_connector import get_connection_from_pool
+
+    db_connection = get_connection_from_pool()
+    cursor = db_connection.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM stock_prices WHERE ticker = %s", (ticker,))
+    df = pd.DataFrame(cursor.fetchall())
+    cursor.close()
+    db_connection.close()
+
+    if kind == "highest":
+        return df.loc[df["high_price"].idxmax()]
+    if kind == "lowest":
+        return df.loc[df["low_price"].idxmin()]
+    return df.iloc[-1]
+
+
+def _time_calls(fn, tickers):
+    timings = []
+    for ticker in tickers:
+        started = time.perf_counter()
+        fn(ticker)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"{label:<32} median {statistics.median(timings):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def batch_closing(tickers, start=None, end=None):
+    """The /stocks/closing-price path: one IN (...) query, grouped with batch_prices."""
+    from db_connector import get_connection_from_pool, rows_to_arrays
+    from stock_queries import build_batch_closing_query
+
+    db_connection = get_connection_from_pool()
+    cursor = db_connection.cursor()
+    cursor.execute(*build_batch_closing_query(tickers, start, end))
+    rows = cursor.fetchall()
+    columns = [column[0] for column in cursor.description]
+    cursor.close()
+    db_connection.close()
+    return rows_to_arrays(columns, rows)
+
+
+def main():
+    if not BENCH_REUSE:
+        populate()
+
+    from stock_queries import query_price_row
+
+    tickers = [f"T{random.randrange(BENCH_TICKERS):04d}" for _ in range(BENCH_SAMPLES)]
+    for kind in ("highest", "lowest", "closing"):
+        legacy = _time_calls(lambda t: legacy_price_row(kind, t), tickers)
+        targeted = _time_calls(lambda t: query_price_row(kind, t), tickers)
+        windowed = _time_calls(lambda t: query_price_row(kind, t, date(2010, 1, 1), date(2010, 12, 31)), tickers)
+        _report(f"{kind} / pandas", legacy)
+        _report(f"{kind} / sql", targeted)
+        _report(f"{kind} / sql (1y window)", windowed)
+        print(f"{kind}: {statistics.median(legacy) / statistics.median(targeted):.1f}x faster\n")
+
+    # A screen of BENCH_BATCH_TICKERS closing prices: one query per ticker vs one batch query
+    screen = [f"T{i % BENCH_TICKERS:04d}" for i in range(BENCH_BATCH_TICKERS)]
+    screens = range(max(1, BENCH_SAMPLES // 10))
+    single = _time_calls(lambda _: [query_price_row("closing", t, None, date(2010, 12, 31)) for t in screen], screens)
+    batch = _time_calls(lambda _: batch_closing(screen, None, date(2010, 12, 31)), screens)
+    _report(f"{len(screen)} closing / per ticker", single)
+    _report(f"{len(screen)} closing / batch", batch)
+    print(f"batch: {statistics.median(single) / statistics.median(batch):.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Decode time and peak memory for turning stock_prices rows into a DataFrame:
+- dicts: the old query_stock_data path, a DictCursor converting every value to Decimal /
+  datetime, then pd.DataFrame(list of dicts) with object-dtype Decimal columns;
+- tuples: a tuple cursor (driver-converted values) through db_connector.rows_to_frame;
+- text: async_db.fetch_rows(text=True) rows (the values as MySQL sends them) through
+  db_connector.rows_to_frame, which is what query_stock_data does now.
+
+Runs offline: the rows are synthetic text rows, and the driver's per-value conversion is
+reproduced with PyMySQL's own decoders (the ones aiomysql uses), so it is timed too.
+Peak memory is measured with tracemalloc over the conversion and decoding, in a second
+untimed run.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_row_decoding
+
+Environment:
+- BENCH_ROWS: rows to decode (default 1,000,000).
+"""
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from pymysql.constants import FIELD_TYPE
+from pymysql.converters import decoders
+
+from benchmarks.fakes import synthetic_history
+from db_connector import rows_to_frame
+
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", "1000000"))
+
+COLUMNS = ["id", "ticker", "timestamp", "open_price", "high_price", "low_price", "close_price", "volume"]
+FIELD_TYPES = [FIELD_TYPE.LONG, FIELD_TYPE.VAR_STRING, FIELD_TYPE.DATETIME, FIELD_TYPE.NEWDECIMAL,
+               FIELD_TYPE.NEWDECIMAL, FIELD_TYPE.NEWDECIMAL, FIELD_TYPE.NEWDECIMAL, FIELD_TYPE.LONGLONG]
+
+
+def text_rows(count):
+    """Rows as MySQL sends them in the text protocol: every value a str."""
+    history = synthetic_history(count)
+    timestamps = history.index.tz_localize(None).strftime("%Y-%m-%d %H:%M:%S")
+    prices = [history[c].map("{:.2f}".format) for c in ("Open", "High", "Low", "Close")]
+    return list(zip(map(str, range(1, count + 1)), ["BENCH"] * count, timestamps, *prices,
+                    history["Volume"].astype(str)))
+
+
+def driver_rows(rows):
+    """What the driver's default decoders make of the text rows (Decimal, datetime, int)."""
+    converters = [decoders.get(field_type) for field_type in FIELD_TYPES]
+    return [tuple(value if convert is None or value is None else convert(value)
+                  for value, convert in zip(row, converters)) for row in rows]
+
+
+def dicts_path(rows):
+    converted = driver_rows(rows)
+    return pd.DataFrame([dict(zip(COLUMNS, row)) for row in converted])
+
+
+def tuples_path(rows):
+    return rows_to_frame(COLUMNS, driver_rows(rows))
+
+
+def text_path(rows):
+    return rows_to_frame(COLUMNS, rows)
+
+
+def measure(decode, rows):
+    started = time.perf_counter()
+    df = decode(rows)
+    elapsed = time.perf_counter() - started
+    del df
+
+    # Separate run: tracing every allocation slows the object-heavy paths down a lot
+    tracemalloc.start()
+    df = decode(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    df["high_price"].idxmax()
+    df["low_price"].idxmin()
+    extremes = time.perf_counter() - started
+    dtypes = ", ".join(f"{c}:{df[c].dtype}" for c in ("timestamp", "close_price"))
+    return elapsed, peak, extremes, dtypes
+
+
+def main():
+    rows = text_rows(BENCH_ROWS)
+    print(f"{BENCH_ROWS:,} rows")
+    results = {}
+    for name, decode in (("dicts", dicts_path), ("tuples", tuples_path), ("text", text_path)):
+        elapsed, peak, extremes, dtypes = measure(decode, rows)
+        results[name] = elapsed
+        print(f"  {name:>6}: decode {elapsed:6.2f} s  peak {peak / 2**20:8.1f} MiB  "
+              f"idxmax+idxmin {extremes * 1000:7.1f} ms  ({dtypes})")
+    print(f"text vs dicts: {results['dicts'] / results['text']:.1f}x faster")
+    # The decoded prices are the same numbers on every path
+    assert np.allclose(text_path(rows[:1000])["close_price"], dicts_path(rows[:1000])["close_price"].astype(float))
+
+
+if __name__ == "__main__":
+    main()
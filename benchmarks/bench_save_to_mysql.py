@@ -0,0 +1,80 @@
+"""
+Throughput benchmark for db_connector.save_to_mysql: rows per second for each write strategy.
+
+Compares the old per-row iterrows() inserts with the executemany, multi-row INSERT and
+LOAD DATA LOCAL INFILE paths on a synthetic yfinance-shaped DataFrame. Needs a running MySQL
+with local_infile enabled for the LOAD DATA strategy (docker-compose starts it that way).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_save_to_mysql
+
+Environment:
+- BENCH_DATABASE: database to (re)create for the benchmark (default 'stock_data_bench_write').
+- BENCH_ROWS: rows written per strategy (default 200,000).
+- BENCH_LEGACY_ROWS: rows for the slow per-row baseline (default 20,000).
+- BENCH_CHUNK_SIZES: comma-separated chunk sizes to try (default '500,1000,5000').
+"""
+import os
+import time
+
+from benchmarks.common import recreate_database, use_bench_database
+from benchmarks.fakes import synthetic_history
+
+BENCH_DATABASE = os.getenv("BENCH_DATABASE", "stock_data_bench_write")
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", "200000"))
+BENCH_LEGACY_ROWS = int(os.getenv("BENCH_LEGACY_ROWS", "20000"))
+BENCH_CHUNK_SIZES = [int(size) for size in os.getenv("BENCH_CHUNK_SIZES", "500,1000,5000").split(",")]
+
+use_bench_database(BENCH_DATABASE)
+os.environ["MYSQL_LOCAL_INFILE"] = "1"
+
+
+def legacy_save(data, ticker_symbol):
+    """The original save_to_mysql loop: one execute per row from iterrows()."""
+    from db_connector import get_connection_from_pool
+
+    db_connection = get_connection_from_pool()
+    cursor = db_connection.cursor()
+    query = """
+    INSERT INTO stock_prices (ticker, timestamp, open_price, high_price, low_price, close_price)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    for index, row in data.iterrows():
+        cursor.execute(query, (ticker_symbol, index, row['Open'], row['High'], row['Low'], row['Close']))
+    db_connection.commit()
+    cursor.close()
+    db_connection.close()
+
+
+def _timed(label, rows, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {rows:>9} rows  {elapsed:8.2f} s  {rows / elapsed:12,.0f} rows/s")
+
+
+def main():
+    connection, cursor = recreate_database(BENCH_DATABASE)
+    cursor.close()
+    connection.close()
+
+    from db_connector import save_to_mysql
+
+    data = synthetic_history(BENCH_ROWS)
+    legacy = data.iloc[:BENCH_LEGACY_ROWS]
+
+    _timed("iterrows (old)", len(legacy), lambda: legacy_save(legacy, "OLD"))
+    for chunk_size in BENCH_CHUNK_SIZES:
+        _timed(f"executemany / {chunk_size}", len(data),
+               lambda: save_to_mysql(data, f"E{chunk_size}", "executemany", chunk_size))
+        _timed(f"multirow / {chunk_size}", len(data),
+               lambda: save_to_mysql(data, f"M{chunk_size}", "multirow", chunk_size))
+    _timed("load data infile", len(data), lambda: save_to_mysql(data, "LOAD", "load_data"))
+
+    # Re-saving the same frame exercises the ON DUPLICATE KEY UPDATE path
+    _timed("executemany (re-save)", len(data),
+           lambda: save_to_mysql(data, f"E{BENCH_CHUNK_SIZES[0]}", "executemany", BENCH_CHUNK_SIZES[0]))
+
+
+if __name__ == "__main__":
+    main()
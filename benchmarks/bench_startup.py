@@ -0,0 +1,104 @@
+"""
+Startup time of the API: importing fastapi_app, and starting uvicorn until the first
+request (/health) is answered and, optionally, until /ready reports the backends up.
+
+Each run is a fresh process, so module imports are measured cold (as a worker fork would
+pay them). Backends come from the usual environment; unreachable ones must not delay the
+first request, only /ready.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup
+
+Environment:
+- BENCH_RUNS: fresh processes per measurement (default 5).
+- BENCH_READY_TIMEOUT: seconds to wait for /ready (default 0: don't wait).
+- BENCH_MAX_IMPORT_S / BENCH_MAX_FIRST_REQUEST_S: exit with status 1 if the median
+  exceeds them (defaults 3 and 5 seconds), for use in CI.
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BENCH_RUNS = int(os.getenv("BENCH_RUNS", "5"))
+BENCH_READY_TIMEOUT = float(os.getenv("BENCH_READY_TIMEOUT", "0"))
+BENCH_MAX_IMPORT_S = float(os.getenv("BENCH_MAX_IMPORT_S", "3"))
+BENCH_MAX_FIRST_REQUEST_S = float(os.getenv("BENCH_MAX_FIRST_REQUEST_S", "5"))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import fastapi_app; print(time.perf_counter() - t)"
+
+
+def import_time():
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _status(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def serve_times():
+    """(seconds to the first /health answer, seconds to /ready or None) for one uvicorn process."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "fastapi_app:app", "--port", str(port),
+                               "--log-level", "warning"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        while _status(f"{base}/health") != 200:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            time.sleep(0.01)
+        first_request = time.perf_counter() - started
+
+        ready = None
+        while BENCH_READY_TIMEOUT and time.perf_counter() - started < BENCH_READY_TIMEOUT:
+            if _status(f"{base}/ready") == 200:
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.05)
+        return first_request, ready
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    imports = [import_time() for _ in range(BENCH_RUNS)]
+    served = [serve_times() for _ in range(BENCH_RUNS)]
+    first_requests = [first for first, _ in served]
+    readies = [ready for _, ready in served if ready is not None]
+
+    import_median = statistics.median(imports)
+    first_median = statistics.median(first_requests)
+    print(f"import fastapi_app   median {import_median:6.2f} s   max {max(imports):6.2f} s")
+    print(f"first request        median {first_median:6.2f} s   max {max(first_requests):6.2f} s")
+    if BENCH_READY_TIMEOUT:
+        if readies:
+            print(f"ready                median {statistics.median(readies):6.2f} s   ({len(readies)}/{BENCH_RUNS} runs)")
+        else:
+            print(f"ready                not within {BENCH_READY_TIMEOUT:g} s")
+
+    if import_median > BENCH_MAX_IMPORT_S or first_median > BENCH_MAX_FIRST_REQUEST_S:
+        print("Startup is slower than the thresholds")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Article text extraction on saved pages: the old text-node filter vs article_extractor.
+
+The old path takes every body text node, runs the five uncompiled is_unwanted patterns and
+the per-character alnum loop on each, then cuts the result at Yahoo marker strings. The new
+path is one lxml walk that skips boilerplate subtrees.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_text_extraction
+
+Environment:
+- BENCH_FIXTURE_DIR: directory of saved .html pages (default benchmarks/fixtures).
+- BENCH_REPEAT: passes over the pages (default 200).
+"""
+import glob
+import os
+import re
+import time
+
+import lxml.html
+
+from article_extractor import extract_article
+
+BENCH_FIXTURE_DIR = os.getenv("BENCH_FIXTURE_DIR", os.path.join(os.path.dirname(__file__), "fixtures"))
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "200"))
+
+# Page furniture that should never reach the stored article text
+BOILERPLATE_MARKERS = ["View comments", "Trending tickers", "Related stories", "Subscribe", "Privacy Dashboard",
+                       "Share on", "Accept all", "Story continues"]
+
+
+def legacy_is_unwanted(text):
+    """The original is_unwanted (as it was meant to run)."""
+    unwanted_patterns = [
+        r"(?i)(window\.|document\.|function\(|var\s|let\s|const\s)",
+        r"\{.*?\}",
+        r"\(.*?\)",
+        r";",
+        r"[=:]{2,}",
+    ]
+    for pattern in unwanted_patterns:
+        if re.search(pattern, text):
+            return True
+    if len(text) < 5 or sum(1 for char in text if char.isalnum()) / len(text) < 0.5:
+        return True
+    return False
+
+
+def legacy_extract(html):
+    """Text nodes -> is_unwanted -> join -> split at the Yahoo marker strings."""
+    nodes = lxml.html.fromstring(html).xpath('//body//*[not(self::script or self::style)]//text()')
+    kept = [text.strip() for text in nodes if text.strip() and not legacy_is_unwanted(text.strip())]
+    content = " ".join(kept)
+    content = content.split('Bid Wealth Invest ETF Report Streaming')[-1]
+    return content.split('View comments')[0], len(nodes)
+
+
+def run(label, extract, pages):
+    nodes = 0
+    started = time.perf_counter()
+    for _ in range(BENCH_REPEAT):
+        for html in pages.values():
+            nodes += extract(html)[1]
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {len(pages) * BENCH_REPEAT / elapsed:8.0f} pages/s, {nodes / elapsed:10.0f} nodes/s")
+    for name, html in pages.items():
+        text = extract(html)[0]
+        leaked = [marker for marker in BOILERPLATE_MARKERS if marker in text]
+        print(f"  {name}: {len(text):5d} chars, boilerplate: {', '.join(leaked) or 'none'}")
+
+
+def main():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(BENCH_FIXTURE_DIR, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+
+    run("text nodes + is_unwanted", legacy_extract, pages)
+    run("article_extractor", lambda html: (lambda r: (r["text"], r["nodes"]))(extract_article(html)), pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Shared helpers for the MySQL-backed benchmarks.
+"""
+import os
+
+import mysql.connector
+
+# Same table as init.sql; the indexes are added by the schema migrations that run when
+# db_connector is imported, exactly as in a deployment.
+STOCK_PRICES_SCHEMA = """
+CREATE TABLE stock_prices (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    ticker VARCHAR(10) NOT NULL,
+    timestamp DATETIME NOT NULL,
+    open_price DECIMAL(10, 2),
+    high_price DECIMAL(10, 2),
+    low_price DECIMAL(10, 2),
+    close_price DECIMAL(10, 2)
+)
+"""
+
+
+def use_bench_database(database):
+    """
+    Point db_connector at the benchmark database.
+
+    db_connector builds its pool (and migrates the schema) at import time from MYSQL_DATABASE,
+    so this has to run before anything imports it.
+    """
+    os.environ["MYSQL_DATABASE"] = database
+
+
+def raw_connection(database=None):
+    """Open a plain (non-pooled) connection with the same credentials as db_connector."""
+    return mysql.connector.connect(
+        user=os.getenv("MYSQL_USER", "root"),
+        password=os.getenv("MYSQL_PASSWORD", "root_password"),
+        host=os.getenv("MYSQL_HOST", "localhost"),
+        database=database,
+        allow_local_infile=True,
+    )
+
+
+def recreate_database(database):
+    """
+    Drop and recreate the benchmark database with an empty stock_prices table.
+
+    Returns:
+    - tuple: (connection, cursor) using the new database.
+    """
+    connection = raw_connection()
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+    cursor.execute(f"CREATE DATABASE {database}")
+    cursor.execute(f"USE {database}")
+    cursor.execute(STOCK_PRICES_SCHEMA)
+    return connection, cursor
@@ -0,0 +1,581 @@
+"""
+Offline stand-ins for external services, shared by the benchmarks.
+"""
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_history(rows, seed=0, start="1900-01-01", freq="h"):
+    """A yfinance history()-shaped frame: tz-aware index, OHLC + Volume columns."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    index = pd.date_range(start, periods=rows, freq=freq, tz="America/New_York", name="Date")
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.5, rows),
+        "High": close + 1,
+        "Low": close - 1,
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, rows),
+    }, index=index)
+
+
+class FakeHistoryProvider:
+    """
+    Drop-in for fetch_pipeline.YahooHistoryProvider with injectable latency and failures.
+
+    Parameters:
+    - latency (float): Seconds each history() call sleeps.
+    - jitter (float): Extra random latency, uniformly in [0, jitter).
+    - failure_rate (float): Probability that a call raises, to exercise retries.
+    - rows (int): Bars returned per call.
+    """
+
+    host = "fake.finance.local"
+
+    def __init__(self, latency=0.2, jitter=0.0, failure_rate=0.0, rows=22):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rows = rows
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def history(self, ticker, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency + random.random() * self.jitter)
+        if random.random() < self.failure_rate:
+            raise ConnectionError(f"injected failure for {ticker}")
+        # crc32 rather than hash(): the same ticker gets the same bars in every process
+        return synthetic_history(self.rows, seed=zlib.crc32(ticker.encode()), start="2024-01-01", freq="B")
+
+    def ticker(self, symbol):
+        """Stand-in for yfinance.Ticker (assign `yfinance.Ticker = provider.ticker`)."""
+        return SimpleNamespace(history=lambda **kwargs: self.history(symbol, **kwargs))
+
+
+AI_PARAGRAPHS = [
+    "The company said its generative AI assistant is now used by most enterprise customers.",
+    "Analysts expect spending on machine learning infrastructure to keep rising next year.",
+    "A new large language model will be integrated into the search product later this quarter.",
+]
+PLAIN_PARAGRAPHS = [
+    "Shares rose after quarterly revenue beat consensus estimates by a wide margin.",
+    "The board approved a new buyback program and raised the quarterly dividend.",
+    "Management reiterated full-year guidance despite softer demand in Europe.",
+]
+
+
+def article_html(index, ai_related=True, paragraphs=8):
+    """A Yahoo Finance-like article page: navigation and script boilerplate around the story."""
+    rng = random.Random(index)
+    pool = AI_PARAGRAPHS + PLAIN_PARAGRAPHS if ai_related else PLAIN_PARAGRAPHS
+    story = "".join(f"<p>{rng.choice(pool)} Item {index}-{n}.</p>" for n in range(paragraphs))
+    return (
+        "<html><head><title>Article</title><script>window.YAHOO = {config: {}};</script>"
+        "<style>.caas-body { color: #000; }</style></head><body>"
+        "<nav><a href='/'>Home</a><a href='/markets'>Markets</a><a href='/quote'>Quote</a></nav>"
+        "<div class='ticker-bar'>Bid Wealth Invest ETF Report Streaming</div>"
+        f"<article><h1>Story {index}</h1><div class='caas-body'>{story}</div></article>"
+        "<button>View comments</button>"
+        "<footer><a href='/terms'>Terms</a><a href='/privacy'>Privacy</a></footer>"
+        "<script>var tracking = function() { return 1; };</script>"
+        "</body></html>"
+    )
+
+
+class FakeSplashServer:
+    """
+    Local HTTP server standing in for Splash (and the news site behind it).
+
+    POST /render.html with Splash's JSON body returns the article page for body["url"] after
+    `latency + wait * wait_scale` seconds; at most `slots` renders run at once, like Splash's
+    --slots. GET /article/<n> serves the same pages directly after `fetch_latency` seconds,
+    except that a `js_ratio` share of them are script shells whose story only appears once
+    rendered. /robots.txt is a 404. `renders` and `fetches` count both kinds of request.
+
+    Use as a context manager; `url` is the base URL to put in SPLASH_URL.
+    """
+
+    def __init__(self, latency=0.2, wait_scale=0.25, slots=20, ai_ratio=0.5, fetch_latency=0.02, js_ratio=0.0):
+        import json
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        server = self
+        self.latency = latency
+        self.wait_scale = wait_scale
+        self.ai_ratio = ai_ratio
+        self.fetch_latency = fetch_latency
+        self.js_ratio = js_ratio
+        self.renders = 0
+        self.fetches = 0
+        self._slots = threading.Semaphore(slots)
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like Splash; Scrapy reuses pooled connections
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="text/html; charset=utf-8"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/article/"):
+                    time.sleep(server.fetch_latency)
+                    with server._lock:
+                        server.fetches += 1
+                    self._send(200, server.page(self.path, rendered=False).encode())
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                args = json.loads(self.rfile.read(length) or b"{}")
+                with server._slots:
+                    time.sleep(server.latency + float(args.get("wait", 0)) * server.wait_scale)
+                with server._lock:
+                    server.renders += 1
+                self._send(200, server.page(args.get("url", "")).encode())
+
+        # Larger listen backlog than http.server's default of 5, so bursts aren't refused
+        server_class = type("FakeSplashHTTPServer", (ThreadingHTTPServer,), {"request_queue_size": 256})
+        self.httpd = server_class(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def page(self, url, rendered=True):
+        index = int(url.rstrip("/").rsplit("/", 1)[-1]) if url.rstrip("/")[-1:].isdigit() else 0
+        rng = random.Random(index)
+        ai_related = rng.random() < self.ai_ratio
+        if not rendered and rng.random() < self.js_ratio:
+            return ("<html><head><script src='/bundle.js'></script></head><body>"
+                    "<div id='app'>Loading...</div><noscript>Please enable JavaScript.</noscript></body></html>")
+        return article_html(index, ai_related=ai_related)
+
+    def article_url(self, index):
+        return f"{self.url}/article/{index}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+FILLER_WORDS = ("shares market revenue quarter growth company investors analysts guidance demand "
+                "margin earnings billion outlook stock trading sales cloud chips data center "
+                "consumer dividend pricing supply forecast europe china fiscal operating").split()
+
+
+def news_corpus(articles=10_000, words=600, keywords=(), keyword_rate=0.002, seed=0):
+    """
+    Scraped-article-sized texts: filler finance prose with keywords sprinkled in.
+
+    Parameters:
+    - articles (int): Number of texts.
+    - words (int): Words per text.
+    - keywords (iterable): Terms to insert, each at `keyword_rate` per word on average.
+    """
+    rng = random.Random(seed)
+    keywords = list(keywords)
+    corpus = []
+    for _ in range(articles):
+        tokens = [rng.choice(FILLER_WORDS) for _ in range(words)]
+        if keywords:
+            for _ in range(int(words * keyword_rate * rng.random() * 2)):
+                tokens[rng.randrange(words)] = rng.choice(keywords)
+        corpus.append(" ".join(tokens).capitalize() + ".")
+    return corpus
+
+
+class StubGenerativeModel:
+    """
+    Offline stand-in for genai.GenerativeModel.
+
+    generate_content_async sleeps `base_latency + latency_per_1k_tokens` per thousand prompt
+    tokens (estimated with llm_context.count_tokens), like a hosted model's prefill time, and
+    raises when the prompt exceeds `max_tokens`, like a context-window overflow.
+    `prompt_tokens` records every prompt's size.
+    """
+
+    def __init__(self, base_latency=0.3, latency_per_1k_tokens=0.02, max_tokens=1_048_576):
+        self.base_latency = base_latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.max_tokens = max_tokens
+        self.prompt_tokens = []
+
+    async def generate_content_async(self, prompt):
+        import asyncio
+        from types import SimpleNamespace
+
+        from llm_context import count_tokens
+
+        tokens = count_tokens(prompt)
+        self.prompt_tokens.append(tokens)
+        if tokens > self.max_tokens:
+            raise ValueError(f"400 The input token count ({tokens}) exceeds the maximum ({self.max_tokens})")
+        await asyncio.sleep(self.base_latency + tokens / 1000 * self.latency_per_1k_tokens)
+        return SimpleNamespace(text=f"Stub answer from {tokens} prompt tokens.")
+
+
+def hashing_embedder(dim=256):
+    """
+    Offline stand-in for news_index.embed_texts: hashed bag-of-words vectors, L2-normalised.
+
+    Not semantic, but texts sharing words get high cosine similarity, which is enough to
+    exercise and time the embedding index.
+    """
+    import zlib
+
+    def embed(texts, task_type="retrieval_document"):
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                matrix[row, zlib.crc32(word.encode()) % dim] += 1
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    return embed
+
+
+# The tables the schema migrations leave in MySQL, in SQLite's dialect
+SQLITE_SCHEMA = """
+CREATE TABLE stock_prices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker VARCHAR(10) NOT NULL,
+    timestamp DATETIME NOT NULL,
+    open_price DECIMAL(10, 2),
+    high_price DECIMAL(10, 2),
+    low_price DECIMAL(10, 2),
+    close_price DECIMAL(10, 2),
+    volume BIGINT,
+    UNIQUE (ticker, timestamp)
+);
+CREATE INDEX idx_ticker_high ON stock_prices (ticker, high_price, timestamp);
+CREATE INDEX idx_ticker_low ON stock_prices (ticker, low_price, timestamp);
+CREATE TABLE ticker_writes (
+    ticker VARCHAR(10) PRIMARY KEY,
+    last_write DATETIME NOT NULL,
+    write_count BIGINT NOT NULL DEFAULT 0,
+    min_written DATETIME
+);
+CREATE TABLE ticker_stats (
+    ticker VARCHAR(10) PRIMARY KEY,
+    row_count INT NOT NULL,
+    first_timestamp DATETIME NOT NULL,
+    last_timestamp DATETIME NOT NULL,
+    last_close DECIMAL(10, 2),
+    high_price DECIMAL(10, 2),
+    high_at DATETIME,
+    low_price DECIMAL(10, 2),
+    low_at DATETIME,
+    high_52w DECIMAL(10, 2),
+    high_52w_at DATETIME,
+    low_52w DECIMAL(10, 2),
+    low_52w_at DATETIME,
+    high_30d DECIMAL(10, 2),
+    high_30d_at DATETIME,
+    low_30d DECIMAL(10, 2),
+    low_30d_at DATETIME,
+    avg_volume_52w BIGINT,
+    avg_volume_30d BIGINT,
+    updated_at DATETIME NOT NULL
+);
+"""
+
+MYSQL_TO_SQLITE = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"ON DUPLICATE KEY UPDATE"), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"VALUES\((\w+)\)"), r"excluded.\1"),
+    (re.compile(r"NOW\(\d*\)"), "strftime('%Y-%m-%d %H:%M:%f', 'now')"),
+]
+DATETIME_TEXT = re.compile(r"\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2}(\.\d+)?)?$")
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(pd.Timestamp, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.float64, float)
+# Columns declared DATETIME / DECIMAL come back as the MySQL drivers return them (every
+# DECIMAL column of the schema has two decimals)
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()).quantize(Decimal("0.01")))
+
+
+def _decode_column(values):
+    """DATETIME / DATE text from expressions like MAX(timestamp), which have no declared type."""
+    first = next((value for value in values if value is not None), None)
+    if not isinstance(first, str) or not DATETIME_TEXT.match(first):
+        return values
+    parse = date.fromisoformat if len(first) == 10 else datetime.fromisoformat
+    return [None if value is None else parse(value) for value in values]
+
+
+class SQLiteMySQL:
+    """
+    In-process stand-in for the MySQL server: an SQLite database with the stock_prices,
+    ticker_writes and ticker_stats tables, reached through fake mysql.connector and aiomysql
+    pools. The statements the application sends are rewritten to SQLite's dialect
+    (placeholders, ON DUPLICATE KEY UPDATE, NOW()); LOAD DATA is not supported.
+
+    Rows come back as the drivers return them: datetime and Decimal values, dicts for
+    DictCursor, and every value as text on connections whose `decoders` were cleared
+    (async_db.fetch_rows(text=True)). Statements run one at a time, on the calling thread.
+
+    install() patches mysql.connector.pooling.MySQLConnectionPool and aiomysql.create_pool,
+    so db_connector and async_db build their pools on it; set MYSQL_AUTO_MIGRATE=0 first.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.connection = sqlite3.connect(path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        self.lock = threading.RLock()
+        self.statements = 0
+        self.connection.executescript(SQLITE_SCHEMA)
+
+    @staticmethod
+    def translate(query):
+        for pattern, replacement in MYSQL_TO_SQLITE:
+            query = pattern.sub(replacement, query)
+        return query
+
+    def run(self, query, params=(), many=False, text=False, dictionary=False):
+        """
+        Execute a MySQL statement.
+
+        Returns:
+        - tuple: (description, rows, rowcount).
+        """
+        query = self.translate(query)
+        with self.lock:
+            self.statements += 1
+            cursor = self.connection.executemany(query, params) if many else self.connection.execute(query, params)
+            rows = cursor.fetchall()
+            description = cursor.description
+        if rows:
+            columns = list(zip(*rows))
+            if text:
+                columns = [[None if value is None else str(value) for value in column] for column in columns]
+            else:
+                columns = [_decode_column(column) for column in columns]
+            rows = list(zip(*columns))
+        if dictionary:
+            names = [column[0] for column in description]
+            rows = [dict(zip(names, row)) for row in rows]
+        return description, rows, cursor.rowcount
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+
+    def install(self):
+        import aiomysql
+        import mysql.connector.pooling
+
+        server = self
+
+        class Pool:
+            def __init__(self, **config):
+                self.config = config
+
+            def get_connection(self):
+                return _SyncConnection(server)
+
+        async def create_pool(minsize=1, maxsize=10, **config):
+            return _AsyncPool(server, maxsize)
+
+        mysql.connector.pooling.MySQLConnectionPool = Pool
+        aiomysql.create_pool = create_pool
+        return self
+
+
+class _SyncCursor:
+    def __init__(self, server, dictionary=False):
+        self.server = server
+        self.dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, query, params=()):
+        self.description, rows, self.rowcount = self.server.run(query, params or (), dictionary=self.dictionary)
+        self._rows = list(reversed(rows))
+
+    def executemany(self, query, seq_params):
+        self.description, rows, self.rowcount = self.server.run(query, list(seq_params), many=True)
+        self._rows = []
+
+    def fetchone(self):
+        return self._rows.pop() if self._rows else None
+
+    def fetchmany(self, size=1):
+        return [self._rows.pop() for _ in range(min(size, len(self._rows)))]
+
+    def fetchall(self):
+        rows, self._rows = self._rows[::-1], []
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class _SyncConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self, dictionary=False, **kwargs):
+        return _SyncCursor(self.server, dictionary)
+
+    def commit(self):
+        self.server.commit()
+
+    def rollback(self):
+        with self.server.lock:
+            self.server.connection.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class _AsyncCursor:
+    def __init__(self, connection, dictionary):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+
+    async def execute(self, query, params=()):
+        self.description, rows, self.rowcount = self.connection.server.run(
+            query, params or (), text=not self.connection.decoders, dictionary=self.dictionary)
+        self._rows = list(reversed(rows))
+
+    async def fetchone(self):
+        return self._rows.pop() if self._rows else None
+
+    async def fetchmany(self, size=1):
+        return [self._rows.pop() for _ in range(min(size, len(self._rows)))]
+
+    async def fetchall(self):
+        rows, self._rows = self._rows[::-1], []
+        return rows
+
+    async def close(self):
+        self._rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class _AsyncCursorContext:
+    """What aiomysql's connection.cursor() returns: awaitable, or usable with `async with`."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __await__(self):
+        yield from ()
+        return self.cursor
+
+    async def __aenter__(self):
+        return self.cursor
+
+    async def __aexit__(self, *exc):
+        await self.cursor.close()
+
+
+class _AsyncConnection:
+    def __init__(self, server):
+        self.server = server
+        # Cleared by async_db.fetch_rows(text=True) to receive the values as text
+        self.decoders = {"default": True}
+
+    def cursor(self, cursor_class=None):
+        import aiomysql
+
+        dictionary = cursor_class in (aiomysql.DictCursor, aiomysql.SSDictCursor)
+        return _AsyncCursorContext(_AsyncCursor(self, dictionary))
+
+    def close(self):
+        pass
+
+
+class _AsyncPool:
+    def __init__(self, server, maxsize):
+        self.server = server
+        self.maxsize = maxsize
+        self.size = 0
+        self.freesize = 0
+
+    async def acquire(self):
+        return _AsyncConnection(self.server)
+
+    def release(self, connection):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+class AsyncMongoCollection:
+    """
+    Motor-style async facade over a (mongomock) collection, for the API's news reads:
+    find() with sort/to_list or async iteration, and `database.command("ping")`.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.database = SimpleNamespace(command=self._command)
+
+    async def _command(self, name):
+        return {"ok": 1.0} if name == "ping" else self.collection.database.command(name)
+
+    def find(self, *args, **kwargs):
+        return _AsyncMongoCursor(self.collection.find(*args, **kwargs))
+
+
+class _AsyncMongoCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    async def to_list(self, length=None):
+        documents = list(self.cursor)
+        return documents if length is None else documents[:length]
+
+    async def _iterate(self):
+        for document in self.cursor:
+            yield document
+
+    def __aiter__(self):
+        return self._iterate()
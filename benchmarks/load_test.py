@@ -0,0 +1,86 @@
+"""
+Concurrent load test for the FastAPI service: p50/p99 latency and throughput.
+
+Point it at one or more running deployments (e.g. the docker-compose stack built from the
+old sync handlers and from the async ones) and compare the printed tables:
+
+    LOAD_TEST_URLS=http://localhost:8000,http://localhost:8001 python -m benchmarks.load_test
+
+Environment:
+- LOAD_TEST_URLS: comma-separated base URLs (default 'http://localhost:8000').
+- LOAD_TEST_CONCURRENCY: concurrent clients (default 200).
+- LOAD_TEST_REQUESTS: requests per endpoint and URL (default 5000).
+- LOAD_TEST_TICKERS: tickers to spread the requests over (default 'AAPL,MSFT').
+- LOAD_TEST_PATHS: comma-separated path templates; '{ticker}' is substituted.
+"""
+import asyncio
+import os
+import time
+
+import httpx
+
+LOAD_TEST_URLS = os.getenv("LOAD_TEST_URLS", "http://localhost:8000").split(",")
+LOAD_TEST_CONCURRENCY = int(os.getenv("LOAD_TEST_CONCURRENCY", "200"))
+LOAD_TEST_REQUESTS = int(os.getenv("LOAD_TEST_REQUESTS", "5000"))
+LOAD_TEST_TICKERS = os.getenv("LOAD_TEST_TICKERS", "AAPL,MSFT").split(",")
+LOAD_TEST_PATHS = os.getenv(
+    "LOAD_TEST_PATHS",
+    "/stock/{ticker}/highest-price,/stock/{ticker}/closing-price,/stock/{ticker}/all-rows,/stock/{ticker}/ai-news",
+).split(",")
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else float("nan")
+
+
+async def run_endpoint(client, path, requests, concurrency):
+    """
+    Fire `requests` GETs with `concurrency` clients in flight.
+
+    Returns:
+    - dict: Latency percentiles (ms), throughput and error count.
+    """
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            url = path.format(ticker=LOAD_TEST_TICKERS[i % len(LOAD_TEST_TICKERS)])
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "rps": requests / elapsed,
+        "errors": errors,
+    }
+
+
+async def main():
+    limits = httpx.Limits(max_connections=LOAD_TEST_CONCURRENCY, max_keepalive_connections=LOAD_TEST_CONCURRENCY)
+    for base_url in LOAD_TEST_URLS:
+        print(f"\n{base_url}  ({LOAD_TEST_CONCURRENCY} concurrent clients, {LOAD_TEST_REQUESTS} requests each)")
+        print(f"{'path':<36} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            for path in LOAD_TEST_PATHS:
+                result = await run_endpoint(client, path, LOAD_TEST_REQUESTS, LOAD_TEST_CONCURRENCY)
+                print(f"{path:<36} {result['p50_ms']:9.1f} {result['p99_ms']:9.1f} "
+                      f"{result['rps']:9.1f} {result['errors']:7d}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,361 @@
+"""
+Offline benchmark suite for the ingest and API hot paths, with results compared against a
+stored baseline.
+
+Every external service is replaced by a local stand-in from benchmarks.fakes:
+- yfinance: FakeHistoryProvider's synthetic bars (yfinance.Ticker is patched);
+- MySQL: SQLiteMySQL, an in-process SQLite database behind fake mysql.connector and
+  aiomysql pools, so db_connector and async_db run unchanged;
+- MongoDB: mongomock, with AsyncMongoCollection in front of it for the API;
+- Gemini: StubGenerativeModel;
+- news pages: the recorded pages in benchmarks/fixtures and fakes.article_html.
+
+Cases:
+- fetch_stock_data: the concurrent fetch pipeline writing to the database;
+- save_to_mysql/<strategy>: one ticker's bars upserted, with ticker_stats refreshed;
+- query_stock_data: a ticker's rows decoded into a DataFrame;
+- route <path>: one request to each FastAPI route (response, LLM and indicator caches
+  off, so every request does the full work);
+- save_news_to_mongo: scraped articles scored, chunked and upserted;
+- text_scraper/parse_plain: TextScraper's article extraction on saved pages.
+
+Each case runs once to warm up, then BENCH_REPEAT times; the median is reported. The
+numbers include the stand-ins (SQLite instead of MySQL), so they are for comparing
+revisions of this code on one machine, not for sizing a deployment.
+
+Usage (from the repository root; needs mongomock):
+    python -m benchmarks.suite
+    BENCH_UPDATE_BASELINE=1 python -m benchmarks.suite   # record a new baseline
+
+Environment:
+- BENCH_OUTPUT: results file (default 'bench_results.json').
+- BENCH_BASELINE: baseline to compare with (default benchmarks/baseline.json).
+- BENCH_UPDATE_BASELINE: '1' to also write the results as the new baseline.
+- BENCH_MAX_REGRESSION: allowed slowdown of a case's median vs the baseline (default 0.25,
+  i.e. 25%); slower cases are reported and the exit status is 1.
+- BENCH_MIN_DELTA_MS: slowdowns smaller than this are ignored as timer noise (default 2).
+- BENCH_ONLY: comma-separated case name prefixes to run (default: all).
+- BENCH_REPEAT: timed runs per case (default 5).
+- BENCH_TICKERS / BENCH_ROWS: tickers stored and bars per ticker (defaults 10 and 20,000).
+- BENCH_FETCH_TICKERS / BENCH_FETCH_ROWS: tickers and bars per fetch_stock_data run
+  (defaults 50 and 500).
+- BENCH_NEWS_ARTICLES: articles per save_news_to_mongo run (default 500).
+- BENCH_PARSE_PAGES: pages per TextScraper run (default 200).
+"""
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import yfinance
+
+from benchmarks.fakes import (AsyncMongoCollection, FakeHistoryProvider, SQLiteMySQL, StubGenerativeModel,
+                              article_html, news_corpus, synthetic_history)
+
+BENCH_OUTPUT = os.getenv("BENCH_OUTPUT", "bench_results.json")
+BENCH_BASELINE = os.getenv("BENCH_BASELINE", os.path.join(os.path.dirname(__file__), "baseline.json"))
+BENCH_UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE", "0") == "1"
+BENCH_MAX_REGRESSION = float(os.getenv("BENCH_MAX_REGRESSION", "0.25"))
+BENCH_MIN_DELTA_MS = float(os.getenv("BENCH_MIN_DELTA_MS", "2"))
+BENCH_ONLY = [prefix for prefix in os.getenv("BENCH_ONLY", "").split(",") if prefix]
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+BENCH_TICKERS = int(os.getenv("BENCH_TICKERS", "10"))
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", "20000"))
+BENCH_FETCH_TICKERS = int(os.getenv("BENCH_FETCH_TICKERS", "50"))
+BENCH_FETCH_ROWS = int(os.getenv("BENCH_FETCH_ROWS", "500"))
+BENCH_NEWS_ARTICLES = int(os.getenv("BENCH_NEWS_ARTICLES", "500"))
+BENCH_PARSE_PAGES = int(os.getenv("BENCH_PARSE_PAGES", "200"))
+
+# The settings a baseline is only comparable under
+CONFIG = {
+    "repeat": BENCH_REPEAT, "tickers": BENCH_TICKERS, "rows": BENCH_ROWS, "fetch_tickers": BENCH_FETCH_TICKERS,
+    "fetch_rows": BENCH_FETCH_ROWS, "news_articles": BENCH_NEWS_ARTICLES, "parse_pages": BENCH_PARSE_PAGES,
+}
+
+# Read by the application modules at import (they are imported lazily, below): no
+# migrations (the stand-in has the final schema), no fetch rate limit, and caches of size 0
+for name, value in {"MYSQL_AUTO_MIGRATE": "0", "FETCH_RATE_LIMIT": "0", "RESPONSE_CACHE_SIZE": "0",
+                    "LLM_CACHE_SIZE": "0", "INDICATOR_CACHE_SIZE": "0", "NEWS_EMBEDDINGS": "0"}.items():
+    os.environ.setdefault(name, value)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+TICKERS = [f"BENCH{i}" for i in range(BENCH_TICKERS)]
+QUESTION = "What is the trend this year?"
+# Query strings for the routes that need some; every other route is requested bare
+ROUTE_QUERIES = {
+    "/stocks/closing-price": f"tickers={','.join(TICKERS)}",
+    "/stocks/ohlc": f"tickers={','.join(TICKERS[:3])}",
+    "/stock/{ticker}/ohlc": "interval=1d&indicators=sma20,ema50,rsi14,atr14",
+}
+# Same route, other code paths worth their own case
+ROUTE_VARIANTS = [
+    "/stock/{ticker}/all-rows?format=csv",
+    "/stock/{ticker}/all-rows?limit=1000",
+    "/stock/{ticker}/highest-price?start=2022-02-01&end=2022-06-30",
+]
+
+
+def measure(run, setup=None, items=None):
+    """
+    Time run(setup()) after one warm-up, BENCH_REPEAT times; the setup is not timed.
+
+    Returns:
+    - dict: Median and min seconds, and items per second at the median when items is given.
+    """
+    timings = []
+    for attempt in range(BENCH_REPEAT + 1):
+        state = setup() if setup is not None else None
+        # The application prints progress; keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            run(state)
+            elapsed = time.perf_counter() - started
+        if attempt:
+            timings.append(elapsed)
+    result = {"median_s": statistics.median(timings), "min_s": min(timings), "runs": len(timings)}
+    if items:
+        result["items"] = items
+        result["items_per_s"] = items / result["median_s"]
+    return result
+
+
+class Suite:
+    """The stand-ins, seeded with BENCH_TICKERS x BENCH_ROWS bars and a news corpus."""
+
+    def __init__(self):
+        self.database = SQLiteMySQL().install()
+        self.provider = FakeHistoryProvider(latency=0, rows=BENCH_FETCH_ROWS)
+        yfinance.Ticker = self.provider.ticker
+        self.mongo = mongomock.MongoClient()["stock_news_db"]
+        self.model = StubGenerativeModel(base_latency=0, latency_per_1k_tokens=0)
+        self.runs = 0
+
+        import db_connector
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_connector.save_frames_to_mysql(
+                [(ticker, synthetic_history(BENCH_ROWS, seed=i, start="2022-01-03")) for i, ticker in enumerate(TICKERS)],
+                strategy="multirow")
+            self.save_news(self.mongo["news"], self.mongo["news_seen"], self.articles(BENCH_NEWS_ARTICLES, "seed"))
+        # save_news_to_mongo reports errors by printing them; a run that stores nothing is no benchmark
+        if not self.mongo["news"].count_documents({}):
+            raise RuntimeError("save_news_to_mongo stored no articles (mongomock and pymongo versions?)")
+
+    def unique(self, prefix):
+        self.runs += 1
+        return f"{prefix}{self.runs}"
+
+    @staticmethod
+    def articles(count, prefix):
+        """(items as the crawler yields them, news_index) for `count` articles about TICKERS[0]."""
+        from news_store import url_hash
+
+        texts = news_corpus(count, keywords=["artificial intelligence", "machine learning", "AI", "GPU"],
+                            keyword_rate=0.01)
+        items, news_index = [], {}
+        for i, text in enumerate(texts):
+            url = f"https://finance.example.com/{prefix}/article/{i}"
+            items.append({"url": url, "text": text, "tier": "http"})
+            news_index[url_hash(url)] = {"url": url, "tickers": [TICKERS[0]],
+                                         "published_at": datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=i)}
+        return items, news_index
+
+    @staticmethod
+    def save_news(collection, seen_collection, articles):
+        import stock_news_fetcher
+
+        stock_news_fetcher.collection = collection
+        stock_news_fetcher.seen_collection = seen_collection
+        stock_news_fetcher.save_news_to_mongo(*articles)
+
+    def drop_written(self):
+        """Remove what a write case stored, so the read cases only see the seeded tickers."""
+        placeholders = ", ".join(["%s"] * len(TICKERS))
+        for table in ("stock_prices", "ticker_stats", "ticker_writes"):
+            self.database.run(f"DELETE FROM {table} WHERE ticker NOT IN ({placeholders})", TICKERS)
+        self.database.commit()
+
+    def fetch_stock_data(self):
+        from stock_fetcher import fetch_stock_data
+
+        def setup():
+            return [self.unique("F") for _ in range(BENCH_FETCH_TICKERS)]
+
+        result = measure(lambda tickers: fetch_stock_data(tickers, "1mo", "db"), setup,
+                         items=BENCH_FETCH_TICKERS * BENCH_FETCH_ROWS)
+        self.drop_written()
+        return result
+
+    def save_to_mysql(self, strategy):
+        from db_connector import save_to_mysql
+
+        data = synthetic_history(BENCH_ROWS, start="2022-01-03")
+        result = measure(lambda ticker: save_to_mysql(data, ticker, strategy=strategy), lambda: self.unique("W"),
+                         items=BENCH_ROWS)
+        self.drop_written()
+        return result
+
+    def query_stock_data(self):
+        from fastapi_app import query_stock_data
+
+        return measure(lambda _: asyncio.run(query_stock_data(TICKERS[0])), items=BENCH_ROWS)
+
+    def save_news_to_mongo(self):
+        def setup():
+            client = mongomock.MongoClient()["stock_news_db"]
+            return client["news"], client["news_seen"], self.articles(BENCH_NEWS_ARTICLES, self.unique("N"))
+
+        return measure(lambda state: self.save_news(*state), setup, items=BENCH_NEWS_ARTICLES)
+
+    def text_scraper(self):
+        from scrapy.http import HtmlResponse, Request
+        from scrapy.utils.test import get_crawler
+
+        from scrapy_news_spider import TextScraper
+
+        pages = [open(path, "rb").read() for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))]
+        pages += [article_html(i).encode() for i in range(max(0, BENCH_PARSE_PAGES - len(pages)))]
+        urls = [f"https://finance.example.com/article/{i}" for i in range(len(pages))]
+        responses = [HtmlResponse(url, body=body, encoding="utf-8", request=Request(url))
+                     for url, body in zip(urls, pages[:BENCH_PARSE_PAGES])]
+        spider = TextScraper.from_crawler(get_crawler(TextScraper))
+
+        def run(_):
+            for response in responses:
+                list(spider.parse_plain(response))
+
+        return measure(run, items=len(responses))
+
+    def routes(self):
+        """One case per FastAPI route (and ROUTE_VARIANTS), through the app's lifespan."""
+        from fastapi.routing import APIRoute
+        from fastapi.testclient import TestClient
+
+        import fastapi_app
+
+        collection = AsyncMongoCollection(self.mongo["news"])
+        fastapi_app.mongo_backend.factory = lambda: collection
+        fastapi_app.gemini_backend.factory = lambda: self.model
+
+        paths = []
+        for route in fastapi_app.app.routes:
+            if isinstance(route, APIRoute) and "GET" in route.methods:
+                query = ROUTE_QUERIES.get(route.path)
+                paths.append(f"{route.path}?{query}" if query else route.path)
+        paths += ROUTE_VARIANTS
+
+        results = {}
+        with TestClient(fastapi_app.app) as client:
+            deadline = time.monotonic() + 30
+            while client.get("/ready").status_code != 200:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Stand-in backends not ready: {client.get('/ready').json()}")
+                time.sleep(0.05)
+            for path in paths:
+                url = path.format(ticker=TICKERS[0], query=QUESTION)
+
+                def run(_, url=url):
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"GET {url}: {response.status_code} {response.text[:200]}")
+
+                results[f"route {path}"] = measure(run)
+        return results
+
+    def cases(self):
+        """Case name -> callable returning its result (or a dict of named results)."""
+        return {
+            "fetch_stock_data": self.fetch_stock_data,
+            "save_to_mysql/executemany": lambda: self.save_to_mysql("executemany"),
+            "save_to_mysql/multirow": lambda: self.save_to_mysql("multirow"),
+            "query_stock_data": self.query_stock_data,
+            "route ": self.routes,
+            "save_news_to_mongo": self.save_news_to_mongo,
+            "text_scraper/parse_plain": self.text_scraper,
+        }
+
+
+def selected(name):
+    return not BENCH_ONLY or any(name.startswith(prefix) or prefix.startswith(name) for prefix in BENCH_ONLY)
+
+
+def metadata():
+    import numpy
+    import pandas
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "numpy": numpy.__version__, "pandas": pandas.__version__, "config": CONFIG}
+
+
+def compare(results, baseline):
+    """
+    Print every case against the baseline.
+
+    Returns:
+    - list: Names of the cases that regressed beyond BENCH_MAX_REGRESSION.
+    """
+    previous = baseline.get("results", {}) if baseline else {}
+    comparable = baseline is not None and baseline.get("meta", {}).get("config") == CONFIG
+    if baseline is not None and not comparable:
+        print("The baseline was recorded with other BENCH_* settings; not comparing")
+    regressions = []
+    print(f"{'case':<60} {'median ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        median_ms = result["median_s"] * 1000
+        line = f"{name:<60} {median_ms:10.2f}"
+        if comparable and name in previous:
+            baseline_ms = previous[name]["median_s"] * 1000
+            change = median_ms / baseline_ms - 1
+            line += f" {baseline_ms:10.2f} {change:+8.1%}"
+            if change > BENCH_MAX_REGRESSION and median_ms - baseline_ms > BENCH_MIN_DELTA_MS:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main():
+    suite = Suite()
+    results = {}
+    for name, case in suite.cases().items():
+        if not selected(name):
+            continue
+        result = case()
+        if "median_s" in result:
+            results[name] = result
+        else:
+            results.update((case_name, r) for case_name, r in result.items() if selected(case_name))
+
+    report = {"meta": metadata(), "results": results}
+    with open(BENCH_OUTPUT, "w") as f:
+        json.dump(report, f, indent=2)
+    baseline = None
+    if os.path.exists(BENCH_BASELINE):
+        with open(BENCH_BASELINE) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline)
+    if BENCH_UPDATE_BASELINE:
+        with open(BENCH_BASELINE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {BENCH_BASELINE}")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {BENCH_MAX_REGRESSION:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
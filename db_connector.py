@@ -1,20 +1,44 @@
 import mysql.connector
 from mysql.connector import pooling
+import io
 import os
+import tempfile
+import threading
+from itertools import repeat
+import numpy as np
 import pandas as pd
 import time
+from instrumentation import DATAFRAME_BUILD_SECONDS, DATAFRAME_ROWS, DB_QUERY_SECONDS, record_write, timed
+from schema_migrations import apply_migrations
+from ticker_stats import refresh_ticker_stats
 
 # Get MySQL connection info from environment variables
 MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
 MYSQL_USER = os.getenv('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', 'root_password')
 MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'stock_data')
+MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', '5'))
+# Apply pending schema migrations (schema_migrations.py) when the pool is created
+MYSQL_AUTO_MIGRATE = os.getenv('MYSQL_AUTO_MIGRATE', '1') == '1'
+
+# How save_to_mysql sends rows: "executemany", "multirow" or "load_data"
+MYSQL_WRITE_STRATEGY = os.getenv('MYSQL_WRITE_STRATEGY', 'executemany')
+# Rows per INSERT statement (executemany / multirow)
+MYSQL_WRITE_CHUNK_SIZE = int(os.getenv('MYSQL_WRITE_CHUNK_SIZE', '1000'))
+# Frames with at least this many rows use LOAD DATA LOCAL INFILE (0 = never). Needs
+# MYSQL_LOCAL_INFILE=1 here and local_infile enabled on the server.
+MYSQL_LOAD_DATA_MIN_ROWS = int(os.getenv('MYSQL_LOAD_DATA_MIN_ROWS', '0'))
+MYSQL_LOCAL_INFILE = os.getenv('MYSQL_LOCAL_INFILE', '0') == '1'
 
 
 # MySQL Connection Pool Configuration
-def create_connection_pool():
+def create_connection_pool(max_retries=5, retry_delay=5):
     """
     Create and return a MySQL connection pool.
+
+    Parameters:
+    - max_retries (int): Connection attempts before giving up.
+    - retry_delay (float): Seconds between attempts.
     """
     dbconfig = {
         "user": MYSQL_USER,
@@ -22,12 +46,10 @@ def create_connection_pool():
         "host": MYSQL_HOST,
         "database": MYSQL_DATABASE,
         "pool_name": "stock_pool",
-        "pool_size": 5
+        "pool_size": MYSQL_POOL_SIZE,
+        "allow_local_infile": MYSQL_LOCAL_INFILE
     }
 
-    max_retries = 5
-    retry_delay = 5  # seconds
-
     for attempt in range(max_retries):
         try:
             pool = mysql.connector.pooling.MySQLConnectionPool(**dbconfig)
@@ -41,57 +63,424 @@ def create_connection_pool():
                 raise Exception("Failed to connect to MySQL after several attempts")
 
 
-# Global connection pool
-db_pool = create_connection_pool()
+# Global connection pool, created on first use rather than at import, so importing this
+# module never blocks on (or fails because of) the database
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_pool(max_retries=5, retry_delay=5):
+    """
+    Return the shared pool, creating it (and applying pending schema migrations when
+    MYSQL_AUTO_MIGRATE is on) the first time.
+
+    Parameters:
+    - max_retries (int): Connection attempts if the pool doesn't exist yet; the API passes 1
+      and retries from its event loop instead of sleeping in a thread.
+    - retry_delay (float): Seconds between attempts.
+    """
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                pool = create_connection_pool(max_retries, retry_delay)
+                if MYSQL_AUTO_MIGRATE:
+                    migrate_schema(pool)
+                _db_pool = pool
+    return _db_pool
 
 
 def get_connection_from_pool():
     """Get a connection from the pool."""
-    return db_pool.get_connection()
+    return get_pool().get_connection()
+
+
+def migrate_schema(pool=None):
+    """Bring the database schema up to date using a pooled connection."""
+    db_connection = (pool or get_pool()).get_connection()
+    try:
+        applied = apply_migrations(db_connection)
+        if applied:
+            print(f"Applied schema migrations: {applied}")
+    finally:
+        db_connection.close()
+
 
+# Upsert keyed on the (ticker, timestamp) unique key, so overlapping re-fetches replace
+# rows instead of duplicating them
+UPSERT_STOCK_PRICES = """
+INSERT INTO stock_prices (ticker, timestamp, open_price, high_price, low_price, close_price, volume)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    open_price = VALUES(open_price),
+    high_price = VALUES(high_price),
+    low_price = VALUES(low_price),
+    close_price = VALUES(close_price),
+    volume = VALUES(volume)
+"""
 
-def save_to_mysql(data, ticker_symbol):
+LOAD_STOCK_PRICES = """
+LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE stock_prices
+FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n'
+(ticker, timestamp, open_price, high_price, low_price, close_price, volume)
+"""
+
+# Publishes the per-ticker last-write time used to invalidate API caches, with a write
+# counter and the earliest bar the write touched
+TOUCH_TICKER_WRITES = """
+INSERT INTO ticker_writes (ticker, last_write, write_count, min_written) VALUES (%s, NOW(6), 1, %s)
+ON DUPLICATE KEY UPDATE
+    last_write = VALUES(last_write),
+    write_count = write_count + 1,
+    min_written = VALUES(min_written)
+"""
+
+# yfinance columns stored in stock_prices, in UPSERT_STOCK_PRICES order
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def frame_to_rows(data, ticker_symbol):
     """
-    Save the stock data to the MySQL database using a pooled connection.
+    Convert a yfinance history DataFrame into INSERT-ready tuples.
+
+    Works column-wise (one NumPy conversion per column) instead of building a Series per
+    row; NaN prices become None so they are stored as NULL.
 
     Parameters:
-    - data (DataFrame): The stock data to save.
+    - data (DataFrame): The stock data, indexed by timestamp.
     - ticker_symbol (str): The stock ticker symbol.
+
+    Returns:
+    - list: (ticker, timestamp, open, high, low, close, volume) tuples.
+    """
+    index = data.index
+    if getattr(index, 'tz', None) is not None:
+        # Store exchange-local wall-clock time, as the per-row inserts always did
+        index = index.tz_localize(None)
+    timestamps = index.to_pydatetime()
+
+    prices = data[PRICE_COLUMNS].to_numpy(dtype='float64').round(2)
+    values = prices.astype(object)
+    values[np.isnan(prices)] = None
+
+    # Volumes as Python ints (NULL when missing)
+    volume = data['Volume'].to_numpy(dtype='float64') if 'Volume' in data else np.full(len(data), np.nan)
+    missing = np.isnan(volume)
+    volumes = np.where(missing, 0, volume).astype(np.int64).astype(object)
+    volumes[missing] = None
+
+    return list(zip(repeat(ticker_symbol), timestamps, *values.T.tolist(), volumes.tolist()))
+
+
+def _first_timestamp(data):
+    """Earliest bar of a frame, as frame_to_rows stores it (exchange-local wall-clock time)."""
+    first = data.index.min()
+    if getattr(first, 'tzinfo', None) is not None:
+        first = first.tz_localize(None)
+    return first.to_pydatetime()
+
+
+def _chunks(rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def _write_executemany(cursor, rows, chunk_size):
+    # mysql.connector rewrites an INSERT executemany into one multi-row statement per call
+    for chunk in _chunks(rows, chunk_size):
+        cursor.executemany(UPSERT_STOCK_PRICES, chunk)
+
+
+def _write_multirow(cursor, rows, chunk_size):
+    head, values, tail = UPSERT_STOCK_PRICES.partition("VALUES (%s, %s, %s, %s, %s, %s, %s)")
+    placeholder = "(%s, %s, %s, %s, %s, %s, %s)"
+    for chunk in _chunks(rows, chunk_size):
+        query = head + "VALUES " + ", ".join(repeat(placeholder, len(chunk))) + tail
+        cursor.execute(query, [value for row in chunk for value in row])
+
+
+def _write_load_data(cursor, rows):
+    # Serialise to an in-memory CSV first; mysql.connector can only stream LOCAL INFILE from a
+    # path, so the buffer is spilled once to a temp file (on tmpfs when available).
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+
+    tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', dir=tmp_dir) as infile:
+        infile.write(buffer.getvalue())
+        infile.flush()
+        cursor.execute(LOAD_STOCK_PRICES, (infile.name,))
+
+
+def write_stock_rows(cursor, rows, strategy=None, chunk_size=None):
+    """
+    Write prepared stock_prices rows on an open cursor (the caller commits).
+
+    Parameters:
+    - cursor: An open MySQL cursor.
+    - rows (list): Tuples from frame_to_rows.
+    - strategy (str, optional): "executemany", "multirow" or "load_data";
+      defaults to MYSQL_WRITE_STRATEGY, or "load_data" for large frames when enabled.
+    - chunk_size (int, optional): Rows per INSERT statement.
+
+    Returns:
+    - str: The strategy that was used.
     """
+    chunk_size = chunk_size or MYSQL_WRITE_CHUNK_SIZE
+    if strategy is None:
+        strategy = MYSQL_WRITE_STRATEGY
+        if MYSQL_LOAD_DATA_MIN_ROWS and len(rows) >= MYSQL_LOAD_DATA_MIN_ROWS:
+            strategy = "load_data"
+
+    if strategy == "executemany":
+        _write_executemany(cursor, rows, chunk_size)
+    elif strategy == "multirow":
+        _write_multirow(cursor, rows, chunk_size)
+    elif strategy == "load_data":
+        _write_load_data(cursor, rows)
+    else:
+        raise ValueError(f"Unknown MySQL write strategy: {strategy}")
+    return strategy
+
+
+def save_frames_to_mysql(frames, strategy=None, chunk_size=None):
+    """
+    Save several tickers' stock data in one transaction using a pooled connection.
+
+    Rows are upserted on (ticker, timestamp), so saving overlapping data is idempotent.
+    The tickers' ticker_stats rows are recomputed in the same transaction.
+
+    Parameters:
+    - frames (list): (ticker_symbol, DataFrame) pairs.
+    - strategy (str, optional): Write strategy, see write_stock_rows.
+    - chunk_size (int, optional): Rows per INSERT statement.
+
+    Raises:
+    - mysql.connector.Error: When the transaction failed (it is rolled back), so the caller
+      can count the batch's tickers as failed.
+    """
+    db_connection = None
+    cursor = None
     try:
         # Get a connection from the pool
         db_connection = get_connection_from_pool()
         cursor = db_connection.cursor()
 
-        # Prepare SQL query
-        query = """
-        INSERT INTO stock_prices (ticker, timestamp, open_price, high_price, low_price, close_price)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-
-        # Iterate over the DataFrame and insert each row
-        for index, row in data.iterrows():
-            cursor.execute(query, (
-                ticker_symbol,
-                index,
-                row['Open'],
-                row['High'],
-                row['Low'],
-                row['Close']
-            ))
+        started = time.perf_counter()
+        rows = []
+        first_written = {}
+        for ticker_symbol, data in frames:
+            rows.extend(frame_to_rows(data, ticker_symbol))
+            if not data.empty:
+                first = _first_timestamp(data)
+                previous = first_written.get(ticker_symbol)
+                first_written[ticker_symbol] = first if previous is None else min(previous, first)
+            else:
+                first_written.setdefault(ticker_symbol, None)
+        strategy = write_stock_rows(cursor, rows, strategy, chunk_size)
+        cursor.executemany(TOUCH_TICKER_WRITES, list(first_written.items()))
+        refresh_ticker_stats(cursor, list(dict.fromkeys(ticker_symbol for ticker_symbol, _ in frames)))
 
         # Commit changes
         db_connection.commit()
-        print(f"Saved {len(data)} records to the database for ticker: {ticker_symbol}")
+        record_write(strategy, len(rows), time.perf_counter() - started)
+        tickers = ", ".join(ticker_symbol for ticker_symbol, _ in frames)
+        print(f"Saved {len(rows)} records to the database for ticker: {tickers}")
 
     except mysql.connector.Error as e:
         print(f"Error saving to database: {e}")
+        if db_connection is not None and db_connection.is_connected():
+            db_connection.rollback()
+        raise
     finally:
-        if db_connection.is_connected():
-            cursor.close()
+        if db_connection is not None and db_connection.is_connected():
+            if cursor is not None:
+                cursor.close()
             db_connection.close()
 
 
+def save_to_mysql(data, ticker_symbol, strategy=None, chunk_size=None):
+    """
+    Save the stock data to the MySQL database using a pooled connection.
+
+    Parameters:
+    - data (DataFrame): The stock data to save.
+    - ticker_symbol (str): The stock ticker symbol.
+    - strategy (str, optional): Write strategy, see write_stock_rows.
+    - chunk_size (int, optional): Rows per INSERT statement.
+
+    Raises:
+    - mysql.connector.Error: When the rows couldn't be saved.
+    """
+    save_frames_to_mysql([(ticker_symbol, data)], strategy, chunk_size)
+
+
+def get_high_water_marks(tickers):
+    """
+    Latest stored timestamp for each ticker, in one grouped query.
+
+    Parameters:
+    - tickers (list): Stock ticker symbols.
+
+    Returns:
+    - dict: ticker -> datetime of its newest row (tickers without data are absent).
+    """
+    if not tickers:
+        return {}
+    db_connection = get_connection_from_pool()
+    try:
+        cursor = db_connection.cursor()
+        placeholders = ", ".join(["%s"] * len(tickers))
+        cursor.execute(
+            f"SELECT ticker, MAX(timestamp) FROM stock_prices WHERE ticker IN ({placeholders}) GROUP BY ticker",
+            tuple(tickers)
+        )
+        marks = dict(cursor.fetchall())
+        cursor.close()
+        return marks
+    finally:
+        db_connection.close()
+
+
+def get_stored_days(tickers, since):
+    """
+    Calendar days that already have a bar, per ticker.
+
+    Parameters:
+    - tickers (list): Stock ticker symbols.
+    - since (datetime): Only look at rows from this time on.
+
+    Returns:
+    - dict: ticker -> set of dates.
+    """
+    if not tickers:
+        return {}
+    db_connection = get_connection_from_pool()
+    try:
+        cursor = db_connection.cursor()
+        placeholders = ", ".join(["%s"] * len(tickers))
+        cursor.execute(
+            f"SELECT DISTINCT ticker, DATE(timestamp) FROM stock_prices "
+            f"WHERE ticker IN ({placeholders}) AND timestamp >= %s",
+            (*tickers, since)
+        )
+        days = {}
+        for ticker, day in cursor.fetchall():
+            days.setdefault(ticker, set()).add(day)
+        cursor.close()
+        return days
+    finally:
+        db_connection.close()
+
+
+def get_ticker_versions():
+    """
+    Last-write time of every ticker, as published by save_to_mysql.
+
+    Returns:
+    - dict: ticker -> datetime.
+    """
+    db_connection = get_connection_from_pool()
+    try:
+        cursor = db_connection.cursor()
+        cursor.execute("SELECT ticker, last_write FROM ticker_writes")
+        versions = dict(cursor.fetchall())
+        cursor.close()
+        return versions
+    finally:
+        db_connection.close()
+
+
+# Types rows_to_arrays decodes stock_prices columns to; other columns (ticker) stay objects.
+# Volume is float64 in the arrays (NaN for NULL) and a nullable Int64 in rows_to_frame.
+STOCK_COLUMN_DTYPES = {
+    'id': 'int64',
+    'timestamp': 'datetime64[ns]',
+    'open_price': 'float64',
+    'high_price': 'float64',
+    'low_price': 'float64',
+    'close_price': 'float64',
+    'volume': 'float64',
+}
+
+
+def rows_to_arrays(columns, rows, dtypes=STOCK_COLUMN_DTYPES):
+    """
+    Decode cursor rows column by column into typed NumPy arrays.
+
+    The rows are laid out once as a 2-D object array, and each column is then parsed by a
+    single NumPy cast: prices to float64 (NaN for NULL), timestamps to datetime64[ns]
+    (NaT for NULL). Values may be the text MySQL sends (async_db.fetch_rows(text=True)),
+    or Decimal/datetime objects from a tuple cursor. No per-row dicts and no object-dtype
+    Decimal columns are built.
+
+    Parameters:
+    - columns (list): Column names, in row order.
+    - rows (list): Row tuples.
+    - dtypes (dict): Column name -> NumPy dtype; other columns are kept as objects.
+
+    Returns:
+    - dict: Column name -> array.
+    """
+    if not rows:
+        return {name: np.empty(0, dtype=dtypes.get(name, object)) for name in columns}
+    DATAFRAME_ROWS.inc(len(rows))
+    with timed(DATAFRAME_BUILD_SECONDS, "dataframe_build"):
+        values = np.array(rows, dtype=object)
+        arrays = {}
+        for position, name in enumerate(columns):
+            column = values[:, position]
+            dtype = dtypes.get(name)
+            if dtype is None:
+                arrays[name] = column.copy()
+                continue
+            missing = np.equal(column, None)
+            if dtype.startswith('datetime64') and not missing.all() and not isinstance(column[np.argmin(missing)], str):
+                # datetime objects from a tuple cursor: pandas converts those in C, NumPy one by one
+                arrays[name] = pd.to_datetime(column).to_numpy().astype(dtype)
+                continue
+            if missing.any():
+                column = column.copy()
+                column[missing] = np.datetime64('NaT') if dtype.startswith('datetime64') else np.nan
+            arrays[name] = column.astype(dtype)
+    return arrays
+
+
+def rows_to_frame(columns, rows):
+    """
+    Build a DataFrame from cursor rows with typed columns (see rows_to_arrays).
+
+    Returns:
+    - pd.DataFrame: float64 prices, datetime64[ns] timestamps and a nullable Int64 volume.
+    """
+    arrays = rows_to_arrays(columns, rows)
+    if 'volume' in arrays:
+        arrays['volume'] = pd.array(arrays['volume'], dtype='Int64')
+    return pd.DataFrame(arrays, copy=False)
+
+
+def fetch_frame(query, params=()):
+    """
+    Run a query on a pooled connection with a tuple cursor and return a typed DataFrame.
+
+    Returns:
+    - pd.DataFrame: See rows_to_frame.
+    """
+    db_connection = get_connection_from_pool()
+    try:
+        cursor = db_connection.cursor()
+        with timed(DB_QUERY_SECONDS, "mysql.fetch_frame", operation="fetch_frame"):
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        cursor.close()
+        return rows_to_frame(columns, rows)
+    finally:
+        db_connection.close()
+
+
 def save_to_csv(data, ticker_symbol):
     """Save stock data to a CSV file."""
     filename = f"stock_data_{ticker_symbol}.csv"
@@ -0,0 +1,138 @@
+import asyncio
+import inspect
+import os
+import time
+
+# Delay between warm-up attempts of an unavailable backend, doubling up to the maximum
+STARTUP_RETRY_DELAY = float(os.getenv("STARTUP_RETRY_DELAY", "1"))  # seconds
+STARTUP_RETRY_MAX_DELAY = float(os.getenv("STARTUP_RETRY_MAX_DELAY", "30"))  # seconds
+# How long /ready trusts a backend's last successful check before running it again, and
+# how long a check may take before the backend counts as unavailable
+READY_CHECK_TTL = float(os.getenv("READY_CHECK_TTL", "5"))  # seconds
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "2"))  # seconds
+
+
+async def _call(function, *args):
+    """Await a coroutine function; run a plain one in a worker thread so it can't block the loop."""
+    if inspect.iscoroutinefunction(function):
+        return await function(*args)
+    return await asyncio.to_thread(function, *args)
+
+
+class Dependency:
+    """
+    A backend client created on first use (or by warm-up), with its readiness state.
+
+    Parameters:
+    - name (str): Shown in /health and /ready.
+    - factory (callable): Builds the client; blocking factories run in a worker thread.
+    - check (callable, optional): client -> None, raises if the backend doesn't answer.
+    - required (bool): Whether /ready waits for this backend.
+    """
+
+    def __init__(self, name, factory, check=None, required=True):
+        self.name = name
+        self.factory = factory
+        self.check = check
+        self.required = required
+        self.client = None
+        self.state = "pending"
+        self.error = None
+        self.attempts = 0
+        self.ready_seconds = None
+        self.checked_at = None
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        """The client, created now if warm-up hasn't done so yet."""
+        if self.client is None:
+            async with self._lock:
+                if self.client is None:
+                    self.client = await _call(self.factory)
+        return self.client
+
+    async def warm_up(self, started):
+        """Create and check the client, retrying with backoff until it answers."""
+        delay = STARTUP_RETRY_DELAY
+        while True:
+            self.attempts += 1
+            try:
+                client = await self.get()
+                if self.check is not None:
+                    await _call(self.check, client)
+            except Exception as e:
+                self.state, self.error = "unavailable", str(e)
+                print(f"{self.name} not available (attempt {self.attempts}), retrying in {delay:g}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, STARTUP_RETRY_MAX_DELAY)
+                continue
+            self.state, self.error = "ready", None
+            self.ready_seconds = time.perf_counter() - started
+            self.checked_at = time.monotonic()
+            return
+
+    async def recheck(self, ttl=READY_CHECK_TTL):
+        """
+        Run the check again if the last one is older than ttl, so a backend lost after
+        warm-up stops counting as ready (and counts again once it answers).
+        """
+        # Still warming up: the warm-up task keeps the state current
+        if self.ready_seconds is None or self.check is None:
+            return
+        if self.checked_at is not None and time.monotonic() - self.checked_at < ttl:
+            return
+        # Set first so concurrent /ready requests share this check
+        self.checked_at = time.monotonic()
+        try:
+            await asyncio.wait_for(_call(self.check, self.client), READY_CHECK_TIMEOUT)
+        except Exception as e:
+            self.state, self.error = "unavailable", str(e) or type(e).__name__
+            return
+        self.state, self.error = "ready", None
+
+    def status(self):
+        status = {"state": self.state, "required": self.required, "attempts": self.attempts}
+        if self.error is not None:
+            status["error"] = self.error
+        if self.ready_seconds is not None:
+            status["ready_after_s"] = round(self.ready_seconds, 3)
+        return status
+
+
+class Dependencies:
+    """
+    The application's backends, warmed up in the background from the lifespan.
+
+    Startup doesn't wait for any of them, so one unavailable backend neither delays the
+    others nor the endpoints that don't need it; /ready tells a load balancer when the
+    required ones answer.
+    """
+
+    def __init__(self):
+        self.dependencies = {}
+        self._tasks = []
+
+    def add(self, dependency):
+        self.dependencies[dependency.name] = dependency
+        return dependency
+
+    def start(self):
+        started = time.perf_counter()
+        self._tasks = [asyncio.create_task(d.warm_up(started)) for d in self.dependencies.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # The pools themselves are closed by async_db.close()
+        for dependency in self.dependencies.values():
+            dependency.client = None
+
+    async def ready(self):
+        """Whether every required backend answers, re-checking those checked over READY_CHECK_TTL ago."""
+        required = [d for d in self.dependencies.values() if d.required]
+        await asyncio.gather(*(d.recheck() for d in required))
+        return all(d.state == "ready" for d in required)
+
+    def status(self):
+        return {name: dependency.status() for name, dependency in self.dependencies.items()}
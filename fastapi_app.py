@@ -1,88 +1,286 @@
-from fastapi import FastAPI, HTTPException
-import mysql.connector
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+import json
+from typing import Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 import os
-from pymongo import MongoClient
-import pandas as pd
-import google.generativeai as genai
-from db_connector import get_connection_from_pool  # Import the DB connection from db_connector.py
+import time
+import async_db  # Async MySQL pool and Mongo client, both created on first use
+import db_connector
+from db_connector import rows_to_frame
+from dependencies import Dependencies, Dependency
+from stock_queries import READ_BACKEND, build_rows_query, query_price_row_async, query_ticker_stats_async
+from batch_prices import TooManyRows, batch_closing_prices, batch_ohlc, parse_tickers
+from indicators import INTERVALS, IndicatorCache, ohlc_with_indicators, parse_indicators
+from row_stream import ROW_FORMATS, encode_row_stream, iter_row_batches, negotiate_encoding, negotiate_format, read_parquet_rows
+from parquet_store import get_ticker_versions as get_parquet_ticker_versions
+from response_cache import create_response_cache, TickerVersions, cache_key
+from llm_context import build_prompt, count_tokens, price_context, select_chunks
+from news_index import NEWS_EMBEDDINGS, EmbeddingStore, NewsRetriever
+from llm_cache import create_llm_cache, llm_cache_key
+from instrumentation import (HTTP_REQUEST_SECONDS, LLM_CALL_SECONDS, LLM_PROMPT_TOKENS, metrics_payload, profiled,
+                             timed)
 
-# MongoDB connection
-MONGO_URI = os.getenv("MONGO_URI")
+# Gemini model for the /all-rows/{query} and /ai-news/{query} answers
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# Backends /ready waits for (comma-separated: mysql, mongo, gemini, news_index); the others
+# are reported by /health and /ready but don't hold back traffic
+READY_REQUIRES = os.getenv("READY_REQUIRES", "mysql").split(",")
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
-db = client.get_database()
-news_collection = db["news"]
 
-app = FastAPI()
+async def connect_mysql():
+    # The sync pool applies pending schema migrations the queries rely on; one attempt per
+    # warm-up round, the retries are scheduled on the event loop
+    await asyncio.to_thread(db_connector.get_pool, 1)
+    return await async_db.get_mysql_pool()
 
-#GEmini key
-APIKey = os.getenv('GEMINI_KEY')
-genai.configure(api_key=APIKey)
-model = genai.GenerativeModel("gemini-1.5-flash")
 
-# Helper function to query stock data from MySQL
-def query_stock_data(ticker: str):
+async def ping_mysql(pool):
+    await async_db.fetch_one("SELECT 1")
+
+
+async def connect_mongo():
+    # MongoDB news collection (async client); created on the event loop it will run on
+    return async_db.get_news_collection()
+
+
+async def ping_mongo(collection):
+    await collection.database.command("ping")
+
+
+def create_model():
+    # Importing the Gemini SDK is slow, so it happens here rather than at startup
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv('GEMINI_KEY'))
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+async def create_news_retriever():
+    # Per-ticker BM25 (and optionally embedding) index over the stored news chunks
+    return NewsRetriever(await mongo_backend.get(), EmbeddingStore() if NEWS_EMBEDDINGS else None)
+
+
+# Every client is created lazily: importing this module (and forking workers) opens no
+# connection, and the lifespan warms them up in the background, each on its own
+dependencies = Dependencies()
+mysql_backend = dependencies.add(Dependency("mysql", connect_mysql, ping_mysql, required="mysql" in READY_REQUIRES))
+mongo_backend = dependencies.add(Dependency("mongo", connect_mongo, ping_mongo, required="mongo" in READY_REQUIRES))
+gemini_backend = dependencies.add(Dependency("gemini", create_model, required="gemini" in READY_REQUIRES))
+news_backend = dependencies.add(Dependency("news_index", create_news_retriever,
+                                           required="news_index" in READY_REQUIRES))
+
+
+async def require_mysql():
+    # Routes reading MySQL go through the dependency first: a request that arrives before
+    # warm-up has finished waits for the pool and the schema migrations instead of querying
+    # tables that may not exist yet
+    if READ_BACKEND != "mysql":
+        return
+    try:
+        await mysql_backend.get()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"MySQL is not available: {e}")
+
+
+# For the routes that read MySQL (with READ_BACKEND=mysql)
+uses_mysql = [Depends(require_mysql)]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    dependencies.start()
+    yield
+    await dependencies.stop()
+    await async_db.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    # Latency per route template (not per ticker), up to the response headers for streamed
+    # bodies; with PROFILE=1 also a profile report per request
+    started = time.perf_counter()
+    with profiled(f"{request.method}-{request.url.path}", async_mode=True):
+        response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(route.path if route is not None else "unmatched",
+                                response.status_code).observe(time.perf_counter() - started)
+    return response
+
+
+# Upper bound for ?limit= on /all-rows pages
+ROWS_PAGE_MAX = int(os.getenv("ROWS_PAGE_MAX", "100000"))
+
+
+
+async def load_ticker_versions():
+    # Last-write times from the backend the prices are read from: MySQL's ticker_writes, or
+    # the newest file of each ticker's partition in the Parquet dataset
+    if READ_BACKEND == "parquet":
+        return await asyncio.to_thread(get_parquet_ticker_versions)
+    return await async_db.get_ticker_versions()
+
+
+# Response cache for the stock endpoints; keys include the ticker's last-write time, so a
+# write for that ticker invalidates its cached responses
+response_cache = create_response_cache()
+ticker_versions = TickerVersions(load_ticker_versions)
+not_modified_count = 0
+# Gemini answers by (endpoint, ticker, normalised query, data version); identical concurrent
+# questions share one model call
+llm_cache = create_llm_cache()
+# Resampled bars with their indicator columns per ticker, extended as new bars are saved
+indicator_cache = IndicatorCache()
+
+
+def _json_response(body, etag):
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _etag_matches(if_none_match, etag):
     """
-    Query stock data for a specific ticker symbol from the MySQL database.
+    Whether an If-None-Match header matches the ETag: '*' or one of its comma-separated
+    tags, compared whole and weakly (a W/ prefix is ignored), as If-None-Match requires.
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+async def lookup_cached_response(request: Request, ticker):
+    """
+    Look up a cached response for this request and the ticker's current data version.
+
+    The cache key doubles as the ETag, so a matching If-None-Match gets a 304 without
+    touching the cache or the database.
 
     Parameters:
-    - ticker (str): Stock ticker symbol.
+    - ticker (str | list): Ticker symbol, or every symbol of a batch request (a write to any
+      of them invalidates the response).
 
     Returns:
-    - pd.DataFrame: The queried stock data.
+    - tuple: (Response or None, cache key for store_cached_response; None when the data
+      version is unknown, and the response is neither cached nor given an ETag).
     """
-    try:
-        # Get a connection from the pool
-        db_connection = get_connection_from_pool()
-        cursor = db_connection.cursor(dictionary=True)
+    global not_modified_count
+    tickers = [ticker] if isinstance(ticker, str) else ticker
+    versions = [await ticker_versions.aget(t) for t in tickers]
+    if None in versions:
+        return None, None
+    key = cache_key(request.url.path, request.query_params.multi_items(), ",".join(versions))
+    etag = f'"{key}"'
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        not_modified_count += 1
+        return Response(status_code=304, headers={"ETag": etag}), key
+    body = await response_cache.aget(key)
+    if body is not None:
+        return _json_response(body, etag), key
+    return None, key
+
+
+async def store_cached_response(key, payload, encode=True):
+    """
+    Serialise payload once, cache the bytes and return them as the response. A shared
+    (Redis) tier is written from a worker thread, like it is read in lookup_cached_response.
 
-        # Prepare SQL query to fetch stock data for the ticker
-        query = """
-        SELECT * FROM stock_prices WHERE ticker = %s
-        """
+    Parameters:
+    - encode (bool): Run jsonable_encoder first; batch payloads are plain lists already and
+      skip it, as it walks every value.
+    """
+    body = json.dumps(jsonable_encoder(payload) if encode else payload).encode()
+    if key is None:
+        return Response(content=body, media_type="application/json")
+    await response_cache.aset(key, body)
+    return _json_response(body, f'"{key}"')
 
-        # Execute the query
-        cursor.execute(query, (ticker,))
-        result = cursor.fetchall()
 
-        # Convert result to DataFrame for easy manipulation
-        df = pd.DataFrame(result)
+async def generate_answer(endpoint, prompt):
+    """
+    Ask Gemini, recording the call's latency and estimated prompt size.
 
-        # Close the connection
-        cursor.close()
-        db_connection.close()
+    Parameters:
+    - endpoint (str): 'all-rows' or 'ai-news', the metrics label.
+    - prompt (str): The full prompt.
 
-        return df
+    Returns:
+    - The model response.
+    """
+    LLM_PROMPT_TOKENS.labels(endpoint).observe(count_tokens(prompt))
+    model = await gemini_backend.get()
+    with timed(LLM_CALL_SECONDS, "gemini.generate", outcome=True, endpoint=endpoint):
+        return await model.generate_content_async(prompt)
+
+
+# Helper function to query stock data from MySQL
+async def query_stock_data(ticker: str, after_timestamp: Optional[datetime] = None, limit: Optional[int] = None):
+    """
+    Query stock data for a specific ticker symbol from the MySQL database.
+
+    Parameters:
+    - ticker (str): Stock ticker symbol.
+    - after_timestamp (datetime, optional): Only rows after this time (keyset pagination).
+    - limit (int, optional): Maximum number of rows.
+
+    Returns:
+    - pd.DataFrame: The queried stock data, with typed columns (see db_connector.rows_to_frame).
+    """
+    if READ_BACKEND == "parquet":
+        # Served from the Parquet/Arrow dataset written with OUTPUT=parquet, skipping MySQL
+        table = await asyncio.to_thread(read_parquet_rows, ticker, after_timestamp, limit)
+        return table.to_pandas()
 
-    except mysql.connector.Error as e:
+    try:
+        # Fetch stock data for the ticker on a pooled async connection, as text rows
+        columns, rows = await async_db.fetch_rows(*build_rows_query(ticker, after_timestamp, limit), text=True)
+
+        # Parse them column by column into float64 prices and datetime64 timestamps
+        return rows_to_frame(columns, rows)
+
+    except async_db.MySQLError as e:
         raise HTTPException(status_code=500, detail=f"Error querying the database: {e}")
 
 
 # Route to get the highest price for a specific stock ticker
-@app.get("/stock/{ticker}/highest-price")
-def get_highest_price(ticker: str):
+@app.get("/stock/{ticker}/highest-price", dependencies=uses_mysql)
+async def get_highest_price(request: Request, ticker: str, start: Optional[date] = None, end: Optional[date] = None):
     """
     Get the highest price for the stock ticker.
 
     Parameters:
     - ticker (str): Stock ticker symbol (e.g., 'AAPL').
+    - start (date, optional): First day of the window.
+    - end (date, optional): Last day of the window (inclusive).
 
     Returns:
     - dict: Highest stock price with timestamp.
     """
     try:
-        df = query_stock_data(ticker)
-        if df.empty:
+        cached, key = await lookup_cached_response(request, ticker)
+        if cached is not None:
+            return cached
+
+        highest_row = await query_price_row_async("highest", ticker, start, end)
+        if highest_row is None:
             raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
 
-        highest_row = df.loc[df['high_price'].idxmax()]
         highest_price = {
             "ticker": ticker,
             "timestamp": highest_row["timestamp"],
             "high_price": highest_row["high_price"]
         }
-        return highest_price
+        return await store_cached_response(key, highest_price)
 
     except HTTPException as e:
         raise e
@@ -91,29 +289,34 @@ def get_highest_price(ticker: str):
 
 
 # Route to get the lowest price for a specific stock ticker
-@app.get("/stock/{ticker}/lowest-price")
-def get_lowest_price(ticker: str):
+@app.get("/stock/{ticker}/lowest-price", dependencies=uses_mysql)
+async def get_lowest_price(request: Request, ticker: str, start: Optional[date] = None, end: Optional[date] = None):
     """
     Get the lowest price for the stock ticker.
 
     Parameters:
     - ticker (str): Stock ticker symbol (e.g., 'AAPL').
+    - start (date, optional): First day of the window.
+    - end (date, optional): Last day of the window (inclusive).
 
     Returns:
     - dict: Lowest stock price with timestamp.
     """
     try:
-        df = query_stock_data(ticker)
-        if df.empty:
+        cached, key = await lookup_cached_response(request, ticker)
+        if cached is not None:
+            return cached
+
+        lowest_row = await query_price_row_async("lowest", ticker, start, end)
+        if lowest_row is None:
             raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
 
-        lowest_row = df.loc[df['low_price'].idxmin()]
         lowest_price = {
             "ticker": ticker,
             "timestamp": lowest_row["timestamp"],
             "low_price": lowest_row["low_price"]
         }
-        return lowest_price
+        return await store_cached_response(key, lowest_price)
 
     except HTTPException as e:
         raise e
@@ -122,29 +325,34 @@ def get_lowest_price(ticker: str):
 
 
 # Route to get the closing price for a specific stock ticker
-@app.get("/stock/{ticker}/closing-price")
-def get_closing_price(ticker: str):
+@app.get("/stock/{ticker}/closing-price", dependencies=uses_mysql)
+async def get_closing_price(request: Request, ticker: str, start: Optional[date] = None, end: Optional[date] = None):
     """
     Get the closing price for the stock ticker.
 
     Parameters:
     - ticker (str): Stock ticker symbol (e.g., 'AAPL').
+    - start (date, optional): First day of the window.
+    - end (date, optional): Last day of the window (inclusive).
 
     Returns:
     - dict: Closing stock price with timestamp.
     """
     try:
-        df = query_stock_data(ticker)
-        if df.empty:
+        cached, key = await lookup_cached_response(request, ticker)
+        if cached is not None:
+            return cached
+
+        last_row = await query_price_row_async("closing", ticker, start, end)
+        if last_row is None:
             raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
 
-        last_row = df.iloc[-1]
         closing_price = {
             "ticker": ticker,
             "timestamp": last_row["timestamp"],
             "close_price": last_row["close_price"]
         }
-        return closing_price
+        return await store_cached_response(key, closing_price)
 
     except HTTPException as e:
         raise e
@@ -152,25 +360,204 @@ def get_closing_price(ticker: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Route to get the closing price for a specific stock ticker
-@app.get("/stock/{ticker}/all-rows")
-def get_closing_price(ticker: str):
+# Route to get the precomputed statistics for a specific stock ticker
+@app.get("/stock/{ticker}/stats", dependencies=uses_mysql)
+async def get_ticker_stats(request: Request, ticker: str):
     """
-    Get the closing price for the stock ticker.
+    Get the precomputed statistics for the stock ticker (one primary-key lookup).
 
     Parameters:
     - ticker (str): Stock ticker symbol (e.g., 'AAPL').
 
     Returns:
-    - dict: Closing stock price with timestamp.
+    - dict: All-time, 52-week and 30-day highs and lows with their timestamps, last close,
+      average volumes, row count and time range.
     """
+    if READ_BACKEND != "mysql":
+        raise HTTPException(status_code=501, detail="Ticker statistics are kept in MySQL only.")
     try:
-        df = query_stock_data(ticker)
-        if df.empty:
+        cached, key = await lookup_cached_response(request, ticker)
+        if cached is not None:
+            return cached
+
+        stats = await query_ticker_stats_async(ticker)
+        if stats is None:
             raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
+        return await store_cached_response(key, stats)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Route to get the statistics of every stock ticker
+@app.get("/stocks/summary", dependencies=uses_mysql)
+async def get_stocks_summary():
+    """
+    Get the precomputed statistics of every ticker at once, for overview pages.
+
+    Returns:
+    - list: One statistics dict per ticker (see /stock/{ticker}/stats), ordered by ticker.
+    """
+    if READ_BACKEND != "mysql":
+        raise HTTPException(status_code=501, detail="Ticker statistics are kept in MySQL only.")
+    try:
+        return await query_ticker_stats_async()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Route to get the closing price of several stock tickers at once
+@app.get("/stocks/closing-price", dependencies=uses_mysql)
+async def get_batch_closing_prices(request: Request, tickers: str, start: Optional[date] = None,
+                                   end: Optional[date] = None):
+    """
+    Get the closing price of several tickers with one database round-trip.
+
+    Parameters:
+    - tickers (str): Comma-separated ticker symbols (e.g., 'AAPL,MSFT'), at most BATCH_TICKERS_MAX.
+    - start (date, optional): First day of the window.
+    - end (date, optional): Last day of the window (inclusive).
+
+    Returns:
+    - dict: Columnar {'ticker': [...], 'timestamp': [...], 'close_price': [...]}, one entry
+      per ticker with data in request order, and 'missing': tickers without data.
+    """
+    try:
+        symbols = parse_tickers(tickers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        cached, key = await lookup_cached_response(request, symbols)
+        if cached is not None:
+            return cached
+        return await store_cached_response(key, await batch_closing_prices(symbols, start, end), encode=False)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Route to get the OHLC bars of several stock tickers at once
+@app.get("/stocks/ohlc", dependencies=uses_mysql)
+async def get_batch_ohlc(request: Request, tickers: str, start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Get the OHLC bars of several tickers with one database round-trip.
+
+    Parameters:
+    - tickers (str): Comma-separated ticker symbols (e.g., 'AAPL,MSFT'), at most BATCH_TICKERS_MAX.
+    - start (date, optional): First day of the window.
+    - end (date, optional): Last day of the window (inclusive).
+
+    Returns:
+    - dict: {'tickers': {ticker: {'timestamp': [...], 'open_price': [...], 'high_price': [...],
+      'low_price': [...], 'close_price': [...], 'volume': [...]}}, 'missing': [...]}.
+    """
+    try:
+        symbols = parse_tickers(tickers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        cached, key = await lookup_cached_response(request, symbols)
+        if cached is not None:
+            return cached
+        return await store_cached_response(key, await batch_ohlc(symbols, start, end), encode=False)
+    except TooManyRows as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Route to get resampled bars with technical indicators for a specific stock ticker
+@app.get("/stock/{ticker}/ohlc", dependencies=uses_mysql)
+async def get_ohlc(request: Request, ticker: str, interval: str = "1d", indicators: Optional[str] = None,
+                   start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Get OHLC bars at an interval with technical indicators computed server-side.
+
+    Parameters:
+    - ticker (str): Stock ticker symbol (e.g., 'AAPL').
+    - interval (str): One of raw, 1h, 1d, 1w, 1mo, 1q, 1y.
+    - indicators (str, optional): Comma-separated, e.g. 'sma20,ema50,rsi14,atr14,vol20'
+      (simple/exponential moving average, RSI, average true range, return volatility).
+    - start (date, optional): First day of the bars returned.
+    - end (date, optional): Last day of the bars returned (inclusive).
+
+    Returns:
+    - dict: Columnar {'timestamp': [...], 'open_price': [...], ..., 'volume': [...]} plus one
+      column per indicator (null during its warm-up), computed over the whole history.
+    """
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(INTERVALS)}")
+    try:
+        requested = parse_indicators(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        cached, key = await lookup_cached_response(request, ticker)
+        if cached is not None:
+            return cached
+
+        payload = await ohlc_with_indicators(indicator_cache, ticker, interval, requested,
+                                             await ticker_versions.aget(ticker), start, end)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
+        return await store_cached_response(key, payload, encode=False)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Route to get all stored rows for a specific stock ticker
+@app.get("/stock/{ticker}/all-rows", dependencies=uses_mysql)
+async def get_all_rows(request: Request, ticker: str, after_timestamp: Optional[datetime] = None,
+                       limit: Optional[int] = Query(None, ge=1, le=ROWS_PAGE_MAX), format: Optional[str] = None):
+    """
+    Get all stored rows for the stock ticker.
+
+    JSON by default. With `limit` and/or `after_timestamp` the JSON response is one keyset
+    page: {"rows": [...], "next_after_timestamp": ...}, where a null cursor means the last
+    page. NDJSON, CSV, Arrow IPC and Parquet (picked with the Accept header or ?format=) are
+    streamed from a server-side cursor with constant memory, compressed with zstd or gzip
+    when Accept-Encoding allows.
+
+    Parameters:
+    - ticker (str): Stock ticker symbol (e.g., 'AAPL').
+    - after_timestamp (datetime, optional): Only rows after this time.
+    - limit (int, optional): Maximum number of rows.
+    - format (str, optional): json, ndjson, csv, arrow or parquet; overrides Accept.
+
+    Returns:
+    - list: Stock rows ordered by timestamp (or a page, or a stream, see above).
+    """
+    row_format = negotiate_format(request.headers.get("accept"), format)
+    if row_format is None:
+        raise HTTPException(status_code=406, detail=f"Supported formats: {', '.join(ROW_FORMATS.values())}")
+    paged = after_timestamp is not None or limit is not None
+
+    if row_format != "json":
+        return await stream_rows(request, ticker, row_format, after_timestamp, limit)
+
+    try:
+        cached, key = await lookup_cached_response(request, ticker)
+        if cached is not None:
+            return cached
+
+        df = await query_stock_data(ticker, after_timestamp, limit)
+        if df.empty and not paged:
+            raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
+        # NULL prices decode as NaN and NULL volumes as <NA>; both are null in JSON
+        if df.isna().values.any():
+            df = df.astype(object).where(df.notna(), None)
         # Convert DataFrame to a list of dictionaries
         all_rows = df.to_dict(orient="records")
-        return all_rows
+        if not paged:
+            return await store_cached_response(key, all_rows)
+
+        # A full page may have more rows after it; a short one is the last
+        next_after = all_rows[-1]["timestamp"] if limit is not None and len(all_rows) == limit else None
+        return await store_cached_response(key, {"rows": all_rows, "next_after_timestamp": next_after})
 
     except HTTPException as e:
         raise e
@@ -178,9 +565,34 @@ def get_closing_price(ticker: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def stream_rows(request: Request, ticker: str, row_format: str, after_timestamp=None, limit=None):
+    """
+    Stream a ticker's rows in a compact format, one server-side cursor chunk at a time.
+
+    The first chunk is read before responding, so a missing ticker is still a 404.
+    """
+    batches = iter_row_batches(ticker, after_timestamp, limit)
+    try:
+        first_batch = await anext(batches)
+    except StopAsyncIteration:
+        first_batch = None
+    except async_db.MySQLError as e:
+        raise HTTPException(status_code=500, detail=f"Error querying the database: {e}")
+    if first_batch is None and after_timestamp is None and limit is None:
+        raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
+
+    # Parquet pages are zstd-compressed inside the file already
+    encoding = None if row_format == "parquet" else negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(encode_row_stream(first_batch, batches, row_format, encoding),
+                             media_type=ROW_FORMATS[row_format], headers=headers)
+
+
 # Route to get the summary for a specific stock ticker
-@app.get("/stock/{ticker}/all-rows/{query}")
-def get_stock_summary(ticker: str, query: str):
+@app.get("/stock/{ticker}/all-rows/{query}", dependencies=uses_mysql)
+async def get_stock_summary(ticker: str, query: str):
     """
     Get the summary for the stock ticker.
 
@@ -189,60 +601,127 @@ def get_stock_summary(ticker: str, query: str):
     - query (str): user query
 
     Returns:
-    - dict: response.
+    - dict: response, plus the context's estimated token count and price granularity.
     """
-    try:
-        df = query_stock_data(ticker)
+    async def generate():
+        df = await query_stock_data(ticker)
         if df.empty:
             raise HTTPException(status_code=404, detail="Stock data not found for this ticker.")
-        # Convert DataFrame to a list of dictionaries
-        all_rows = df.to_dict(orient="records")
-
-        prompt = f"""
-        Generate insightful answer for the query from  given context as below:
-        If there is no context provided then say 'no relevant information is available in given context'.
-        Do not make up answer on your own.
-        Answer must be grounded from context.
-        query : {query}
-        context: {all_rows}
-        """
-        response = model.generate_content(prompt)
-        return {"response":response.text}
+        # OHLC rollups sized to the token budget instead of every row's repr
+        context = await asyncio.to_thread(price_context, df, ticker)
+        prompt = build_prompt(query, context["text"])
+        response = await generate_answer("all-rows", prompt)
+        return {"response": response.text, "context_tokens": context["tokens"],
+                "granularity": context["granularity"]}
 
+    try:
+        version = await ticker_versions.aget(ticker)
+        key = llm_cache_key("all-rows", ticker, query, version) if version is not None else None
+        return await llm_cache.get_or_generate(key, generate)
 
     except HTTPException as e:
         raise e
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="The model did not answer in time.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Route to get response cache counters
+@app.get("/cache/stats")
+def get_cache_stats():
+    """
+    Get hit/miss/eviction counters of the response cache, the LLM answer cache and the
+    indicator series cache.
+
+    Returns:
+    - dict: Counters per cache tier, the number of 304 responses, LLM cache counters
+      (including model calls and coalesced requests) and indicator builds/extends.
+    """
+    return {**response_cache.stats(), "not_modified": not_modified_count, "llm": llm_cache.stats(),
+            "indicators": indicator_cache.stats()}
+
+
+# Liveness and readiness probes
+@app.get("/health")
+def get_health():
+    """
+    Liveness: the process serves requests, whatever the state of its backends.
+
+    Returns:
+    - dict: 'status' and each backend's warm-up state (pending, ready or unavailable).
+    """
+    return {"status": "ok", "backends": dependencies.status()}
+
+
+@app.get("/ready")
+async def get_ready():
+    """
+    Readiness: 200 while every backend in READY_REQUIRES answers, 503 otherwise. Ready
+    backends are checked again once their last check is older than READY_CHECK_TTL.
+
+    Returns:
+    - dict: 'ready' and each backend's state, attempts, last error and time to ready.
+    """
+    ready = await dependencies.ready()
+    return JSONResponse({"ready": ready, "backends": dependencies.status()}, status_code=200 if ready else 503)
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+def get_metrics():
+    """
+    Query, DataFrame build, pool wait, LLM and request latency histograms.
+
+    Returns:
+    - Response: The metrics in the Prometheus text format.
+    """
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+
+# Route to get connection pool statistics
+@app.get("/db/stats")
+def get_db_stats():
+    """
+    Get async connection pool sizes and pool wait times.
+
+    Returns:
+    - dict: Pool statistics per backend.
+    """
+    return async_db.pool_stats()
+
+
 @app.get("/stock/{ticker}/ai-news")
-def get_ai_news(ticker: str):
+async def get_ai_news(ticker: str):
     try:
-        news = list(news_collection.find(
+        # Newest first, served by the (ticker, published_at) index
+        news_collection = await mongo_backend.get()
+        news = await news_collection.find(
             {"ticker": ticker},
-            {"_id": 0, "ticker": 1, "content": 1}
-        ))
+            {"_id": 0, "content": 1}
+        ).sort("published_at", -1).to_list(length=None)
+        # Articles are stored once with all their tickers; report the one asked for
+        for article in news:
+            article["ticker"] = ticker
         return news
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/stock/{ticker}/ai-news/{query}")
-def get_ai_news_summary(ticker: str, query: str):
+async def get_ai_news_summary(ticker: str, query: str):
+    async def generate():
+        # Only the chunks most relevant to the query, within the token budget
+        ranked, chunks, dates = await news_retriever.search(ticker, query)
+        context = select_chunks(ranked, chunks, dates)
+        prompt = build_prompt(query, context["text"])
+        response = await generate_answer("ai-news", prompt)
+        return {"response": response.text, "context_tokens": context["tokens"]}
+
     try:
-        news = list(news_collection.find(
-            {"ticker": ticker},
-            {"_id": 0, "ticker": 1, "content": 1}
-        ))
-
-        prompt = f"""
-        Generate insightful answer for the query from  given context as below:
-        If there is no context provided then say 'no relevant information is available in given context'.
-        Do not make up answer on your own.
-        Answer must be grounded from context.
-        query : {query}
-        context: {news}
-        """
-        response = model.generate_content(prompt)
-        return {"response": response.text}
+        news_retriever = await news_backend.get()
+        key = llm_cache_key("ai-news", ticker, query, await news_retriever.version(ticker))
+        return await llm_cache.get_or_generate(key, generate)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="The model did not answer in time.")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,167 @@
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yfinance as yf
+
+from instrumentation import YFINANCE_FETCH_SECONDS, span, timed
+
+# Pipeline settings, configured through environment variables like TICKERS/MODE/OUTPUT
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))  # concurrent downloader threads
+FETCH_RATE_LIMIT = float(os.getenv("FETCH_RATE_LIMIT", "5"))  # requests per second per host (0 = unlimited)
+FETCH_WRITE_BATCH = int(os.getenv("FETCH_WRITE_BATCH", "20"))  # ticker frames per write
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "3"))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", "1.0"))  # seconds, doubled on every retry
+
+# Marks the end of the download stage on the writer queue
+_DONE = object()
+
+
+class RateLimiter:
+    """
+    Token bucket per host, shared by all downloader threads.
+
+    Allows `rate` requests per second to each host, with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Block until a request to host is allowed."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+class YahooHistoryProvider:
+    """Default history provider: yfinance, which serves every ticker from Yahoo's query host."""
+
+    host = "query2.finance.yahoo.com"
+
+    def history(self, ticker, **kwargs):
+        return yf.Ticker(ticker).history(**kwargs)
+
+
+def fetch_with_retry(provider, limiter, ticker, history_kwargs,
+                     max_retries=FETCH_MAX_RETRIES, backoff=FETCH_BACKOFF):
+    """
+    Fetch one ticker's history, retrying failures with exponential backoff and jitter.
+
+    Parameters:
+    - provider: Object with a `host` attribute and a `history(ticker, **kwargs)` method.
+    - limiter (RateLimiter): Shared rate limiter.
+    - ticker (str): Stock ticker symbol.
+    - history_kwargs (dict): Arguments for history() (period, start, end, ...).
+
+    Returns:
+    - DataFrame: The history (possibly empty).
+    """
+    with span("fetch_ticker", ticker=ticker):
+        for attempt in range(max_retries + 1):
+            limiter.acquire(provider.host)
+            try:
+                with timed(YFINANCE_FETCH_SECONDS, "yfinance.history", outcome=True):
+                    return provider.history(ticker, **history_kwargs)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = backoff * (2 ** attempt) * (0.5 + random.random())
+                print(f"Error fetching {ticker} (attempt {attempt + 1}/{max_retries + 1}): {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def _writer_loop(frames, writer, batch_size, summary):
+    """Drain the queue, handing frames to the writer in batches."""
+    batch = []
+    while True:
+        try:
+            # Flush a partial batch whenever the downloaders fall behind the writer
+            item = frames.get(timeout=0.5) if batch else frames.get()
+        except queue.Empty:
+            item = None
+        if item is not None and item is not _DONE:
+            batch.append(item)
+        if batch and (item is None or item is _DONE or len(batch) >= batch_size):
+            try:
+                writer(batch)
+                summary["written"] += len(batch)
+            except Exception as e:
+                print(f"Error writing batch of {len(batch)} tickers: {e}")
+                summary["failed"].extend(ticker for ticker, _ in batch)
+            batch = []
+        if item is _DONE:
+            return
+
+
+def run_fetch_pipeline(jobs, writer, provider=None, workers=FETCH_WORKERS,
+                       rate_limit=FETCH_RATE_LIMIT, batch_size=FETCH_WRITE_BATCH,
+                       max_retries=FETCH_MAX_RETRIES, backoff=FETCH_BACKOFF):
+    """
+    Download histories concurrently and write them from a separate writer thread.
+
+    Downloader threads fetch through a per-host rate limiter and put non-empty frames on a
+    bounded queue; the writer drains it in batches, so network I/O and writes overlap.
+
+    Parameters:
+    - jobs (list): (ticker, history_kwargs) pairs.
+    - writer (callable): Called with a list of (ticker, DataFrame) pairs.
+    - provider (optional): History provider, defaults to YahooHistoryProvider.
+    - workers (int): Number of downloader threads.
+    - rate_limit (float): Requests per second per host (0 = unlimited).
+    - batch_size (int): Maximum frames per writer call.
+    - max_retries (int): Retries per ticker after the first failed attempt.
+    - backoff (float): Initial retry delay in seconds.
+
+    Returns:
+    - dict: Counts of fetched/empty/written tickers and the list of failed tickers.
+    """
+    provider = provider or YahooHistoryProvider()
+    limiter = RateLimiter(rate_limit)
+    frames = queue.Queue(maxsize=max(1, workers * 2))
+    summary = {"fetched": 0, "empty": 0, "written": 0, "failed": []}
+    lock = threading.Lock()
+
+    def download(ticker, history_kwargs):
+        try:
+            data = fetch_with_retry(provider, limiter, ticker, history_kwargs, max_retries, backoff)
+        except Exception as e:
+            print(f"Giving up on {ticker}: {e}")
+            with lock:
+                summary["failed"].append(ticker)
+            return
+        with lock:
+            summary["fetched" if not data.empty else "empty"] += 1
+        if not data.empty:
+            data['timestamp'] = data.index
+            frames.put((ticker, data))
+
+    writer_thread = threading.Thread(target=_writer_loop, args=(frames, writer, batch_size, summary))
+    writer_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for ticker, history_kwargs in jobs:
+                pool.submit(download, ticker, history_kwargs)
+    finally:
+        frames.put(_DONE)
+        writer_thread.join()
+
+    print(f"Fetched {summary['fetched']} tickers ({summary['empty']} empty, "
+          f"{len(summary['failed'])} failed), wrote {summary['written']}")
+    return summary
@@ -0,0 +1,334 @@
+import asyncio
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import async_db
+from batch_prices import json_floats, json_timestamps
+from db_connector import rows_to_arrays
+from llm_context import rollup
+from parquet_store import read_stock_table
+from stock_queries import READ_BACKEND, _window_bounds, build_ohlc_rows_query
+
+# (ticker, interval) series kept with their indicator columns per worker
+INDICATOR_CACHE_SIZE = int(os.getenv("INDICATOR_CACHE_SIZE", "64"))
+# Longest indicator period accepted, e.g. sma200
+INDICATOR_PERIOD_MAX = int(os.getenv("INDICATOR_PERIOD_MAX", "1000"))
+
+# ?interval= values and their pandas resample rules (None: the stored bars as they are)
+INTERVALS = {"raw": None, "1h": "h", "1d": "D", "1w": "W-FRI", "1mo": "MS", "1q": "QS", "1y": "YS"}
+BAR_COLUMNS = ["open_price", "high_price", "low_price", "close_price", "volume"]
+INDICATOR = re.compile(r"([a-z]+)(\d+)")
+
+
+def parse_indicators(indicators):
+    """
+    Split ?indicators=sma20,ema50,rsi14,atr14 into (name, kind, period) tuples.
+
+    Raises:
+    - ValueError: On an unknown indicator or a period outside 1..INDICATOR_PERIOD_MAX.
+    """
+    parsed = []
+    for name in dict.fromkeys(n.strip().lower() for n in (indicators or "").split(",") if n.strip()):
+        match = INDICATOR.fullmatch(name)
+        if match is None or match.group(1) not in KERNELS:
+            raise ValueError(f"Unknown indicator '{name}'; use {', '.join(k + 'N' for k in KERNELS)}")
+        period = int(match.group(2))
+        if not 1 <= period <= INDICATOR_PERIOD_MAX:
+            raise ValueError(f"Indicator period must be between 1 and {INDICATOR_PERIOD_MAX}")
+        parsed.append((name, match.group(1), period))
+    return parsed
+
+
+def _recursive(values, alpha, seed):
+    """y[i] = (1 - alpha) * y[i - 1] + alpha * values[i] with y[-1] = seed, in pandas' C ewm kernel."""
+    if not len(values):
+        return np.empty(0)
+    series = pd.Series(np.concatenate(([seed], values)))
+    return series.ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def _smoothed(values, alpha, period, first, start, previous):
+    """
+    Recursive average of values[first:], seeded with the mean of its first `period` values.
+
+    Only the part from `start` on is computed, continuing from previous[start - 1] once the
+    seed lies before `start`; otherwise it is computed from the beginning.
+    """
+    seeded_at = first + period - 1
+    if previous is not None and start > seeded_at:
+        return _recursive(values[start:], alpha, previous[start - 1])
+    out = np.full(len(values), np.nan)
+    if len(values) > seeded_at:
+        out[seeded_at] = np.mean(values[first:seeded_at + 1])
+        out[seeded_at + 1:] = _recursive(values[seeded_at + 1:], alpha, out[seeded_at])
+    return out[start:]
+
+
+def _tail(values, lookback, start):
+    """values from `lookback` bars before `start` on, and the offset of `start` in it."""
+    low = max(0, start - lookback)
+    return values[low:], start - low
+
+
+# Each kernel computes its columns for bars[start:] from the float64 bar arrays and the
+# columns it returned for bars[:start] (None when computing from scratch). The "" column is
+# the indicator itself; others carry the recursion state between calls.
+
+def _sma(bars, period, start, previous):
+    close, offset = _tail(bars["close_price"], period - 1, start)
+    return {"": pd.Series(close).rolling(period).mean().to_numpy()[offset:]}
+
+
+def _volatility(bars, period, start, previous):
+    """Rolling standard deviation of the bar-to-bar returns."""
+    close, offset = _tail(bars["close_price"], period, start)
+    returns = pd.Series(close).pct_change(fill_method=None)
+    return {"": returns.rolling(period).std().to_numpy()[offset:]}
+
+
+def _ema(bars, period, start, previous):
+    return {"": _smoothed(bars["close_price"], 2 / (period + 1), period, 0, start, previous and previous[""])}
+
+
+def _rsi(bars, period, start, previous):
+    """Wilder's relative strength index."""
+    close = bars["close_price"]
+    change = np.diff(close, prepend=np.nan)
+    gain = _smoothed(np.maximum(change, 0), 1 / period, period, 1, start, previous and previous["gain"])
+    loss = _smoothed(np.maximum(-change, 0), 1 / period, period, 1, start, previous and previous["loss"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # No losses: 100, unless there were no gains either (a flat series), which is neutral
+        rsi = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), 100 - 100 / (1 + gain / loss))
+    return {"": rsi, "gain": gain, "loss": loss}
+
+
+def _atr(bars, period, start, previous):
+    """Wilder's average true range."""
+    high, low, close = bars["high_price"], bars["low_price"], bars["close_price"]
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    return {"": _smoothed(true_range, 1 / period, period, 0, start, previous and previous[""])}
+
+
+KERNELS = {"sma": _sma, "ema": _ema, "rsi": _rsi, "atr": _atr, "vol": _volatility}
+
+
+class IndicatorSeries:
+    """
+    One ticker's bars at one interval, as float64 arrays, with the indicator columns computed so far.
+
+    Parameters:
+    - rule (str | None): Resample rule from INTERVALS.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.timestamps = np.empty(0, dtype="datetime64[s]")
+        self.bars = {name: np.empty(0) for name in BAR_COLUMNS}
+        self.columns = {}
+        # First stored row of the newest bar: where the next extend reads from, since that
+        # bar may still change (a day or week in progress)
+        self.last_bar_from = None
+        self.version = None
+        # ticker_writes.write_count the bars were read at (None: unknown)
+        self.write_count = None
+
+    def extend(self, prices):
+        """
+        Replace the newest bar with the bars resampled from `prices` (rows from last_bar_from on)
+        and extend every indicator column over them.
+        """
+        if prices.empty:
+            return
+        bars = prices if self.rule is None else rollup(prices, self.rule)
+        if self.rule is None:
+            first_rows = prices.index.to_numpy()
+        else:
+            first_rows = pd.Series(prices.index, index=prices.index).resample(self.rule).first().loc[bars.index].to_numpy()
+
+        keep = max(0, len(self.timestamps) - 1) if self.last_bar_from is not None else 0
+        self.timestamps = np.concatenate((self.timestamps[:keep], bars.index.to_numpy().astype("datetime64[s]")))
+        for name in BAR_COLUMNS:
+            new = bars[name].to_numpy(dtype=np.float64) if name in bars else np.full(len(bars), np.nan)
+            self.bars[name] = np.concatenate((self.bars[name][:keep], new))
+        self.last_bar_from = pd.Timestamp(first_rows[-1]).to_pydatetime()
+
+        for (kind, period), columns in self.columns.items():
+            previous = {suffix: values[:keep] for suffix, values in columns.items()}
+            added = KERNELS[kind](self.bars, period, keep, previous if keep else None)
+            self.columns[kind, period] = {suffix: np.concatenate((previous[suffix], added[suffix])) for suffix in added}
+
+    def ensure(self, indicators):
+        """Compute, over the whole series, the requested indicators not cached yet."""
+        for _, kind, period in indicators:
+            if (kind, period) not in self.columns:
+                self.columns[kind, period] = KERNELS[kind](self.bars, period, 0, None)
+
+    def payload(self, ticker, interval, indicators, start=None, end=None):
+        """
+        Columnar JSON payload of the bars within [start, end) and the requested indicators.
+
+        Indicators are always computed over the whole history, so a window doesn't change
+        their warm-up.
+        """
+        selected = slice(None)
+        if start is not None or end is not None:
+            low = 0 if start is None else np.searchsorted(self.timestamps, np.datetime64(start, "us"))
+            high = len(self.timestamps) if end is None else np.searchsorted(self.timestamps, np.datetime64(end, "us"))
+            selected = slice(low, high)
+        return {
+            "ticker": ticker,
+            "interval": interval,
+            "timestamp": json_timestamps(self.timestamps[selected]),
+            **{name: json_floats(self.bars[name][selected], name == "volume") for name in BAR_COLUMNS},
+            **{name: json_floats(self.columns[kind, period][""][selected]) for name, kind, period in indicators},
+        }
+
+
+async def load_prices(ticker, since=None):
+    """
+    A ticker's stored bars from `since` on as a timestamp-indexed float64 frame.
+
+    MySQL rows are read as text and parsed column by column into typed arrays (no Decimal columns).
+    """
+    if READ_BACKEND == "parquet":
+        table = await asyncio.to_thread(read_stock_table, ticker, BAR_COLUMNS, since)
+        frame = table.to_pandas()
+    else:
+        columns, rows = await async_db.fetch_rows(*build_ohlc_rows_query(ticker, since), text=True)
+        frame = pd.DataFrame(rows_to_arrays(columns, rows))
+    return frame.set_index("timestamp").astype(np.float64)
+
+
+# Write counter and earliest bar of the ticker's last write (see db_connector.TOUCH_TICKER_WRITES)
+WRITE_MARKS_QUERY = "SELECT write_count, min_written FROM ticker_writes WHERE ticker = %s"
+
+
+async def load_write_marks(ticker):
+    """
+    The ticker's write counter and the earliest bar its last write touched.
+
+    Returns:
+    - tuple | None: (write_count, min_written), or None when unknown. The Parquet dataset
+      keeps no write log, so its series are rebuilt whenever the version changes.
+    """
+    if READ_BACKEND == "parquet":
+        return None
+    row = await async_db.fetch_one(WRITE_MARKS_QUERY, (ticker,))
+    return (row["write_count"], row["min_written"]) if row is not None else None
+
+
+class IndicatorCache:
+    """
+    Per-ticker indicator series kept between requests and extended as new bars arrive.
+
+    A series is built once from the full history. When the ticker's data version changes
+    because of one write that started at or after the series' newest bar (the usual
+    incremental fetch), only the rows from the newest bar on are read again and the
+    indicator columns are continued from their last values (rolling windows from the last
+    `period` bars, the EMA/RSI/ATR recursions from their previous state). A write reaching
+    further back (a gap backfill, history restated for splits and dividends), or more than
+    one write since the series was read, rebuilds it from the full history.
+
+    Parameters:
+    - size (int): Series kept, least recently used evicted first.
+    - loader (coroutine function): (ticker, since) -> frame, load_prices by default.
+    - writes (coroutine function): ticker -> (write_count, min_written) or None,
+      load_write_marks by default.
+    """
+
+    def __init__(self, size=INDICATOR_CACHE_SIZE, loader=load_prices, writes=load_write_marks):
+        self.size = size
+        self.loader = loader
+        self.writes = writes
+        self._series = OrderedDict()
+        # (ticker, interval) -> (lock, requests holding or awaiting it). A lock lives while
+        # it has users, not as long as the series, so evicting a series never hands a
+        # second lock to the same key.
+        self._locks = {}
+        self.counters = {"hits": 0, "builds": 0, "extends": 0, "rebuilds": 0}
+
+    async def get(self, ticker, interval, indicators, version):
+        """
+        The ticker's series at `interval` with `indicators` computed, up to date with `version`.
+
+        Parameters:
+        - ticker (str): Stock ticker symbol.
+        - interval (str): Key of INTERVALS.
+        - indicators (list): From parse_indicators.
+        - version (str | None): The ticker's data version (TickerVersions); None (unknown)
+          is treated as changed.
+
+        Returns:
+        - IndicatorSeries | None: None if the ticker has no data.
+        """
+        key = (ticker, interval)
+        lock, users = self._locks.get(key, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                series = self._series.get(key)
+                if series is not None and version is not None and series.version == version:
+                    self.counters["hits"] += 1
+                else:
+                    # Read before the rows: a write landing in between shows up as one more
+                    # write next time
+                    marks = await self.writes(ticker)
+                    if series is None:
+                        series = IndicatorSeries(INTERVALS[interval])
+                        series.extend(await self.loader(ticker))
+                        self.counters["builds"] += 1
+                    elif self._extends(series, marks):
+                        series.extend(await self.loader(ticker, series.last_bar_from))
+                        self.counters["extends"] += 1
+                    else:
+                        series = IndicatorSeries(INTERVALS[interval])
+                        series.extend(await self.loader(ticker))
+                        self.counters["rebuilds"] += 1
+                    series.write_count = marks[0] if marks is not None else None
+                series.version = version
+                series.ensure(indicators)
+
+                self._series[key] = series
+                self._series.move_to_end(key)
+                while len(self._series) > self.size:
+                    self._series.popitem(last=False)
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+        return series if len(series.timestamps) else None
+
+    @staticmethod
+    def _extends(series, marks):
+        """Whether re-reading from the series' newest bar picks up every write since it was read."""
+        if marks is None or series.write_count is None:
+            return False
+        write_count, min_written = marks
+        # No write since (the version was unknown), or exactly one
+        if write_count - series.write_count not in (0, 1):
+            return False
+        return min_written is None or series.last_bar_from is None or min_written >= series.last_bar_from
+
+    def stats(self):
+        return {"size": len(self._series), "max_size": self.size, **self.counters}
+
+
+async def ohlc_with_indicators(cache, ticker, interval, indicators, version, start=None, end=None):
+    """
+    Payload of /stock/{ticker}/ohlc.
+
+    Returns:
+    - dict | None: Columnar bars and indicators (see IndicatorSeries.payload), None without data.
+    """
+    series = await cache.get(ticker, interval, indicators, version)
+    if series is None:
+        return None
+    return series.payload(ticker, interval, indicators, *_window_bounds(start, end))
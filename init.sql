@@ -12,3 +12,6 @@ CREATE TABLE IF NOT EXISTS stock_prices (
     low_price DECIMAL(10, 2),
     close_price DECIMAL(10, 2)
 );
+
+-- Indexes and later schema changes are versioned in schema_migrations.py and applied
+-- automatically the first time db_connector.get_pool() creates the connection pool.
@@ -0,0 +1,181 @@
+import contextlib
+import cProfile
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess, start_http_server)
+
+# Port for the fetchers' /metrics endpoint (0: don't serve one; the API serves /metrics itself)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Set by the deployment when several uvicorn workers share one /metrics (prometheus_client
+# multiprocess mode); each worker writes its samples there
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# OpenTelemetry spans around the timed sections (needs opentelemetry-api, which isn't in
+# requirements.txt); the SDK and exporter are set up the usual way, e.g. by running under
+# opentelemetry-instrument, without them the spans are no-ops
+OTEL_TRACING = os.getenv("OTEL_TRACING", "0") == "1"
+# PROFILE=1 writes a profile report per API request and per fetch run into PROFILE_DIR, made
+# with pyinstrument when it is installed (PROFILE_TOOL=cprofile to force cProfile)
+PROFILE = os.getenv("PROFILE", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TOOL = os.getenv("PROFILE_TOOL", "pyinstrument")
+
+# Latency buckets from 1 ms to 1 min
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "MySQL query time, including reading the rows",
+                             ["operation"], buckets=SECONDS_BUCKETS)
+DB_POOL_WAIT_SECONDS = Histogram("db_pool_wait_seconds", "Time waiting for a pooled async MySQL connection",
+                                 buckets=SECONDS_BUCKETS)
+DATAFRAME_BUILD_SECONDS = Histogram("dataframe_build_seconds", "Time decoding cursor rows into typed columns",
+                                    buckets=SECONDS_BUCKETS)
+DATAFRAME_ROWS = Counter("dataframe_rows", "Cursor rows decoded into typed columns")
+LLM_CALL_SECONDS = Histogram("llm_call_seconds", "Gemini call latency", ["endpoint", "outcome"],
+                             buckets=SECONDS_BUCKETS)
+LLM_PROMPT_TOKENS = Histogram("llm_prompt_tokens", "Estimated prompt tokens per Gemini call", ["endpoint"],
+                              buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000))
+YFINANCE_FETCH_SECONDS = Histogram("yfinance_fetch_seconds", "Yahoo Finance history request latency per attempt",
+                                   ["outcome"], buckets=SECONDS_BUCKETS)
+ROWS_INSERTED = Counter("rows_inserted", "stock_prices rows written", ["strategy"])
+WRITE_SECONDS = Histogram("write_seconds", "Time per save_frames_to_mysql transaction", ["strategy"],
+                          buckets=SECONDS_BUCKETS)
+ROWS_INSERTED_PER_SECOND = Gauge("rows_inserted_per_second", "Write throughput of the last transaction",
+                                 ["strategy"], multiprocess_mode="liveall")
+SCRAPED_ARTICLES = Counter("scraped_articles", "Crawled articles by the tier that fetched them",
+                           ["tier", "outcome"])
+HTTP_REQUEST_SECONDS = Histogram("http_request_seconds", "API request latency", ["route", "status"],
+                                 buckets=SECONDS_BUCKETS)
+
+_tracer = None
+if OTEL_TRACING:
+    from opentelemetry import trace
+
+    _tracer = trace.get_tracer("yfinance-stock-data")
+
+# Profilers hook the interpreter, so overlapping requests can't each have one
+_profile_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """An OpenTelemetry span when OTEL_TRACING=1, otherwise nothing."""
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+@contextlib.contextmanager
+def timed(histogram, name, outcome=False, **labels):
+    """
+    Observe the duration of the block in histogram, inside a span when tracing is on.
+
+    Parameters:
+    - histogram (Histogram): Metric to observe.
+    - name (str): Span name.
+    - outcome (bool): Add an 'outcome' label, 'ok' or 'error' depending on whether the block raised.
+    - labels: The histogram's other label values.
+    """
+    started = time.perf_counter()
+    result = "ok"
+    try:
+        with span(name, **labels):
+            yield
+    except BaseException:
+        result = "error"
+        raise
+    finally:
+        if outcome:
+            labels["outcome"] = result
+        metric = histogram.labels(**labels) if labels else histogram
+        metric.observe(time.perf_counter() - started)
+
+
+def record_write(strategy, rows, seconds):
+    """Count a committed stock_prices write and its throughput."""
+    ROWS_INSERTED.labels(strategy).inc(rows)
+    WRITE_SECONDS.labels(strategy).observe(seconds)
+    if seconds > 0:
+        ROWS_INSERTED_PER_SECOND.labels(strategy).set(rows / seconds)
+
+
+def metrics_payload():
+    """
+    The current metrics in the Prometheus text format.
+
+    Returns:
+    - tuple: (bytes body, content type).
+    """
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Aggregate the samples every worker process wrote
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server():
+    """Serve /metrics on METRICS_PORT for a long-running fetcher (no-op when it is 0)."""
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+        print(f"Serving metrics on port {METRICS_PORT}")
+
+
+def _profile_path(name, extension):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name.strip("/")) or "root"
+    return os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{safe_name}.{extension}")
+
+
+@contextlib.contextmanager
+def profiled(name, async_mode=False):
+    """
+    Profile the block when PROFILE=1 and write the report to PROFILE_DIR.
+
+    pyinstrument writes an HTML report and, with async_mode, attributes time spent awaiting
+    to the await rather than to whatever other task ran meanwhile. cProfile writes a .prof
+    file (for snakeviz or pstats) plus the top functions as text. One block is profiled at
+    a time; blocks overlapping it run unprofiled.
+
+    Parameters:
+    - name (str): Report file name prefix (the route or the fetch run).
+    - async_mode (bool): The block awaits on an event loop.
+    """
+    if not PROFILE or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        Profiler = None
+        if PROFILE_TOOL == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                pass
+
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled" if async_mode else "disabled")
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(_profile_path(name, "html"), "w") as f:
+                    f.write(profiler.output_html())
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                path = _profile_path(name, "prof")
+                profiler.dump_stats(path)
+                with open(path[:-len("prof")] + "txt", "w") as f:
+                    pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,117 @@
+import os
+import re
+from collections import Counter
+
+# Keyword list, one term per line ('#' starts a comment)
+AI_KEYWORDS_FILE = os.getenv("AI_KEYWORDS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                "ai_keywords.txt"))
+# Keyword hits an article needs to count as AI-related
+AI_MIN_HITS = int(os.getenv("AI_MIN_HITS", "1"))
+
+# Used when the keyword file is missing
+DEFAULT_KEYWORDS = ["artificial intelligence", "machine learning", "deep learning", "neural network",
+                    "ai technology", "generative ai", "llm", "large language model"]
+
+
+def load_keywords(path=AI_KEYWORDS_FILE):
+    """
+    Read the keyword list from a file.
+
+    Returns:
+    - list: Lowercased terms, or DEFAULT_KEYWORDS if the file doesn't exist.
+    """
+    if not os.path.exists(path):
+        return list(DEFAULT_KEYWORDS)
+    keywords = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            term = line.split("#", 1)[0].strip().lower()
+            if term:
+                keywords.append(" ".join(term.split()))
+    return keywords
+
+
+def _token(char):
+    # Any run of whitespace matches the space inside a multi-word term
+    return r"\s+" if char == " " else re.escape(char)
+
+
+def _trie_pattern(keywords):
+    """
+    Regex alternation for the keywords, factored as a trie so shared prefixes are matched
+    once ('neural net(?:work|s)' instead of 'neural network|neural nets').
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        ends_here = "" in node
+        branches = [_token(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if all(len(branch) == 1 for branch in branches) and len(branches) > 1:
+            pattern = "[" + "".join(branches) + "]"
+        elif len(branches) == 1:
+            pattern = branches[0]
+            if ends_here:
+                pattern = f"(?:{pattern})"
+        else:
+            pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if ends_here else pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    All keywords in one compiled, word-bounded regex, matched case-insensitively.
+
+    One pass over the text finds every keyword, however many there are, and 'llm' no longer
+    matches inside other words. A trailing 's' is accepted for plurals.
+
+    Parameters:
+    - keywords (list): Terms to look for; multi-word terms match across any whitespace.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({" ".join(k.lower().split()) for k in keywords if k.strip()})
+        # Matched against lowercased text. There is no leading \b: a pattern that starts with
+        # the trie lets the regex engine skip ahead to possible first letters, so the left
+        # word boundary is checked on the (few) matches instead. Plurals count too.
+        self.pattern = re.compile("(" + _trie_pattern(self.keywords) + r")s?\b")
+
+    def count(self, text):
+        """Hits per keyword."""
+        text = text.lower()
+        counts = Counter()
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            if start and (text[start - 1].isalnum() or text[start - 1] == "_"):
+                continue
+            counts[" ".join(match.group(1).split())] += 1
+        return counts
+
+    def score(self, text):
+        """
+        Keyword hits and a relevance score for a text.
+
+        Returns:
+        - dict: {'hits': total hits, 'keywords': [{'keyword', 'count'}, ...] (most frequent
+          first), 'score': hits per 1,000 words}.
+        """
+        counts = self.count(text)
+        hits = sum(counts.values())
+        words = max(len(text.split()), 1)
+        return {
+            "hits": hits,
+            "keywords": [{"keyword": keyword, "count": count} for keyword, count in counts.most_common()],
+            "score": round(hits * 1000 / words, 2),
+        }
+
+
+# Built once at import from AI_KEYWORDS_FILE
+ai_matcher = KeywordMatcher(load_keywords())
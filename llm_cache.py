@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from response_cache import LRUCache, TieredCache
+
+# Cached LLM answers per worker, and how long they stay valid
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))  # entries
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))  # seconds
+# Optional SQLite file shared by the workers and kept across restarts, e.g. /data/llm_cache.db
+LLM_CACHE_SQLITE = os.getenv("LLM_CACHE_SQLITE")
+# Upper bound for building the context and getting an answer
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds
+
+PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def normalize_query(query):
+    """Case-, whitespace- and punctuation-insensitive form of a question."""
+    return " ".join(PUNCTUATION.sub(" ", query.lower()).split())
+
+
+def llm_cache_key(endpoint, ticker, query, version):
+    """Key of an LLM answer: endpoint, ticker, normalised query and the data version it was built from."""
+    raw = "|".join([endpoint, ticker.upper(), normalize_query(query), version])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class SQLiteCache:
+    """
+    Persistent cache in a SQLite file, with the same get/set/stats interface as LRUCache.
+
+    Parameters:
+    - path (str): Database file (created if missing).
+    - ttl (float): Seconds an entry stays valid.
+    """
+
+    def __init__(self, path, ttl=LLM_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL lets several workers read while one writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.counters = {"hits": 0, "misses": 0, "errors": 0}
+
+    def get(self, key):
+        try:
+            with self._lock:
+                row = self.connection.execute("SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                                              (key, time.time())).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading from the LLM cache: {e}")
+            self.counters["errors"] += 1
+            return None
+        self.counters["hits" if row is not None else "misses"] += 1
+        return row[0] if row is not None else None
+
+    def set(self, key, value):
+        try:
+            with self._lock:
+                now = time.time()
+                self.connection.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, value, now + self.ttl))
+                self.connection.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            print(f"Error writing to the LLM cache: {e}")
+            self.counters["errors"] += 1
+
+    def stats(self):
+        with self._lock:
+            size = self.connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"backend": "sqlite", "path": self.path, "size": size, "ttl": self.ttl, **self.counters}
+
+
+class LLMResponseCache:
+    """
+    Cached, coalesced and time-limited LLM calls.
+
+    A cached answer is returned directly. Otherwise concurrent requests with the same key
+    share one in-flight call, so a burst of identical questions costs one model invocation.
+    The call is bounded by `timeout`, and a client that disconnects doesn't cancel it for
+    the others.
+
+    Parameters:
+    - cache: TieredCache (or an object with the same aget / aset / stats), so that the
+      SQLite tier is read and written off the event loop.
+    - timeout (float): Seconds before asyncio.TimeoutError is raised to every waiter.
+    """
+
+    def __init__(self, cache, timeout=LLM_TIMEOUT):
+        self.cache = cache
+        self.timeout = timeout
+        self._in_flight = {}
+        self.counters = {"calls": 0, "coalesced": 0, "timeouts": 0}
+
+    async def get_or_generate(self, key, generate):
+        """
+        The cached answer for key, or the result of `await generate()` (cached when it succeeds).
+
+        Parameters:
+        - key (str | None): From llm_cache_key; None (data version unknown) generates an
+          answer that is neither cached nor shared.
+        - generate (coroutine function): Builds the JSON-serialisable answer.
+        """
+        if key is None:
+            return await self._generate(None, generate)
+        body = await self.cache.aget(key)
+        if body is not None:
+            return json.loads(body)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(key, generate))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here too, in case every waiter has gone away
+            task.exception()
+
+    async def _generate(self, key, generate):
+        self.counters["calls"] += 1
+        try:
+            payload = await asyncio.wait_for(generate(), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise
+        if key is not None:
+            await self.cache.aset(key, json.dumps(jsonable_encoder(payload)).encode())
+        return payload
+
+    def stats(self):
+        return {**self.cache.stats(), **self.counters, "in_flight": len(self._in_flight)}
+
+
+def create_llm_cache():
+    """Build the LLM cache from the environment: an LRU, backed by SQLite when LLM_CACHE_SQLITE is set."""
+    persistent = SQLiteCache(LLM_CACHE_SQLITE) if LLM_CACHE_SQLITE else None
+    return LLMResponseCache(TieredCache(LRUCache(LLM_CACHE_SIZE, LLM_CACHE_TTL), persistent))
@@ -0,0 +1,234 @@
+import math
+import os
+import re
+
+import pandas as pd
+
+# Token budget for the context part of a Gemini prompt
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8000"))
+# News chunks sent with an ai-news query, at most
+LLM_NEWS_TOP_K = int(os.getenv("LLM_NEWS_TOP_K", "8"))
+# Words per news chunk
+LLM_CHUNK_WORDS = int(os.getenv("LLM_CHUNK_WORDS", "200"))
+
+PROMPT_TEMPLATE = """
+        Generate insightful answer for the query from  given context as below:
+        If there is no context provided then say 'no relevant information is available in given context'.
+        Do not make up answer on your own.
+        Answer must be grounded from context.
+        query : {query}
+        context: {context}
+        """
+
+# Price rollups, finest first: (name, pandas frequency, label format). "rows" is the data as
+# stored; a level is skipped when it doesn't shrink the previous one.
+ROLLUPS = [
+    ("rows", None, "%Y-%m-%d %H:%M"),
+    ("daily", "D", "%Y-%m-%d"),
+    ("weekly", "W-FRI", "%Y-%m-%d"),
+    ("monthly", "MS", "%Y-%m"),
+    ("quarterly", "QS", None),
+    ("yearly", "YS", "%Y"),
+]
+PRICE_COLUMNS = {"open_price": "first", "high_price": "max", "low_price": "min", "close_price": "last"}
+
+# Pieces the token estimate counts: digits one by one (as Gemini's tokenizer splits
+# numbers), letter runs, and single punctuation marks
+TOKEN_PIECE = re.compile(r"\d|[^\W\d_]+|[^\w\s]")
+TERM = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"a", "an", "and", "are", "about", "as", "at", "be", "by", "did", "do", "does", "for", "from",
+             "how", "in", "is", "it", "its", "of", "on", "or", "the", "to", "was", "what", "when",
+             "which", "who", "why", "with"}
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def count_tokens(text):
+    """
+    Estimate the number of model tokens in a text, offline.
+
+    Digits and punctuation count one each, words one per four letters (rounded up), which
+    errs on the high side for the CSV and English prose sent here.
+    """
+    tokens = 0
+    for piece in TOKEN_PIECE.findall(text):
+        tokens += math.ceil(len(piece) / 4) if piece[0].isalpha() else 1
+    return tokens
+
+
+def build_prompt(query, context):
+    """Fill the grounded-answer prompt with the user's query and the built context."""
+    return PROMPT_TEMPLATE.format(query=query, context=context)
+
+
+def _format_number(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _label(timestamp, label_format):
+    if label_format is None:
+        return f"{timestamp.year}Q{timestamp.quarter}"
+    return timestamp.strftime(label_format)
+
+
+def _prices_frame(df):
+    """Timestamp-indexed float OHLC(+volume) frame from stock rows (DECIMALs arrive as Decimal)."""
+    columns = [c for c in [*PRICE_COLUMNS, "volume"] if c in df.columns]
+    prices = df.set_index(pd.to_datetime(df["timestamp"]))[columns].astype(float)
+    return prices.sort_index()
+
+
+def rollup(prices, frequency):
+    """Aggregate an OHLC frame to a coarser frequency (open first, high max, low min, close last)."""
+    aggregations = {c: a for c, a in PRICE_COLUMNS.items() if c in prices.columns}
+    if "volume" in prices.columns:
+        aggregations["volume"] = "sum"
+    return prices.resample(frequency).agg(aggregations).dropna(subset=["close_price"])
+
+
+def price_summary(prices, ticker=None):
+    """One line with the range, extremes, last close and change over the whole history."""
+    high_at = prices["high_price"].idxmax()
+    low_at = prices["low_price"].idxmin()
+    first, last = prices["close_price"].iloc[0], prices["close_price"].iloc[-1]
+    change = (last - first) / first * 100 if first else 0.0
+    return (f"{ticker + ' ' if ticker else ''}{prices.index[0]:%Y-%m-%d} to {prices.index[-1]:%Y-%m-%d}, "
+            f"{len(prices)} bars: high {_format_number(prices.at[high_at, 'high_price'])} on {high_at:%Y-%m-%d}, "
+            f"low {_format_number(prices.at[low_at, 'low_price'])} on {low_at:%Y-%m-%d}, "
+            f"last close {_format_number(last)}, change {change:+.1f}%")
+
+
+def price_context(df, ticker=None, budget=LLM_CONTEXT_TOKENS):
+    """
+    Compact price history for a prompt, fitted to a token budget.
+
+    The rows are rolled up daily, weekly, monthly, quarterly then yearly, and the finest level
+    whose CSV fits the budget is used. If not even yearly bars fit, the most recent ones that
+    do are kept. A summary line (range, extremes, last close, change) always comes first.
+
+    Parameters:
+    - df (pd.DataFrame): Stock rows with timestamp and the OHLC price columns.
+    - ticker (str, optional): Named in the summary line.
+    - budget (int): Token budget for the whole context.
+
+    Returns:
+    - dict: {'text': context, 'granularity': rollup name, 'rows': bars included,
+      'tokens': estimated tokens of text}.
+    """
+    prices = _prices_frame(df)
+    summary = price_summary(prices, ticker)
+    header = ",".join(["date", "open", "high", "low", "close"] + (["volume"] if "volume" in prices.columns else []))
+    remaining = budget - count_tokens(summary) - count_tokens(header) - 2
+
+    level, bars, label_format = None, None, None
+    for name, frequency, fmt in ROLLUPS:
+        candidate = prices if frequency is None else rollup(prices, frequency)
+        if bars is not None and len(candidate) >= len(bars):
+            continue
+        level, bars, label_format = name, candidate, fmt
+        # Cheap estimate from one line before serialising every bar
+        sample = _csv_line(bars.index[-1], bars.iloc[-1], label_format)
+        if (count_tokens(sample) + 1) * len(bars) <= remaining:
+            break
+
+    lines = [_csv_line(timestamp, row, label_format) for timestamp, row in zip(bars.index, bars.itertuples(index=False))]
+    # Keep the newest lines that fit (all of them unless the estimate was off or nothing fits)
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = count_tokens(line) + 1
+        if used + cost > remaining:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+
+    text = "\n".join([summary, header, *kept])
+    return {"text": text, "granularity": level, "rows": len(kept), "tokens": count_tokens(text)}
+
+
+def _csv_line(timestamp, row, label_format):
+    return ",".join([_label(timestamp, label_format), *(_format_number(v) if v == v else "" for v in row)])
+
+
+def terms(text):
+    """Lowercased word terms of a text, without stopwords."""
+    return [term for term in TERM.findall(text.lower()) if term not in STOPWORDS]
+
+
+def chunk_text(text, words=LLM_CHUNK_WORDS):
+    """Split a text into chunks of about `words` words."""
+    tokens = text.split()
+    return [" ".join(tokens[i:i + words]) for i in range(0, len(tokens), words)]
+
+
+def rank_chunks(query, chunks):
+    """
+    Order chunks by BM25 relevance to the query.
+
+    Ties (including a query with no matching terms) keep the input order, so newest-first
+    articles stay newest first.
+
+    Returns:
+    - list: (score, chunk index) pairs, best first.
+    """
+    query_terms = set(terms(query))
+    chunk_terms = [terms(chunk) for chunk in chunks]
+    if not chunks:
+        return []
+    average_length = sum(len(t) for t in chunk_terms) / len(chunks) or 1
+    document_frequency = {term: sum(1 for t in chunk_terms if term in t) for term in query_terms}
+
+    scored = []
+    for index, chunk in enumerate(chunk_terms):
+        score = 0.0
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(chunk) / average_length)
+        for term in query_terms:
+            frequency = chunk.count(term)
+            if frequency:
+                df = document_frequency[term]
+                idf = math.log(1 + (len(chunks) - df + 0.5) / (df + 0.5))
+                score += idf * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+        scored.append((score, index))
+    scored.sort(key=lambda pair: (-pair[0], pair[1]))
+    return scored
+
+
+def news_context(query, articles, budget=LLM_CONTEXT_TOKENS, top_k=LLM_NEWS_TOP_K):
+    """
+    The news chunks most relevant to a query, fitted to a token budget.
+
+    Parameters:
+    - query (str): The user's question.
+    - articles (list): Dicts with 'content' and optionally 'published_at', newest first.
+    - budget (int): Token budget for the whole context.
+    - top_k (int): Maximum number of chunks.
+
+    Returns:
+    - dict: {'text': numbered chunks, 'chunks': number included, 'tokens': estimated tokens}.
+    """
+    chunks, dates = [], []
+    for article in articles:
+        published_at = article.get("published_at")
+        for chunk in chunk_text(article.get("content") or ""):
+            chunks.append(chunk)
+            dates.append(published_at)
+    return select_chunks(rank_chunks(query, chunks), chunks, dates, budget, top_k)
+
+
+def select_chunks(ranked, chunks, dates, budget=LLM_CONTEXT_TOKENS, top_k=LLM_NEWS_TOP_K):
+    """Number and join the best-ranked chunks until top_k or the budget is reached."""
+    lines, used = [], 0
+    for _, index in ranked:
+        if len(lines) == top_k:
+            break
+        published_at = dates[index]
+        line = f"[{len(lines) + 1}] {f'{published_at:%Y-%m-%d}: ' if published_at else ''}{chunks[index]}"
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            continue
+        lines.append(line)
+        used += cost
+    text = "\n".join(lines)
+    return {"text": text, "chunks": len(lines), "tokens": count_tokens(text)}
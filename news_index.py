@@ -0,0 +1,325 @@
+import asyncio
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+
+from llm_context import BM25_B, BM25_K1, LLM_NEWS_TOP_K, chunk_text, terms
+
+# Optional embedding index: chunks are embedded at ingest and queries at search time
+NEWS_EMBEDDINGS = os.getenv("NEWS_EMBEDDINGS", "0") == "1"
+NEWS_EMBEDDING_MODEL = os.getenv("NEWS_EMBEDDING_MODEL", "models/text-embedding-004")
+# Embedding matrix files, written by the news fetcher and memory-mapped by the API
+NEWS_INDEX_DIR = os.getenv("NEWS_INDEX_DIR", "news_index")
+# How often a ticker's index picks up newly stored articles
+NEWS_INDEX_REFRESH = float(os.getenv("NEWS_INDEX_REFRESH", "30"))  # seconds
+
+# Texts per embedding request (the API's batch limit)
+EMBED_BATCH = 100
+# Re-read articles updated this long before the newest one already indexed, in case writes
+# from the fetcher land out of order
+REFRESH_OVERLAP = timedelta(minutes=1)
+# Reciprocal rank fusion constant for combining BM25 and embedding rankings
+RRF_K = 60
+
+
+def embed_texts(texts, task_type="retrieval_document"):
+    """
+    Embed texts with the Gemini embedding model.
+
+    Returns:
+    - np.ndarray: float32 matrix, one L2-normalised row per text.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GEMINI_KEY"))
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH):
+        result = genai.embed_content(model=NEWS_EMBEDDING_MODEL, content=texts[start:start + EMBED_BATCH],
+                                     task_type=task_type)
+        vectors.extend(result["embedding"])
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingStore:
+    """
+    Append-only matrix of chunk embeddings on disk, memory-mapped for search.
+
+    embeddings.f32 holds the float32 rows, embeddings.ids the (url_hash, chunk number) of
+    each row and embeddings.json the dimension. The news fetcher is the only writer; API
+    workers re-map the file when it has grown.
+
+    Parameters:
+    - directory (str): Where the files live (created if missing).
+    """
+
+    def __init__(self, directory=NEWS_INDEX_DIR):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "embeddings.f32")
+        self.ids_path = os.path.join(directory, "embeddings.ids")
+        self.meta_path = os.path.join(directory, "embeddings.json")
+        self.ids = []
+        self._ids_offset = 0
+        self._matrix = None
+        # matrix() runs in worker threads for concurrent requests; ids, the offset and the
+        # map must advance together or ids stop lining up with matrix rows
+        self._lock = threading.Lock()
+
+    def _dimension(self):
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path) as f:
+            return json.load(f)["dim"]
+
+    def append(self, keys, vectors):
+        """
+        Add embedding rows.
+
+        Parameters:
+        - keys (list): (url_hash, chunk number) per row.
+        - vectors (np.ndarray): Normalised embeddings, one row per key.
+        """
+        if not keys:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        dim = self._dimension()
+        if dim is None:
+            with open(self.meta_path, "w") as f:
+                json.dump({"dim": int(vectors.shape[1]), "model": NEWS_EMBEDDING_MODEL}, f)
+        elif dim != vectors.shape[1]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} doesn't match the index ({dim})")
+        # Vectors before ids: a reader only uses rows present in both
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.ids_path, "a") as f:
+            f.writelines(f"{url_hash} {n}\n" for url_hash, n in keys)
+
+    def matrix(self):
+        """The stored rows as a read-only memory map (re-mapped if the file has grown)."""
+        dim = self._dimension()
+        if dim is None or not os.path.exists(self.ids_path):
+            return None
+        with self._lock:
+            with open(self.ids_path) as f:
+                f.seek(self._ids_offset)
+                data = f.read()
+            # Only complete lines; a partial one is picked up on the next call
+            complete = data[:data.rfind("\n") + 1]
+            self._ids_offset += len(complete.encode())
+            for line in complete.splitlines():
+                url_hash, n = line.split()
+                self.ids.append((url_hash, int(n)))
+            rows = min(len(self.ids), os.path.getsize(self.vectors_path) // (4 * dim))
+            if rows and (self._matrix is None or self._matrix.shape[0] != rows):
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+            return self._matrix
+
+    def search(self, vector, index, k):
+        """
+        Cosine top-k among the rows of one ticker's index.
+
+        Returns:
+        - list: (similarity, index position) pairs, best first.
+        """
+        matrix = self.matrix()
+        if matrix is None:
+            return []
+        rows, positions = index.embedding_rows(self.ids, matrix.shape[0])
+        if not len(rows):
+            return []
+        similarities = matrix[rows] @ np.asarray(vector, dtype=np.float32)
+        top = np.argpartition(-similarities, min(k, len(rows)) - 1)[:k]
+        return sorted(((float(similarities[i]), int(positions[i])) for i in top), reverse=True)
+
+
+def index_embeddings(documents, store, embed=embed_texts):
+    """
+    Embed the chunks of newly inserted article documents (see news_store.write_articles)
+    and append them to the store.
+    """
+    keys, texts = [], []
+    for document in documents:
+        for n, chunk in enumerate(document.get("chunks", [])):
+            keys.append((document["url_hash"], n))
+            texts.append(chunk)
+    if texts:
+        store.append(keys, embed(texts))
+
+
+class TickerIndex:
+    """
+    In-memory BM25 index over one ticker's article chunks, grown article by article.
+
+    Positions (in `chunks` / `dates`) identify chunks; postings map each term to the
+    positions it occurs at with its frequency there.
+    """
+
+    def __init__(self):
+        self.keys = []  # (url_hash, chunk number)
+        self.chunks = []
+        self.dates = []
+        self.lengths = []
+        self.postings = {}
+        self.total_length = 0
+        self.url_hashes = set()
+        self.high_water = None
+        self.loaded = False
+        self.refreshed_at = 0.0
+        self._embedding_rows = (None, None, None)
+
+    def add_article(self, url_hash, chunks, published_at=None):
+        """Index an article's chunks (once per article)."""
+        if url_hash in self.url_hashes:
+            return False
+        self.url_hashes.add(url_hash)
+        for n, chunk in enumerate(chunks):
+            position = len(self.chunks)
+            counts = Counter(terms(chunk))
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, []).append((position, frequency))
+            length = sum(counts.values())
+            self.keys.append((url_hash, n))
+            self.chunks.append(chunk)
+            self.dates.append(published_at)
+            self.lengths.append(length)
+            self.total_length += length
+        return True
+
+    def search(self, query, k):
+        """
+        BM25 top-k chunks for a query; the newest chunks if no query term occurs.
+
+        Returns:
+        - list: (score, position) pairs, best first.
+        """
+        if not self.chunks:
+            return []
+        count = len(self.chunks)
+        average_length = self.total_length / count or 1
+        scores = {}
+        for term in set(terms(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / average_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+        if not scores:
+            newest = sorted(range(count), key=lambda p: (self.dates[p] is not None, self.dates[p] or 0, -p),
+                            reverse=True)
+            return [(0.0, position) for position in newest[:k]]
+        return heapq.nlargest(k, ((score, position) for position, score in scores.items()),
+                              key=lambda pair: (pair[0], -pair[1]))
+
+    def embedding_rows(self, ids, rows):
+        """Embedding store rows of this index's chunks, with their positions (cached)."""
+        cached_for, store_rows, positions = self._embedding_rows
+        if cached_for != (rows, len(self.keys)):
+            lookup = {key: position for position, key in enumerate(self.keys)}
+            pairs = [(row, lookup[key]) for row, key in enumerate(ids[:rows]) if key in lookup]
+            store_rows = np.array([row for row, _ in pairs], dtype=np.int64)
+            positions = np.array([position for _, position in pairs], dtype=np.int64)
+            self._embedding_rows = ((rows, len(self.keys)), store_rows, positions)
+        return store_rows, positions
+
+
+def fuse_rankings(*rankings, k=RRF_K):
+    """Reciprocal rank fusion of (score, position) rankings."""
+    fused = {}
+    for ranking in rankings:
+        for rank, (_, position) in enumerate(ranking):
+            fused[position] = fused.get(position, 0.0) + 1 / (k + rank + 1)
+    return sorted(((score, position) for position, score in fused.items()), key=lambda pair: (-pair[0], pair[1]))
+
+
+class NewsRetriever:
+    """
+    Per-ticker retrieval over the stored news, for the ai-news query endpoint.
+
+    Each ticker's TickerIndex is built from Mongo on first use and then only reads articles
+    updated since (at most every NEWS_INDEX_REFRESH seconds). With an EmbeddingStore, BM25
+    and cosine rankings are fused.
+
+    Parameters:
+    - collection: The news collection (Motor).
+    - embeddings (EmbeddingStore, optional): Enables the embedding ranking.
+    - embed (callable): Embeds texts; used for queries.
+    - refresh_interval (float): Seconds between refreshes of a ticker's index.
+    """
+
+    def __init__(self, collection, embeddings=None, embed=embed_texts, refresh_interval=NEWS_INDEX_REFRESH):
+        self.collection = collection
+        self.embeddings = embeddings
+        self.embed = embed
+        self.refresh_interval = refresh_interval
+        self.indexes = {}
+        self._locks = {}
+
+    async def index_for(self, ticker):
+        """The ticker's index, refreshed from Mongo if it is due."""
+        index = self.indexes.setdefault(ticker, TickerIndex())
+        if time.monotonic() - index.refreshed_at < self.refresh_interval:
+            return index
+        async with self._locks.setdefault(ticker, asyncio.Lock()):
+            # Another request may have refreshed it while this one waited
+            if time.monotonic() - index.refreshed_at >= self.refresh_interval:
+                await self._refresh(index, ticker)
+        return index
+
+    async def _refresh(self, index, ticker):
+        query = {"ticker": ticker}
+        if index.high_water is not None:
+            query["updated_at"] = {"$gt": index.high_water - REFRESH_OVERLAP}
+        elif index.loaded:
+            # Everything stored so far predates updated_at and is already indexed
+            query["updated_at"] = {"$exists": True}
+        projection = {"_id": 0, "url_hash": 1, "url": 1, "chunks": 1, "content": 1, "published_at": 1,
+                      "updated_at": 1}
+        added = 0
+        async for document in self.collection.find(query, projection):
+            key = document.get("url_hash") or document.get("url")
+            # Articles stored before ingest-time chunking are chunked here
+            chunks = document.get("chunks") or chunk_text(document.get("content") or "")
+            added += index.add_article(key, chunks, document.get("published_at"))
+            updated_at = document.get("updated_at")
+            if updated_at is not None and (index.high_water is None or updated_at > index.high_water):
+                index.high_water = updated_at
+        index.loaded = True
+        index.refreshed_at = time.monotonic()
+        if added:
+            print(f"Indexed {added} news articles for {ticker} ({len(index.chunks)} chunks)")
+
+    async def version(self, ticker):
+        """Data version of the ticker's news (for cache keys): articles indexed and the newest update."""
+        index = await self.index_for(ticker)
+        high_water = index.high_water.isoformat() if index.high_water is not None else "0"
+        return f"{len(index.url_hashes)}:{high_water}"
+
+    async def search(self, ticker, query, k=LLM_NEWS_TOP_K * 4):
+        """
+        Rank the ticker's chunks for a query.
+
+        Returns:
+        - tuple: (ranked (score, position) pairs, chunks, dates), ready for
+          llm_context.select_chunks.
+        """
+        index = await self.index_for(ticker)
+        ranked = index.search(query, k)
+        if self.embeddings is not None and index.chunks:
+            try:
+                vector = (await asyncio.to_thread(self.embed, [query], "retrieval_query"))[0]
+                dense = await asyncio.to_thread(self.embeddings.search, vector, index, k)
+                ranked = fuse_rankings(ranked, dense)[:k]
+            except Exception as e:
+                # Lexical results are still good enough to answer with
+                print(f"Embedding search failed, using BM25 only: {e}")
+        return ranked, index.chunks, index.dates
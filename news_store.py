@@ -0,0 +1,191 @@
+import hashlib
+import os
+import re
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# How long a crawled URL is remembered (and skipped) even if it wasn't stored
+NEWS_SEEN_TTL_DAYS = int(os.getenv("NEWS_SEEN_TTL_DAYS", "30"))
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ["guccounter", "guce_referrer", "guce_referrer_sig", ".tsrc", "ncid", "soc_src",
+                   "soc_trk", "fr", "sr", "yptr", "_guc_consent_skip"]
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_url(url):
+    """
+    Canonical form of an article URL: lowercase scheme and host, sorted query without
+    tracking parameters, no fragment, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if key not in TRACKING_PARAMS and not key.startswith("utm_")]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/") or "/",
+                       urlencode(sorted(query)), ""))
+
+
+def url_hash(url):
+    """Stable key of an article: sha1 of the normalised URL."""
+    return hashlib.sha1(normalize_url(url).encode()).hexdigest()
+
+
+def content_hash(content):
+    """sha1 of the whitespace- and case-normalised text, equal for syndicated copies."""
+    return hashlib.sha1(WHITESPACE.sub(" ", content).strip().lower().encode()).hexdigest()
+
+
+def ensure_news_indexes(collection, seen):
+    """
+    Create the news indexes (idempotent; called at fetcher startup).
+
+    Parameters:
+    - collection: The news collection.
+    - seen: The collection of crawled URL hashes.
+    """
+    migrate_legacy_articles(collection)
+    collection.create_index([("url_hash", ASCENDING)], name="uq_url_hash", unique=True)
+    # Partial, so documents stored before content hashing don't collide on a missing value
+    collection.create_index([("content_hash", ASCENDING)], name="uq_content_hash", unique=True,
+                            partialFilterExpression={"content_hash": {"$exists": True}})
+    collection.create_index([("ticker", ASCENDING), ("published_at", DESCENDING)], name="idx_ticker_published")
+    collection.create_index([("syndicated_url_hashes", ASCENDING)], name="idx_syndicated_url_hashes")
+    # Incremental refreshes of the API's retrieval index (news_index.NewsRetriever)
+    collection.create_index([("ticker", ASCENDING), ("updated_at", ASCENDING)], name="idx_ticker_updated")
+    seen.create_index([("seen_at", ASCENDING)], name="ttl_seen_at",
+                      expireAfterSeconds=NEWS_SEEN_TTL_DAYS * 86400)
+
+
+def migrate_legacy_articles(collection):
+    """
+    Fold documents written before url_hash existed (one per ticker and run) into one document
+    per URL, with the tickers in an array.
+    """
+    merged = {}
+    for document in collection.find({"url_hash": {"$exists": False}}, {"url": 1, "ticker": 1}):
+        key = url_hash(document["url"])
+        tickers = document["ticker"] if isinstance(document["ticker"], list) else [document["ticker"]]
+        if key not in merged:
+            merged[key] = (document["_id"], set(tickers), [])
+        else:
+            merged[key][1].update(tickers)
+            merged[key][2].append(document["_id"])
+    if not merged:
+        return
+    existing = {d["url_hash"]: d["_id"] for d in collection.find({"url_hash": {"$in": list(merged)}}, {"url_hash": 1})}
+    for key, (keep_id, tickers, duplicate_ids) in merged.items():
+        if key in existing:
+            # Already stored under the new layout: fold the tickers into that document
+            collection.update_one({"_id": existing[key]}, {"$addToSet": {"ticker": {"$each": sorted(tickers)}}})
+            duplicate_ids.append(keep_id)
+        else:
+            collection.update_one({"_id": keep_id}, {"$set": {"url_hash": key, "ticker": sorted(tickers)}})
+        if duplicate_ids:
+            collection.delete_many({"_id": {"$in": duplicate_ids}})
+    print(f"Migrated {len(merged)} news articles to one document per URL")
+
+
+def filter_unseen(news_index, collection, seen):
+    """
+    Drop URLs that were crawled before, so they aren't rendered again.
+
+    Stored articles still pick up tickers they are newly listed under.
+
+    Parameters:
+    - news_index (dict): url_hash -> {'url', 'tickers', 'published_at'}, from collect_news_urls.
+    - collection: The news collection.
+    - seen: The collection of crawled URL hashes.
+
+    Returns:
+    - dict: The entries of news_index that still need crawling.
+    """
+    seen_hashes = {d["_id"] for d in seen.find({"_id": {"$in": list(news_index)}}, {"_id": 1})}
+    if seen_hashes:
+        updates = []
+        now = datetime.now(timezone.utc)
+        for key in seen_hashes:
+            # updated_at moves so retrieval indexes pick the article up for the new tickers
+            add_tickers = {"$addToSet": {"ticker": {"$each": news_index[key]["tickers"]}},
+                           "$set": {"updated_at": now}}
+            updates.append(UpdateOne({"url_hash": key}, add_tickers))
+            updates.append(UpdateOne({"syndicated_url_hashes": key}, add_tickers))
+        collection.bulk_write(updates, ordered=False)
+        print(f"Skipping {len(seen_hashes)} already crawled articles")
+    return {key: info for key, info in news_index.items() if key not in seen_hashes}
+
+
+def mark_seen(keys, seen):
+    """Record crawled URL hashes (stored or not) so later runs skip them."""
+    if keys:
+        now = datetime.now(timezone.utc)
+        seen.bulk_write([UpdateOne({"_id": key}, {"$set": {"seen_at": now}}, upsert=True) for key in keys],
+                        ordered=False)
+
+
+def write_articles(documents, collection):
+    """
+    Upsert a batch of articles with one bulk write.
+
+    Documents are keyed on url_hash, and tickers are merged into the stored ticker array.
+    An article whose text is already stored under another URL (syndicated copy) only adds
+    its tickers and URL hash to that document.
+
+    Parameters:
+    - documents (list): Dicts with url_hash, url, ticker (list), content, content_hash,
+      published_at and chunks.
+    - collection: The news collection.
+
+    Returns:
+    - list: url_hash of every newly inserted article (not of articles already stored, nor
+      of syndicated copies merged into another document).
+    """
+    if not documents:
+        return []
+    # Syndicated copies within the batch: the first URL wins
+    by_content = {}
+    for document in documents:
+        first = by_content.setdefault(document["content_hash"], document)
+        if first is not document:
+            first.setdefault("_aliases", []).append(document)
+
+    stored = {d["content_hash"]: d["url_hash"] for d in collection.find(
+        {"content_hash": {"$in": list(by_content)}}, {"content_hash": 1, "url_hash": 1})}
+
+    operations = []
+    now = datetime.now(timezone.utc)
+    for hash_, document in by_content.items():
+        aliases = document.pop("_aliases", [])
+        tickers = sorted({t for d in [document, *aliases] for t in d["ticker"]})
+        alias_hashes = [d["url_hash"] for d in aliases if d["url_hash"] != document["url_hash"]]
+        if hash_ in stored and stored[hash_] != document["url_hash"]:
+            alias_hashes.append(document["url_hash"])
+            operations.append(UpdateOne({"content_hash": hash_}, {
+                "$addToSet": {"ticker": {"$each": tickers}, "syndicated_url_hashes": {"$each": alias_hashes}},
+                "$set": {"updated_at": now}}))
+            continue
+        update = {
+            "$setOnInsert": {k: v for k, v in document.items() if k != "ticker"} | {"fetched_at": now},
+            "$addToSet": {"ticker": {"$each": tickers}},
+            "$set": {"updated_at": now},
+        }
+        if alias_hashes:
+            update["$addToSet"]["syndicated_url_hashes"] = {"$each": alias_hashes}
+        operations.append(UpdateOne({"url_hash": document["url_hash"]}, update, upsert=True))
+
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        upserted = list(result.upserted_ids.values())
+    except BulkWriteError as e:
+        # Another run stored the same article concurrently; everything else was written
+        errors = [error for error in e.details["writeErrors"] if error["code"] != 11000]
+        if errors:
+            raise
+        upserted = [entry["_id"] for entry in e.details["upserted"]]
+    if not upserted:
+        return []
+    # Resolved by _id (a primary-key read) rather than by operation index
+    return [d["url_hash"] for d in collection.find({"_id": {"$in": upserted}}, {"url_hash": 1})]
@@ -0,0 +1,310 @@
+import contextlib
+import fcntl
+import os
+import shutil
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+# Root of the hive-partitioned dataset: {PARQUET_ROOT}/ticker=AAPL/year=2024/part-....parquet
+PARQUET_ROOT = os.getenv("PARQUET_ROOT", "stock_data_parquet")
+# Memory-mappable Arrow IPC copies of each ticker's history, rebuilt lazily after writes
+ARROW_CACHE_DIR = os.getenv("ARROW_CACHE_DIR", os.path.join(PARQUET_ROOT, "_arrow"))
+# "parquet": scan the dataset with filter/column pushdown; "ipc": memory-map the Arrow IPC copy
+PARQUET_READ_MODE = os.getenv("PARQUET_READ_MODE", "parquet")
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "65536"))
+
+# Column layout matches stock_prices, so readers return the same DataFrame as query_stock_data.
+# Prices are stored as float32 and the ticker as a dictionary-encoded partition key.
+PRICE_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("s")),
+    ("open_price", pa.float32()),
+    ("high_price", pa.float32()),
+    ("low_price", pa.float32()),
+    ("close_price", pa.float32()),
+    ("volume", pa.int64()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("ticker", pa.string()), ("year", pa.int16())]), flavor="hive")
+READ_PARTITIONING = ds.HivePartitioning.discover(infer_dictionary=True)
+WRITE_OPTIONS = ds.ParquetFileFormat().make_write_options(compression="zstd")
+
+# yfinance column -> dataset column
+FRAME_COLUMNS = {
+    "Open": "open_price",
+    "High": "high_price",
+    "Low": "low_price",
+    "Close": "close_price",
+    "Volume": "volume",
+}
+
+
+def frame_to_table(data, ticker_symbol):
+    """
+    Convert a yfinance history DataFrame into an Arrow table with compact column types.
+
+    Timestamps are stored as exchange-local wall-clock time, like in MySQL.
+    """
+    index = data.index
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    columns = {"timestamp": pa.array(index.values.astype("datetime64[s]"))}
+    for source, target in FRAME_COLUMNS.items():
+        field = PRICE_SCHEMA.field(target)
+        if source in data:
+            columns[target] = pa.array(data[source].to_numpy(), type=field.type, from_pandas=True)
+        else:
+            columns[target] = pa.nulls(len(data), type=field.type)
+    columns["ticker"] = pa.array([ticker_symbol] * len(data), type=pa.string())
+    columns["year"] = pa.array(index.year.to_numpy(), type=pa.int16())
+    return pa.table(columns)
+
+
+def _ipc_path(ticker_symbol):
+    return os.path.join(ARROW_CACHE_DIR, f"{ticker_symbol}.arrow")
+
+
+def _basename_template(tag):
+    """
+    write_dataset basename template that sorts by write time: "part-<time_ns, 20 digits>-<tag>-{i}".
+
+    Readers keep the last row per timestamp in dataset (file name) order, so names must sort
+    in the order the files were written, down to the nanosecond.
+    """
+    return f"part-{time.time_ns():020d}-{tag}-{{i}}.parquet"
+
+
+@contextlib.contextmanager
+def _dataset_lock(root, exclusive=False):
+    """
+    Hold the dataset's lock file: shared while appending, exclusive while compacting, so a
+    compaction never deletes files written after it scanned the partition.
+    """
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "_lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def save_frames_to_parquet(frames, root=PARQUET_ROOT):
+    """
+    Append several tickers' stock data to the partitioned Parquet dataset.
+
+    Every call adds new files instead of rewriting existing ones; `compact` merges them later.
+    File names start with a zero-padded nanosecond write time, so the dataset lists them in
+    write order and later files win on read.
+
+    Parameters:
+    - frames (list): (ticker_symbol, DataFrame) pairs.
+    - root (str): Dataset root directory.
+    """
+    tables = [frame_to_table(data, ticker_symbol) for ticker_symbol, data in frames if not data.empty]
+    if not tables:
+        return
+    with _dataset_lock(root):
+        ds.write_dataset(
+            pa.concat_tables(tables),
+            root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=_basename_template(uuid.uuid4().hex[:8]),
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=WRITE_OPTIONS,
+            max_rows_per_group=PARQUET_ROW_GROUP_SIZE,
+            min_rows_per_group=min(PARQUET_ROW_GROUP_SIZE, 1024),
+        )
+    for ticker_symbol, _ in frames:
+        # The IPC copy is stale now; the next read rebuilds it
+        if os.path.exists(_ipc_path(ticker_symbol)):
+            os.remove(_ipc_path(ticker_symbol))
+    print(f"Saved {sum(t.num_rows for t in tables)} records to {root} for ticker: "
+          f"{', '.join(ticker_symbol for ticker_symbol, _ in frames)}")
+
+
+def save_to_parquet(data, ticker_symbol):
+    """Append one ticker's stock data to the partitioned Parquet dataset."""
+    save_frames_to_parquet([(ticker_symbol, data)])
+
+
+def get_ticker_versions(root=PARQUET_ROOT):
+    """
+    Parquet counterpart of db_connector.get_ticker_versions: the newest file time of every
+    ticker's partition, which changes with each save_frames_to_parquet and compaction.
+
+    Returns:
+    - dict: ticker -> datetime.
+    """
+    versions = {}
+    if not os.path.isdir(root):
+        return versions
+    for entry in os.scandir(root):
+        if not entry.is_dir() or not entry.name.startswith("ticker="):
+            continue
+        newest = None
+        for directory, _, files in os.walk(entry.path):
+            for name in files:
+                if name.endswith(".parquet"):
+                    mtime = os.stat(os.path.join(directory, name)).st_mtime_ns
+                    newest = mtime if newest is None else max(newest, mtime)
+        if newest is not None:
+            versions[entry.name.split("=", 1)[1]] = datetime.fromtimestamp(newest / 1e9)
+    return versions
+
+
+def _dataset(root=PARQUET_ROOT):
+    return ds.dataset(root, format="parquet", partitioning=READ_PARTITIONING,
+                      exclude_invalid_files=True, ignore_prefixes=["_", "."])
+
+
+def _window_filter(ticker_symbol, start=None, end=None):
+    """Dataset filter for one ticker and an optional [start, end) window (prunes year partitions)."""
+    expression = ds.field("ticker") == ticker_symbol
+    if start is not None:
+        expression &= (ds.field("year") >= start.year) & (ds.field("timestamp") >= pa.scalar(start, pa.timestamp("s")))
+    if end is not None:
+        expression &= (ds.field("year") <= end.year) & (ds.field("timestamp") < pa.scalar(end, pa.timestamp("s")))
+    return expression
+
+
+def _latest_rows(table):
+    """Keep the last-written row for every timestamp and sort by time."""
+    if table.num_rows == 0:
+        return table
+    table = table.append_column("_order", pa.array(range(table.num_rows)))
+    last = table.group_by("timestamp", use_threads=False).aggregate([("_order", "max")])
+    table = table.take(last["_order_max"])
+    table = table.take(pc.sort_indices(table["timestamp"]))
+    return table.drop_columns(["_order"])
+
+
+def _read_ipc(ticker_symbol, root):
+    """Memory-map the ticker's Arrow IPC copy, building it from Parquet if needed."""
+    path = _ipc_path(ticker_symbol)
+    if not os.path.exists(path):
+        table = _latest_rows(_dataset(root).to_table(
+            columns=PRICE_SCHEMA.names, filter=ds.field("ticker") == ticker_symbol))
+        os.makedirs(ARROW_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def read_stock_table(ticker_symbol, columns=None, start=None, end=None, root=PARQUET_ROOT, mode=None):
+    """
+    Read one ticker's history as an Arrow table, deduplicated and ordered by timestamp.
+
+    Parameters:
+    - ticker_symbol (str): Stock ticker symbol.
+    - columns (list, optional): Columns to read (timestamp is always included).
+    - start (datetime, optional): Inclusive lower bound.
+    - end (datetime, optional): Exclusive upper bound.
+    - root (str): Dataset root directory.
+    - mode (str, optional): "parquet" or "ipc", defaults to PARQUET_READ_MODE.
+
+    Returns:
+    - pyarrow.Table: The matching rows.
+    """
+    columns = ["timestamp"] + [c for c in (columns or PRICE_SCHEMA.names) if c != "timestamp"]
+    if not os.path.isdir(root):
+        return PRICE_SCHEMA.empty_table().select(columns)
+
+    if (mode or PARQUET_READ_MODE) == "ipc":
+        table = _read_ipc(ticker_symbol, root)
+        if start is not None:
+            table = table.filter(pc.field("timestamp") >= pa.scalar(start, pa.timestamp("s")))
+        if end is not None:
+            table = table.filter(pc.field("timestamp") < pa.scalar(end, pa.timestamp("s")))
+        return table.select(columns)
+
+    table = _dataset(root).to_table(columns=columns, filter=_window_filter(ticker_symbol, start, end))
+    return _latest_rows(table)
+
+
+def read_stock_data(ticker_symbol, start=None, end=None, root=PARQUET_ROOT):
+    """
+    Read one ticker's history as a DataFrame shaped like query_stock_data's result.
+    """
+    df = read_stock_table(ticker_symbol, start=start, end=end, root=root).to_pandas()
+    if not df.empty:
+        df.insert(0, "ticker", ticker_symbol)
+    return df
+
+
+# Column and ordering for each single-row lookup in stock_queries.PRICE_ROW_QUERIES
+_PRICE_ROW_READS = {
+    "highest": ("high_price", "max"),
+    "lowest": ("low_price", "min"),
+    "closing": ("close_price", "last"),
+}
+
+
+def read_price_row(kind, ticker_symbol, start=None, end=None, root=PARQUET_ROOT):
+    """
+    Parquet counterpart of stock_queries.query_price_row: reads two columns only.
+
+    Returns:
+    - dict | None: {'timestamp': ..., '<column>': ...} or None if there is no data.
+    """
+    column, pick = _PRICE_ROW_READS[kind]
+    table = read_stock_table(ticker_symbol, [column], start, end, root).drop_null()
+    if table.num_rows == 0:
+        return None
+    if pick == "last":
+        position = table.num_rows - 1
+    else:
+        values = table[column].to_numpy()
+        # Same tie-breaking as the SQL: latest highest, earliest lowest
+        position = len(values) - 1 - values[::-1].argmax() if pick == "max" else values.argmin()
+    row = table.slice(position, 1).to_pylist()[0]
+    return {"timestamp": row["timestamp"], column: row[column]}
+
+
+def compact(ticker_symbol=None, root=PARQUET_ROOT):
+    """
+    Rewrite a ticker's (or every ticker's) appended files into one deduplicated file per year.
+
+    Appends wait while a ticker is compacted. The compacted partition is staged, the old one
+    moved aside and the staged one renamed into place, so readers never find a half-deleted
+    partition; the old files are deleted last.
+    """
+    tickers = [ticker_symbol] if ticker_symbol else [
+        name.split("=", 1)[1] for name in os.listdir(root) if name.startswith("ticker=")
+    ]
+    for ticker in tickers:
+        with _dataset_lock(root, exclusive=True):
+            table = read_stock_table(ticker, root=root, mode="parquet")
+            if table.num_rows == 0:
+                continue
+            years = pa.array(pd.DatetimeIndex(table["timestamp"].to_numpy()).year.to_numpy(), type=pa.int16())
+            table = (table.append_column("ticker", pa.array([ticker] * table.num_rows, type=pa.string()))
+                     .append_column("year", years))
+
+            partition_dir = os.path.join(root, f"ticker={ticker}")
+            # Underscore prefixes keep the staged and replaced copies out of dataset scans
+            staging_root = os.path.join(root, f"_compact-{uuid.uuid4().hex[:8]}")
+            replaced_dir = os.path.join(root, f"_replaced-{uuid.uuid4().hex[:8]}")
+            ds.write_dataset(table, staging_root, format="parquet", partitioning=PARTITIONING,
+                             basename_template=_basename_template("compacted"),
+                             file_options=WRITE_OPTIONS, max_rows_per_group=PARQUET_ROW_GROUP_SIZE)
+            os.replace(partition_dir, replaced_dir)
+            os.replace(os.path.join(staging_root, f"ticker={ticker}"), partition_dir)
+        shutil.rmtree(replaced_dir)
+        shutil.rmtree(staging_root)
+        print(f"Compacted {table.num_rows} rows for ticker: {ticker}")
+
+
+if __name__ == "__main__":
+    # python parquet_store.py compact [TICKER]
+    if sys.argv[1:2] == ["compact"]:
+        compact(*sys.argv[2:3])
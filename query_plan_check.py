@@ -0,0 +1,49 @@
+"""
+EXPLAIN-based regression check for the queries the FastAPI app runs against stock_prices.
+
+Fails (exit code 1) if any query scans the whole table, doesn't use an index, or sorts
+rows it should read in index order. Run it against a migrated database with realistic data
+(on a near-empty table the optimizer may legitimately prefer a scan):
+
+    python query_plan_check.py [TICKER]
+"""
+import sys
+from datetime import date
+
+from db_connector import get_connection_from_pool
+from stock_queries import explain_targets
+
+
+def check_query_plans(ticker="AAPL", start=date(2024, 1, 1), end=date(2024, 12, 31)):
+    """
+    EXPLAIN every FastAPI query and collect plan problems.
+
+    Returns:
+    - list: Human-readable problems; empty if all queries use the index.
+    """
+    problems = []
+    db_connection = get_connection_from_pool()
+    try:
+        cursor = db_connection.cursor(dictionary=True)
+        for name, query, params, allow_filesort in explain_targets(ticker, start, end):
+            cursor.execute("EXPLAIN " + query, params)
+            for step in cursor.fetchall():
+                if step["table"] != "stock_prices":
+                    continue
+                extra = step.get("Extra") or ""
+                print(f"{name:<20} type={str(step['type']):<6} key={step['key']} extra={extra}")
+                if step["type"] == "ALL" or step["key"] is None:
+                    problems.append(f"{name}: full table scan (type={step['type']}, key={step['key']})")
+                elif "Using filesort" in extra and not allow_filesort:
+                    problems.append(f"{name}: sorts rows instead of reading them in index order")
+        cursor.close()
+    finally:
+        db_connection.close()
+    return problems
+
+
+if __name__ == "__main__":
+    problems = check_query_plans(*sys.argv[1:2])
+    for problem in problems:
+        print(f"FAIL {problem}")
+    sys.exit(1 if problems else 0)
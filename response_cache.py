@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# In-process LRU bounds
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))  # entries
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))  # seconds
+# Optional shared backend (any Redis-compatible server), e.g. redis://redis:6379/0
+REDIS_URL = os.getenv("REDIS_URL")
+# How often the per-ticker last-write times are re-read from MySQL
+TICKER_VERSION_TTL = float(os.getenv("TICKER_VERSION_TTL", "5"))  # seconds
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache bounded by entry count and TTL, with hit/miss/eviction counters.
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "size": len(self._entries), "maxsize": self.maxsize,
+                    "ttl": self.ttl, **self.counters}
+
+
+class RedisCache:
+    """
+    Shared cache on a Redis-compatible server.
+
+    Works with any client exposing get(key) and set(key, value, ex=seconds), so
+    redis.Redis, fakeredis or a small dict-backed fake can be passed in.
+    """
+
+    def __init__(self, client, ttl=RESPONSE_CACHE_TTL, prefix="stock-api:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.counters = {"hits": 0, "misses": 0, "errors": 0}
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception as e:
+            print(f"Error reading from shared cache: {e}")
+            self.counters["errors"] += 1
+            return None
+        self.counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)))
+        except Exception as e:
+            print(f"Error writing to shared cache: {e}")
+            self.counters["errors"] += 1
+
+    def stats(self):
+        return {"backend": "redis", "ttl": self.ttl, **self.counters}
+
+
+class TieredCache:
+    """In-process LRU in front of an optional shared cache; shared hits refill the LRU."""
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    async def aget(self, key):
+        """get for async code: the LRU is read in place, the (blocking) shared tier in a worker thread."""
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = await asyncio.to_thread(self.shared.get, key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    async def aset(self, key, value):
+        """set for async code, writing the shared tier from a worker thread."""
+        self.local.set(key, value)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, key, value)
+
+    def stats(self):
+        stats = {"local": self.local.stats()}
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+
+def create_response_cache(redis_client=None):
+    """
+    Build the response cache from the environment: an LRU, plus Redis when REDIS_URL is set.
+    """
+    shared = None
+    if redis_client is None and REDIS_URL:
+        import redis
+        redis_client = redis.Redis.from_url(REDIS_URL)
+    if redis_client is not None:
+        shared = RedisCache(redis_client)
+    return TieredCache(LRUCache(), shared)
+
+
+class TickerVersions:
+    """
+    Per-ticker data versions (last-write times published by save_to_mysql, or the Parquet
+    dataset's file times).
+
+    All versions are loaded with one query and reused for TICKER_VERSION_TTL seconds, so
+    cache lookups don't cost a database round-trip each. While they can't be loaded the
+    version is None rather than a stale or constant one, and callers skip their caches.
+    Tickers are looked up case-insensitively.
+
+    Parameters:
+    - loader (callable): Returns a {ticker: last_write} dict; a coroutine function when the
+      versions are read with `aget` from async code.
+    """
+
+    def __init__(self, loader, ttl=TICKER_VERSION_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self._versions = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _load(self, versions):
+        # Keyed case-insensitively like MySQL's ticker matching; the newest write wins
+        folded = {}
+        for ticker, version in versions.items():
+            key = ticker.upper()
+            if key not in folded or version > folded[key]:
+                folded[key] = version
+        return folded
+
+    def _version(self, ticker):
+        if self._versions is None:
+            return None
+        version = self._versions.get(ticker.upper())
+        return version.isoformat() if version is not None else "0"
+
+    def get(self, ticker):
+        """
+        The ticker's version string ("0" if it has no writes yet).
+
+        Returns:
+        - str | None: None if the versions couldn't be loaded (retried after the TTL).
+        """
+        with self._lock:
+            if self._stale():
+                try:
+                    self._versions = self._load(self.loader())
+                except Exception as e:
+                    # Unknown rather than the previous versions, which may hide new writes
+                    print(f"Error loading ticker versions: {e}")
+                    self._versions = None
+                self._loaded_at = time.monotonic()
+            return self._version(ticker)
+
+    async def aget(self, ticker):
+        """Async counterpart of get."""
+        if self._stale():
+            # Mark as fresh first so concurrent requests don't all reload at once
+            self._loaded_at = time.monotonic()
+            try:
+                self._versions = self._load(await self.loader())
+            except Exception as e:
+                print(f"Error loading ticker versions: {e}")
+                self._versions = None
+        return self._version(ticker)
+
+
+def cache_key(path, query_params, version):
+    """Stable key (and ETag) for a request path, its query parameters and the data version."""
+    raw = "|".join([path, "&".join(f"{k}={v}" for k, v in sorted(query_params)), version])
+    return hashlib.sha1(raw.encode()).hexdigest()
@@ -0,0 +1,235 @@
+import asyncio
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import async_db
+from parquet_store import read_stock_table
+from stock_queries import READ_BACKEND, build_rows_query
+
+# Rows read from the server-side cursor (and encoded) per chunk
+ROW_STREAM_CHUNK_SIZE = int(os.getenv("ROW_STREAM_CHUNK_SIZE", "10000"))
+
+# Wire formats for /stock/{ticker}/all-rows: name -> media type. "json" is the original
+# list-of-objects response; the others are streamed chunk by chunk.
+ROW_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Content-Encodings we can produce, in order of preference
+ROW_ENCODINGS = ["zstd", "gzip"]
+
+# Arrow types for stock_prices columns; DECIMAL prices are sent as float64
+MYSQL_COLUMN_TYPES = {
+    "id": pa.int64(),
+    "ticker": pa.string(),
+    "timestamp": pa.timestamp("s"),
+    "open_price": pa.decimal128(10, 2),
+    "high_price": pa.decimal128(10, 2),
+    "low_price": pa.decimal128(10, 2),
+    "close_price": pa.decimal128(10, 2),
+    "volume": pa.int64(),
+}
+# Schema of the streamed MySQL rows (also used for empty pages, which have no first batch)
+ROWS_SCHEMA = pa.schema([
+    (name, pa.float64() if pa.types.is_decimal(column_type) else column_type)
+    for name, column_type in MYSQL_COLUMN_TYPES.items()
+])
+
+
+def _accepted(header):
+    """Parse an Accept / Accept-Encoding header into values ordered by preference (q=0 dropped)."""
+    values = []
+    for position, part in enumerate(header.split(",")):
+        value, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, number = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if value and quality > 0:
+            values.append((-quality, position, value.strip().lower()))
+    return [value for _, _, value in sorted(values)]
+
+
+def negotiate_format(accept, requested=None):
+    """
+    Pick the response format from an explicit ?format= or the Accept header.
+
+    Returns:
+    - str | None: A ROW_FORMATS key, or None if nothing acceptable is supported.
+    """
+    if requested:
+        return requested if requested in ROW_FORMATS else None
+    media_types = _accepted(accept or "*/*")
+    for media_type in media_types:
+        for name, supported in ROW_FORMATS.items():
+            if media_type == supported:
+                return name
+        if media_type in ("*/*", "application/*"):
+            return "json"
+    return None
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick zstd or gzip from Accept-Encoding (None: send uncompressed)."""
+    accepted = _accepted(accept_encoding or "")
+    for encoding in accepted:
+        if encoding in ROW_ENCODINGS:
+            return encoding
+    return ROW_ENCODINGS[0] if "*" in accepted else None
+
+
+def rows_to_batch(columns, rows):
+    """Convert a chunk of cursor rows into an Arrow record batch (column by column)."""
+    arrays = []
+    for name, values in zip(columns, zip(*rows)):
+        column_type = MYSQL_COLUMN_TYPES.get(name)
+        array = pa.array(values, type=column_type)
+        if pa.types.is_decimal(array.type):
+            array = array.cast(pa.float64())
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, names=list(columns))
+
+
+async def iter_row_batches(ticker, after_timestamp=None, limit=None, chunk_size=ROW_STREAM_CHUNK_SIZE):
+    """
+    Yield a ticker's rows in time order as Arrow record batches of at most chunk_size rows.
+
+    MySQL rows come off a server-side cursor, so memory use doesn't grow with the history.
+    """
+    if READ_BACKEND == "parquet":
+        table = await asyncio.to_thread(read_parquet_rows, ticker, after_timestamp, limit)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield batch
+        return
+
+    query, params = build_rows_query(ticker, after_timestamp, limit)
+    async for columns, rows in async_db.iter_chunks(query, params, chunk_size):
+        yield rows_to_batch(columns, rows)
+
+
+def read_parquet_rows(ticker, after_timestamp=None, limit=None):
+    """Parquet counterpart of build_rows_query: the ticker's rows after a time, up to limit."""
+    table = read_stock_table(ticker, start=after_timestamp)
+    if after_timestamp is not None:
+        table = table.filter(pc.field("timestamp") > pa.scalar(after_timestamp, pa.timestamp("s")))
+    if limit is not None:
+        table = table.slice(0, limit)
+    return table.add_column(0, "ticker", pa.array([ticker] * table.num_rows, type=pa.string()))
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out what has been written since the last drain."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class RowEncoder:
+    """
+    Incremental encoder: feed record batches, get back the bytes to send for each one.
+
+    Parquet output uses Parquet's own zstd compression; the other formats are wrapped in
+    the negotiated Content-Encoding, flushed after every batch so clients see rows early.
+    """
+
+    def __init__(self, row_format, encoding=None):
+        self.row_format = row_format
+        self.encoding = None if row_format == "parquet" else encoding
+        self.sink = _Sink()
+        self.stream = pa.PythonFile(self.sink, mode="w")
+        if self.encoding:
+            self.stream = pa.CompressedOutputStream(self.stream, self.encoding)
+        self.writer = None
+
+    def _open_writer(self, schema):
+        if self.row_format == "arrow":
+            return pa.ipc.new_stream(self.stream, schema)
+        if self.row_format == "parquet":
+            return pq.ParquetWriter(self.stream, schema, compression="zstd")
+        if self.row_format == "csv":
+            return pa_csv.CSVWriter(self.stream, schema)
+        return None
+
+    def write(self, batch):
+        if self.writer is None and self.row_format != "ndjson":
+            self.writer = self._open_writer(batch.schema)
+        if self.row_format == "ndjson":
+            self.stream.write("".join(
+                json.dumps(row, default=_json_default) + "\n" for row in batch.to_pylist()
+            ).encode())
+        elif self.row_format == "parquet":
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write(batch)
+        self.stream.flush()
+        return self.sink.drain()
+
+    def close(self, schema=None):
+        """Finish the stream (footer, end-of-stream marker, compressor trailer)."""
+        if self.writer is None and self.row_format != "ndjson":
+            # No rows: still send a valid, empty file
+            self.writer = self._open_writer(schema or ROWS_SCHEMA)
+        if self.writer is not None:
+            self.writer.close()
+        self.stream.close()
+        return self.sink.drain()
+
+
+async def encode_row_stream(first_batch, batches, row_format, encoding=None):
+    """
+    Encode first_batch and the remaining batches into response body chunks.
+
+    Parameters:
+    - first_batch (pyarrow.RecordBatch | None): Already-read first batch (None if no rows).
+    - batches (async iterator): The remaining batches.
+    - row_format (str): A ROW_FORMATS key other than "json".
+    - encoding (str, optional): "zstd" or "gzip".
+    """
+    encoder = RowEncoder(row_format, encoding)
+    schema = None
+    try:
+        if first_batch is not None:
+            schema = first_batch.schema
+            yield encoder.write(first_batch)
+            async for batch in batches:
+                data = encoder.write(batch)
+                if data:
+                    yield data
+        yield encoder.close(schema)
+    finally:
+        await batches.aclose()
@@ -0,0 +1,205 @@
+import os
+from datetime import date
+
+# Partition stock_prices by month (RANGE on TO_DAYS(timestamp)) when enabled
+MYSQL_PARTITION_BY_MONTH = os.getenv("MYSQL_PARTITION_BY_MONTH", "0") == "1"
+# How many future monthly partitions to keep ahead of the current month
+MYSQL_PARTITION_MONTHS_AHEAD = int(os.getenv("MYSQL_PARTITION_MONTHS_AHEAD", "3"))
+
+# Advisory lock so that services starting at the same time don't migrate concurrently
+MIGRATION_LOCK = "stock_data_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 600  # seconds
+
+# Versioned schema changes, applied in order on top of init.sql.
+# Each entry is (version, description, [statements]). Never edit a migration once it has
+# shipped; add a new one instead.
+MIGRATIONS = [
+    (1, "deduplicate stock_prices and add unique (ticker, timestamp) key", [
+        # Keep the most recently inserted row for every (ticker, timestamp). The GROUP BY is
+        # materialised once, so this stays a single pass even without an index.
+        """
+        DELETE FROM stock_prices
+        WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT MAX(id) AS id FROM stock_prices GROUP BY ticker, timestamp
+            ) AS newest
+        )
+        """,
+        # The unique key serves ticker lookups ordered by time; the price keys let the
+        # highest/lowest lookups read a single index entry.
+        """
+        ALTER TABLE stock_prices
+            ADD UNIQUE KEY uq_ticker_timestamp (ticker, timestamp),
+            ADD KEY idx_ticker_high (ticker, high_price, timestamp),
+            ADD KEY idx_ticker_low (ticker, low_price, timestamp)
+        """,
+    ]),
+    (2, "add ticker_writes (per-ticker last-write time)", [
+        # Bumped by save_to_mysql in the same transaction as the rows; the API uses it to
+        # invalidate cached responses
+        """
+        CREATE TABLE IF NOT EXISTS ticker_writes (
+            ticker VARCHAR(10) PRIMARY KEY,
+            last_write DATETIME(6) NOT NULL
+        )
+        """,
+    ]),
+    (3, "add stock_prices.volume and ticker_stats (precomputed per-ticker statistics)", [
+        "ALTER TABLE stock_prices ADD COLUMN volume BIGINT NULL",
+        # Refreshed by save_to_mysql in the same transaction as the rows; fill it for data
+        # stored before this migration with `python ticker_stats.py`
+        """
+        CREATE TABLE IF NOT EXISTS ticker_stats (
+            ticker VARCHAR(10) PRIMARY KEY,
+            row_count INT NOT NULL,
+            first_timestamp DATETIME NOT NULL,
+            last_timestamp DATETIME NOT NULL,
+            last_close DECIMAL(10, 2),
+            high_price DECIMAL(10, 2),
+            high_at DATETIME,
+            low_price DECIMAL(10, 2),
+            low_at DATETIME,
+            high_52w DECIMAL(10, 2),
+            high_52w_at DATETIME,
+            low_52w DECIMAL(10, 2),
+            low_52w_at DATETIME,
+            high_30d DECIMAL(10, 2),
+            high_30d_at DATETIME,
+            low_30d DECIMAL(10, 2),
+            low_30d_at DATETIME,
+            avg_volume_52w BIGINT,
+            avg_volume_30d BIGINT,
+            updated_at DATETIME(6) NOT NULL
+        )
+        """,
+    ]),
+    (4, "add ticker_writes.write_count and min_written (earliest bar of the last write)", [
+        # Readers that extend cached series from their newest bar rebuild instead when a
+        # write reached further back (a backfill, restated history) or they missed a write
+        """
+        ALTER TABLE ticker_writes
+            ADD COLUMN write_count BIGINT NOT NULL DEFAULT 0,
+            ADD COLUMN min_written DATETIME NULL
+        """,
+    ]),
+]
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_definition(month_start):
+    """PARTITION clause holding all rows of the month starting at month_start."""
+    upper = _add_months(month_start, 1)
+    return f"PARTITION p{month_start:%Y%m} VALUES LESS THAN (TO_DAYS('{upper:%Y-%m-%d}'))"
+
+
+def ensure_month_partitions(cursor, months_ahead=MYSQL_PARTITION_MONTHS_AHEAD):
+    """
+    RANGE-partition stock_prices by month, or add the missing future months if it already is.
+
+    MySQL requires every unique key to contain the partitioning column, so the first run
+    widens the primary key to (id, timestamp) before partitioning.
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stock_prices' AND PARTITION_NAME IS NOT NULL
+    """)
+    existing = {row[0] for row in cursor.fetchall()}
+
+    last_month = _add_months(date.today().replace(day=1), months_ahead)
+
+    if not existing:
+        cursor.execute("SELECT MIN(timestamp) FROM stock_prices")
+        first = cursor.fetchone()[0]
+        month = (first.date() if first else date.today()).replace(day=1)
+        partitions = []
+        while month <= last_month:
+            partitions.append(_partition_definition(month))
+            month = _add_months(month, 1)
+        partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+        print(f"Partitioning stock_prices into {len(partitions)} monthly partitions")
+        cursor.execute("ALTER TABLE stock_prices DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)")
+        cursor.execute(
+            "ALTER TABLE stock_prices PARTITION BY RANGE (TO_DAYS(timestamp)) ("
+            + ", ".join(partitions) + ")"
+        )
+        return
+
+    # Split the catch-all partition so upcoming months get their own partitions
+    newest = max(name for name in existing if name != "pmax")
+    month = _add_months(date(int(newest[1:5]), int(newest[5:7]), 1), 1)
+    partitions = []
+    while month <= last_month:
+        partitions.append(_partition_definition(month))
+        month = _add_months(month, 1)
+    if partitions:
+        print(f"Adding {len(partitions)} monthly partitions to stock_prices")
+        cursor.execute(
+            "ALTER TABLE stock_prices REORGANIZE PARTITION pmax INTO ("
+            + ", ".join(partitions) + ", PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        )
+
+
+def apply_migrations(db_connection):
+    """
+    Apply all pending migrations to the database behind db_connection.
+
+    Applied versions are recorded in the schema_migrations table. Safe to call from every
+    service at startup: an advisory lock serialises concurrent callers.
+
+    Parameters:
+    - db_connection: An open MySQL connection.
+
+    Returns:
+    - list: Versions applied by this call.
+    """
+    cursor = db_connection.cursor()
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+    if cursor.fetchone()[0] != 1:
+        cursor.close()
+        raise Exception("Timed out waiting for the schema migration lock")
+
+    applied_now = []
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        for version, description, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"Applying schema migration {version}: {description}")
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            db_connection.commit()
+            applied_now.append(version)
+
+        if MYSQL_PARTITION_BY_MONTH:
+            ensure_month_partitions(cursor)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+        cursor.fetchall()
+        cursor.close()
+
+    return applied_now
+
+
+if __name__ == "__main__":
+    # Applies whatever is pending (creating the pool may already have, see MYSQL_AUTO_MIGRATE)
+    from db_connector import migrate_schema
+
+    migrate_schema()
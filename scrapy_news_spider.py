@@ -1,13 +1,71 @@
-from xml.sax import parse
-
 import scrapy
 from scrapy_splash import SplashRequest
 from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import IgnoreRequest
+from scrapy.spidermiddlewares.httperror import HttpError
+from urllib.parse import urlsplit
 import os
-import re
+
+from article_extractor import extract_article, is_unwanted
 
 SPLASH_URL = os.getenv('SPLASH_URL','http://localhost:8050')
 
+# Crawl throughput. Pages the direct fetch can't read are rendered by Splash, so keep
+# NEWS_CONCURRENT_REQUESTS at or below the Splash container's --slots (20 by default).
+NEWS_CONCURRENT_REQUESTS = int(os.getenv('NEWS_CONCURRENT_REQUESTS', '16'))
+# AutoThrottle backs off when Splash or the news site slows down, aiming for this many
+# requests in flight
+NEWS_AUTOTHROTTLE_TARGET = float(os.getenv('NEWS_AUTOTHROTTLE_TARGET', '16'))
+NEWS_DOWNLOAD_TIMEOUT = int(os.getenv('NEWS_DOWNLOAD_TIMEOUT', '60'))  # seconds
+
+# Tiered fetch: articles are first requested directly, and only rendered by Splash when the
+# server HTML doesn't hold the story. Set NEWS_PLAIN_HTTP=0 to render every page.
+NEWS_PLAIN_HTTP = os.getenv('NEWS_PLAIN_HTTP', '1') == '1'
+# A directly fetched page counts as complete with at least this much article text
+NEWS_MIN_ARTICLE_CHARS = int(os.getenv('NEWS_MIN_ARTICLE_CHARS', '500'))
+NEWS_MIN_PARAGRAPHS = int(os.getenv('NEWS_MIN_PARAGRAPHS', '3'))
+
+# Settings for the single crawl that covers every ticker's articles
+CRAWL_SETTINGS = {
+    'CONCURRENT_REQUESTS': NEWS_CONCURRENT_REQUESTS,
+    # Most articles live on finance.yahoo.com, so the per-domain cap is the effective one
+    'CONCURRENT_REQUESTS_PER_DOMAIN': NEWS_CONCURRENT_REQUESTS,
+    'DOWNLOAD_DELAY': 0,
+    'AUTOTHROTTLE_ENABLED': True,
+    'AUTOTHROTTLE_START_DELAY': 0.1,
+    'AUTOTHROTTLE_MAX_DELAY': 10,
+    'AUTOTHROTTLE_TARGET_CONCURRENCY': NEWS_AUTOTHROTTLE_TARGET,
+    'DOWNLOAD_TIMEOUT': NEWS_DOWNLOAD_TIMEOUT,
+    'RETRY_TIMES': 2,
+    'NEWS_PLAIN_HTTP': NEWS_PLAIN_HTTP,
+    'NEWS_MIN_ARTICLE_CHARS': NEWS_MIN_ARTICLE_CHARS,
+    'NEWS_MIN_PARAGRAPHS': NEWS_MIN_PARAGRAPHS,
+}
+
+
+class ItemQueuePipeline:
+    """
+    Hand every scraped item to the parent process as soon as TextScraper.parse yields it.
+
+    The queue comes from the spider's `item_queue` argument. A bounded queue makes the
+    crawl wait for the consumer instead of piling items up in memory. At the end the
+    spider's news_tier stats follow as {'stats': {key: count}}, then None.
+    """
+
+    def process_item(self, item, spider):
+        queue = getattr(spider, 'item_queue', None)
+        if queue is not None:
+            queue.put(dict(item))
+        return item
+
+    def close_spider(self, spider):
+        queue = getattr(spider, 'item_queue', None)
+        if queue is not None:
+            # Outcomes that never produce an item (robots.txt, Splash errors) only exist here
+            queue.put({'stats': {key: value for key, value in spider.crawler.stats.get_stats().items()
+                                 if key.startswith('news_tier/')}})
+            queue.put(None)
+
 
 class TextScraper(scrapy.Spider):
     name = 'text_scraper'
@@ -29,19 +87,93 @@ class TextScraper(scrapy.Spider):
 
     def start_requests(self):
         """
-        Use SplashRequest to send requests through Splash for rendering JavaScript-heavy pages.
+        Request every article directly (pooled, keep-alive connections), or through Splash
+        when NEWS_PLAIN_HTTP is off. parse_plain re-queues incomplete pages through Splash.
         """
         try:
+            plain_http = self.settings.getbool('NEWS_PLAIN_HTTP', True)
             for url in self.start_urls:
-                yield SplashRequest(
-                    url,
-                    self.parse,
-                    endpoint='render.html',
-                    args={'wait': 2},  # Adjust wait time for rendering
-                )
+                if plain_http:
+                    yield scrapy.Request(url, self.parse_plain, errback=self.plain_failed)
+                else:
+                    yield self.splash_request(url)
         except:
             pass
 
+    def splash_request(self, url):
+        """
+        Use SplashRequest to send requests through Splash for rendering JavaScript-heavy pages.
+        """
+        return SplashRequest(
+            url,
+            self.parse,
+            errback=self.splash_failed,
+            endpoint='render.html',
+            args={'wait': 2},  # Adjust wait time for rendering
+            dont_filter=True,  # The same URL may already have been fetched directly
+        )
+
+    def parse_plain(self, response):
+        """
+        Keep a directly fetched article if its text meets the quality threshold; otherwise
+        render the page through Splash.
+        """
+        url = self.requested_url(response)
+        try:
+            article = extract_article(response.text)
+        except Exception as e:
+            print(f"exception: { str(e)}")
+            article = {'text': '', 'paragraphs': 0}
+
+        if self.is_complete(article):
+            self.record_tier(url, 'http')
+            yield {'url': url, 'text': article['text'], 'tier': 'http'}
+        else:
+            self.record_tier(url, 'splash_fallback')
+            yield self.splash_request(url)
+
+    def plain_failed(self, failure):
+        """Direct fetch failed (HTTP error, timeout, blocked): try Splash, unless robots.txt said no."""
+        url = failure.request.meta.get('redirect_urls', [failure.request.url])[0]
+        # HttpError subclasses IgnoreRequest, so rule out error responses before treating
+        # an IgnoreRequest as RobotsTxtMiddleware's refusal
+        if (not failure.check(HttpError) and failure.check(IgnoreRequest)
+                and 'robots.txt' in str(failure.value)):
+            self.record_tier(url, 'ignored')
+            return
+        self.record_tier(url, 'splash_fallback')
+        yield self.splash_request(url)
+
+    def splash_failed(self, failure):
+        """Splash couldn't render the page (Splash down, render timeout, error response)."""
+        self.record_tier(failure.request.meta['splash']['args']['url'], 'failed')
+
+    def is_complete(self, article):
+        """Whether extracted text looks like a whole article rather than a JS shell or consent page."""
+        return (len(article['text']) >= self.settings.getint('NEWS_MIN_ARTICLE_CHARS', NEWS_MIN_ARTICLE_CHARS)
+                and article['paragraphs'] >= self.settings.getint('NEWS_MIN_PARAGRAPHS', NEWS_MIN_PARAGRAPHS))
+
+    @staticmethod
+    def requested_url(response):
+        # The URL before redirects, which the caller knows the article by
+        return response.meta.get('redirect_urls', [response.url])[0]
+
+    def record_tier(self, url, outcome):
+        """Count an outcome (http, splash, splash_fallback, empty, ignored, failed) for the URL's domain."""
+        self.crawler.stats.inc_value(f'news_tier/{urlsplit(url).netloc}/{outcome}')
+
+    def closed(self, reason):
+        """Print which tier delivered each domain's articles."""
+        domains = {}
+        for key, value in self.crawler.stats.get_stats().items():
+            if key.startswith('news_tier/'):
+                _, domain, outcome = key.split('/')
+                domains.setdefault(domain, {})[outcome] = value
+        for domain, counts in sorted(domains.items()):
+            print(f"{domain}: {counts.get('http', 0)} plain HTTP, {counts.get('splash', 0)} Splash "
+                  f"({counts.get('splash_fallback', 0)} fallbacks), {counts.get('empty', 0)} without text, "
+                  f"{counts.get('ignored', 0)} ignored, {counts.get('failed', 0)} failed")
+
     def parse(self, response):
         try:
             # Extract the main body of text
@@ -50,93 +182,76 @@ class TextScraper(scrapy.Spider):
             # Clean the text (strip out extra spaces and newlines)
             cleaned_text = " ".join([text.strip() for text in body_text if text.strip()])
 
+            self.record_tier(response.url, 'splash' if cleaned_text else 'empty')
             # Output the cleaned text
-            yield {'url': response.url, 'text': cleaned_text}
+            yield {'url': response.url, 'text': cleaned_text, 'tier': 'splash'}
         except Exception as e:
             print(f"exception: { str(e)}")
             return  None
 
     def extract_text(self, response):
+        """
+        Extract the article text from a webpage, without navigation and other boilerplate
+        """
         try:
-            """
-            Extract all text content from a webpage and filter out unwanted elements
-            """
-            # Extract raw text from the <body> tag while ignoring <script>, <style>, etc.
-            body_text = response.xpath('//body//*[not(self::script or self::style)]//text()').getall()
+            # Main content by paragraph density, found in one walk of the lxml tree
+            article = extract_article(response.text)
+            if article['text']:
+                return [article['text']]
 
-            # Clean the text by removing unwanted content
-            body_text = self.clean_text(body_text)
-
-            return body_text
+            # No paragraph markup: fall back to every body text node, cleaned
+            return self.clean_text(response.xpath('//body//*[not(self::script or self::style)]/text()').getall())
         except Exception as e:
             print(f"Exception as {str(e)}")
-            return ""
+            return []
 
     def clean_text(self, body_text):
-        try:
-            """
-            Clean the raw extracted text by removing unwanted characters or elements
-            """
-            cleaned_text = []
-            for text in body_text:
-                text = text.strip()
-
-                # Skip empty strings or unwanted data
-                if not text or self.is_unwanted(text):
-                    continue
+        """
+        Clean the raw extracted text by removing unwanted characters or elements
+        """
+        cleaned_text = []
+        for text in body_text:
+            text = text.strip()
 
-                cleaned_text.append(text)
+            # Skip empty strings or unwanted data
+            if not text or self.is_unwanted(text):
+                continue
 
-            return cleaned_text
-        except Exception as e:
-            print(f"Exception as {str(e)}")
-            return ""
+            cleaned_text.append(text)
 
+        return cleaned_text
 
-def is_unwanted(self, text):
+    def is_unwanted(self, text):
         """
         Check if the text is unwanted (e.g., JavaScript code or inline scripts)
         """
-        try:
-            # Define unwanted patterns or keywords
-            unwanted_patterns = [
-                r"(?i)(window\.|document\.|function\(|var\s|let\s|const\s)",  # JS code
-                r"\{.*?\}",  # Inline JSON or JS objects
-                r"\(.*?\)",  # Inline JS function calls
-                r";",  # Semicolon-heavy text (likely JS)
-                r"[=:]{2,}",  # JS-like assignment operators
-            ]
-
-            # Remove text matching any unwanted patterns
-            for pattern in unwanted_patterns:
-                if re.search(pattern, text):
-                    return True
-
-            # Optional: Remove short texts or texts with excessive symbols
-            if len(text) < 5 or sum(1 for char in text if char.isalnum()) / len(text) < 0.5:
-                return True
-
-            return False
-        except Exception as e:
-            print(f"Exception as {str(e)}")
-            return False
+        return is_unwanted(text)
 
 
-def fetch_text_using_scrapy(urls):
+def fetch_text_using_scrapy(urls, item_queue, settings=None):
     """
-    Function to run the Scrapy process and return extracted content.
+    Function to run the Scrapy process and stream the extracted content.
+
+    All URLs are crawled in one run, so the reactor and crawler start once however many
+    tickers the URLs came from. Items are put on item_queue while the crawl is running.
+
+    Parameters:
+    - urls (list): Article URLs (already deduplicated).
+    - item_queue (multiprocessing.Queue): Receives {'url': ..., 'text': ..., 'tier': 'http' or
+      'splash'} items, then {'stats': {...}} with the news_tier crawl stats, then None.
+    - settings (dict, optional): Overrides for CRAWL_SETTINGS.
     """
     # Set up the Scrapy crawler process
     process = CrawlerProcess(settings={
-        'FEED_FORMAT': 'json',
-        'FEED_URI': 'output.json',  # Save output to a JSON file
-        'ROBOTSTXT_OBEY': True  # Make sure you respect robots.txt rules
+        'ITEM_PIPELINES': {'scrapy_news_spider.ItemQueuePipeline': 300},
+        'ROBOTSTXT_OBEY': True,  # Make sure you respect robots.txt rules
+        **CRAWL_SETTINGS,
+        **(settings or {}),
     })
 
     try:
         # Start the crawl process
-        process.crawl(TextScraper, start_urls=urls)
+        process.crawl(TextScraper, start_urls=urls, item_queue=item_queue)
         process.start()  # Start the scraping process
     except Exception as e:
         print(f"exception {str(e)}")
-
@@ -1,35 +1,143 @@
 import os
 
-import yfinance as yf
+import pandas as pd
 import schedule
 import time
-from db_connector import save_to_mysql, save_to_csv
-from datetime import datetime
+from db_connector import save_frames_to_mysql, save_to_csv, get_high_water_marks, get_stored_days
+from fetch_pipeline import run_fetch_pipeline
+from instrumentation import profiled, start_metrics_server
+from parquet_store import save_frames_to_parquet
+from datetime import datetime, timedelta
 
-# Multithreading can be used to speed up
+# "incremental": fetch only bars newer than what MySQL already holds; "period": fixed periods
+FETCH_MODE = os.getenv("FETCH_MODE", "incremental")
+# Period requested for tickers that have no stored data yet
+INITIAL_PERIOD = os.getenv("INITIAL_PERIOD", "1mo")
+# How far back MODE=backfill looks for missing trading days
+BACKFILL_LOOKBACK_DAYS = int(os.getenv("BACKFILL_LOOKBACK_DAYS", "365"))
+
+
+def write_batch(batch, output):
+    """Write a batch of (ticker, DataFrame) pairs to the configured output."""
+    if output == "db":
+        save_frames_to_mysql(batch)
+    elif output == "csv":
+        for ticker, data in batch:
+            save_to_csv(data, ticker)
+    elif output == "parquet":
+        save_frames_to_parquet(batch)
+
+
+def only_new_bars(batch, marks):
+    """Drop bars older than each ticker's high-water mark (yfinance rounds start to the day)."""
+    new_batch = []
+    for ticker, data in batch:
+        mark = marks.get(ticker)
+        if mark is not None:
+            index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+            data = data[index >= mark]
+        if not data.empty:
+            new_batch.append((ticker, data))
+    return new_batch
+
+
+# Tickers are downloaded concurrently and written by a separate writer stage (fetch_pipeline)
+@profiled("fetch_stock_data")
 def fetch_stock_data(tickers, period, output):
+    jobs = [(ticker, {"period": period}) for ticker in tickers]
+    return run_fetch_pipeline(jobs, lambda batch: write_batch(batch, output))
+
+
+@profiled("fetch_new_stock_data")
+def fetch_new_stock_data(tickers, output):
+    """
+    Fetch only the bars each ticker is missing since its newest stored row.
+
+    The newest stored day is requested again so that a bar saved while the market was still
+    open is refreshed by the upsert; older bars are dropped before writing.
+    """
+    marks = get_high_water_marks(tickers)
+    jobs = []
     for ticker in tickers:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period=period)
-        data['timestamp'] = data.index
-        if output == "db":
-            save_to_mysql(data, ticker)
-        elif output == "csv":
-            save_to_csv(data, ticker)
+        mark = marks.get(ticker)
+        if mark is None:
+            jobs.append((ticker, {"period": INITIAL_PERIOD}))
+        else:
+            jobs.append((ticker, {"start": mark.date().isoformat()}))
+    print(f"Incremental fetch for {len(jobs)} tickers ({len(marks)} with stored data)")
+    return run_fetch_pipeline(jobs, lambda batch: write_batch(only_new_bars(batch, marks), output))
+
+
+def find_gaps(tickers, lookback_days=BACKFILL_LOOKBACK_DAYS):
+    """
+    Find missing weekdays per ticker between its first stored day in the window and yesterday.
+
+    Exchange holidays have no bars and show up as gaps too; re-requesting them just returns
+    an empty frame.
+
+    Returns:
+    - list: (ticker, first_missing_date, last_missing_date) ranges of consecutive weekdays.
+    """
+    since = datetime.now() - timedelta(days=lookback_days)
+    stored = get_stored_days(tickers, since)
+    yesterday = datetime.now().date() - timedelta(days=1)
+
+    gaps = []
+    for ticker, days in stored.items():
+        start = previous = None
+        for day in pd.bdate_range(min(days), yesterday).date:
+            if day in days:
+                if start is not None:
+                    gaps.append((ticker, start, previous))
+                    start = None
+                continue
+            start = start or day
+            previous = day
+        if start is not None:
+            gaps.append((ticker, start, previous))
+    return gaps
+
+
+@profiled("backfill_gaps")
+def backfill_gaps(tickers, output):
+    """Detect missing trading days and fetch them in parallel."""
+    gaps = find_gaps(tickers)
+    print(f"Found {len(gaps)} gaps across {len({ticker for ticker, _, _ in gaps})} tickers")
+    jobs = [
+        (ticker, {"start": first.isoformat(), "end": (last + timedelta(days=1)).isoformat()})
+        for ticker, first, last in gaps
+    ]
+    return run_fetch_pipeline(jobs, lambda batch: write_batch(batch, output))
+
 
 def main():
-    tickers = os.getenv("TICKERS", "AAPL,").split(",")
+    tickers = [ticker.strip() for ticker in os.getenv("TICKERS", "AAPL,").split(",") if ticker.strip()]
     mode = os.getenv("MODE",'once')
     output = os.getenv("OUTPUT","db")
+    # Prometheus endpoint for the fetch and write metrics, when METRICS_PORT is set
+    start_metrics_server()
+
+    if mode == "backfill":
+        backfill_gaps(tickers, output)
+        return
+
+    # High-water marks live in MySQL, so other outputs always fetch fixed periods
+    incremental = FETCH_MODE == "incremental" and output == "db"
 
     # Fetch stock data
-    fetch_stock_data(tickers,'1mo', output)
+    if incremental:
+        fetch_new_stock_data(tickers, output)
+    else:
+        fetch_stock_data(tickers,'1mo', output)
 
     if mode == "schedule":
         now = datetime.now()
         current_time = now.strftime("%H:%M")
         # Schedule the task every day if mode is "schedule"
-        schedule.every().day.at(current_time).do(lambda: fetch_stock_data(tickers,'1d', output))
+        if incremental:
+            schedule.every().day.at(current_time).do(lambda: fetch_new_stock_data(tickers, output))
+        else:
+            schedule.every().day.at(current_time).do(lambda: fetch_stock_data(tickers,'1d', output))
         while True:
             schedule.run_pending()
             time.sleep(1)
@@ -1,11 +1,16 @@
 import yfinance as yf
 from pymongo import MongoClient
-import json
 import os
+import queue
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import schedule
 from scrapy_news_spider import fetch_text_using_scrapy
+from news_store import content_hash, ensure_news_indexes, filter_unseen, mark_seen, url_hash, write_articles
+from keyword_matcher import AI_MIN_HITS, ai_matcher
+from llm_context import chunk_text
+from instrumentation import SCRAPED_ARTICLES, profiled, start_metrics_server
+from news_index import NEWS_EMBEDDINGS, EmbeddingStore, index_embeddings
 import multiprocessing
 
 
@@ -14,13 +19,25 @@ mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/stock_news_db")
 client = MongoClient(mongo_uri)
 db = client["stock_news_db"]
 collection = db["news"]
+# Hashes of every crawled URL, so later runs don't render them again
+seen_collection = db["news_seen"]
+# Chunk embeddings for the API's semantic search (NEWS_EMBEDDINGS=1)
+embedding_store = EmbeddingStore() if NEWS_EMBEDDINGS else None
 
-# List of AI-related keywords to filter news
-AI_KEYWORDS = ["artificial intelligence", "machine learning", "deep learning", "neural network",
-               "ai technology","generative ai","llm","large language model"]
+# Crawled items buffered between the crawler process and the Mongo writer
+NEWS_ITEM_QUEUE_SIZE = int(os.getenv("NEWS_ITEM_QUEUE_SIZE", "100"))
+# Articles per Mongo write
+NEWS_WRITE_BATCH = int(os.getenv("NEWS_WRITE_BATCH", "50"))
+
+# Spider outcomes that never reach the parent as an item -> SCRAPED_ARTICLES (tier, outcome)
+CRAWL_FAILURES = {
+    "splash_fallback": ("http", "fallback"),
+    "ignored": ("http", "ignored"),
+    "failed": ("splash", "failed"),
+}
 
 # Read tickers and mode from environment variables
-tickers = os.getenv("TICKERS", "AAPL, MSFT").split(",")  # Default tickers if not set in env
+tickers = [t.strip() for t in os.getenv("TICKERS", "AAPL, MSFT").split(",") if t.strip()]  # Default tickers if not set in env
 mode = os.getenv("MODE", "once").lower()  # Default mode is "once" if not set in env
 
 
@@ -31,19 +48,71 @@ def fetch_stock_news(ticker):
     return news_data
 
 
+def news_link(news):
+    """Article URL of a yfinance news item (older flat and newer nested 'content' layouts)."""
+    if news.get('link'):
+        return news['link']
+    content = news.get('content') or {}
+    return ((content.get('canonicalUrl') or {}).get('url')
+            or (content.get('clickThroughUrl') or {}).get('url'))
+
+
+def news_published_at(news):
+    """Publication time of a yfinance news item as a UTC datetime (None if missing)."""
+    if news.get('providerPublishTime'):
+        return datetime.fromtimestamp(news['providerPublishTime'], tz=timezone.utc)
+    published = (news.get('content') or {}).get('pubDate')
+    if published:
+        return datetime.fromisoformat(published.replace('Z', '+00:00'))
+    return None
+
+
+def collect_news_urls(tickers):
+    """
+    Fetch news metadata for every ticker and merge it into one crawl list.
+
+    Yahoo often tags one article with several symbols, so each article (by normalised URL)
+    is listed once, with every requested ticker it belongs to.
+
+    Parameters:
+    - tickers (list): Stock ticker symbols.
+
+    Returns:
+    - dict: url_hash -> {'url': ..., 'tickers': [...], 'published_at': ...}.
+    """
+    news_index = {}
+    for ticker in tickers:
+        print(f"Fetching news for {ticker}")
+        try:
+            news_data = fetch_stock_news(ticker)
+        except Exception as e:
+            print(f"Error fetching news for {ticker}: {e}")
+            continue
+        if not news_data:
+            print(f"No news data found for {ticker}")
+            continue
+        for news in news_data:
+            url = news_link(news)
+            if not url:
+                continue
+            info = news_index.setdefault(url_hash(url), {
+                'url': url, 'tickers': [], 'published_at': news_published_at(news),
+            })
+            if ticker not in info['tickers']:
+                info['tickers'].append(ticker)
+    return news_index
+
+
 # Function to check if the article is related to AI
 def is_ai_related(content):
-    content = content.lower()  # Convert to lowercase for case-insensitive comparison
-    for keyword in AI_KEYWORDS:
-        if keyword in content:
-            return True
-    return False
+    # One pass of the compiled keyword matcher (keywords come from ai_keywords.txt)
+    return ai_matcher.score(content)["hits"] >= AI_MIN_HITS
 
 
 # Function to scrape the full content (text only) of the news article
 def scrape_article_content(url):
     try:
-        content = fetch_text_using_scrapy([url])
+        content = list(crawl_articles([url]))
         # print(f"content-fetched: {content}")
         if content:
             article_content = ""
@@ -58,68 +127,147 @@ def scrape_article_content(url):
         return None
 
 
+def record_crawl_stats(stats):
+    """
+    Export the spider's news_tier/<domain>/<outcome> stats that items don't cover.
+
+    Delivered articles are counted per item in save_news_to_mongo; the rest (direct fetches
+    handed to Splash, robots.txt refusals, failed renders) are added here, summed over domains.
+    """
+    for key, value in stats.items():
+        outcome = key.rsplit("/", 1)[1]
+        if outcome in CRAWL_FAILURES:
+            SCRAPED_ARTICLES.labels(*CRAWL_FAILURES[outcome]).inc(value)
+
+
+def crawl_articles(urls, settings=None):
+    """
+    Scrape all article URLs in a single crawl, yielding items while the crawl is running.
+
+    The crawl runs in a child process because Twisted's reactor can't be restarted in this
+    one (schedule mode crawls again every day). Items arrive through a bounded queue.
+
+    Parameters:
+    - urls (list): Article URLs.
+    - settings (dict, optional): Scrapy setting overrides.
+
+    Yields:
+    - dict: {'url': ..., 'text': ...} items.
+    """
+    if not urls:
+        return
+    item_queue = multiprocessing.Queue(maxsize=NEWS_ITEM_QUEUE_SIZE)
+    p = multiprocessing.Process(target=fetch_text_using_scrapy, args=(urls, item_queue, settings))
+    p.start()
+    try:
+        while True:
+            try:
+                item = item_queue.get(timeout=1)
+            except queue.Empty:
+                if not p.is_alive():
+                    print("Crawler process exited before finishing the crawl")
+                    break
+                continue
+            if item is None:
+                break
+            if "stats" in item:
+                record_crawl_stats(item["stats"])
+                continue
+            yield item
+    finally:
+        p.join(timeout=30)
+        if p.is_alive():
+            # The consumer stopped early and the crawler is blocked on the full queue
+            p.terminate()
+            p.join()
+
+
+def flush_articles(documents, seen_keys):
+    """Upsert a batch of article documents and remember the crawled URLs."""
+    if documents:
+        inserted = set(write_articles(documents, collection))
+        print(f"Saved {len(inserted)} new AI-related articles ({len(documents) - len(inserted)} already stored)")
+        if embedding_store is not None:
+            try:
+                # Only new documents: stored ones already have rows, and syndicated copies
+                # are searched through the document they were merged into
+                index_embeddings([d for d in documents if d["url_hash"] in inserted], embedding_store)
+            except Exception as e:
+                # The articles are stored; BM25 search still covers them
+                print(f"Error embedding news chunks: {e}")
+    mark_seen(seen_keys, seen_collection)
+
+
 # Function to save news metadata and content to MongoDB
-def save_news_to_mongo(news_data, ticker):
-    urls = []
+def save_news_to_mongo(articles, news_index):
+    """
+    Store the AI-related articles, one document per article with all of its tickers.
+
+    Articles are upserted in batches of NEWS_WRITE_BATCH as they arrive, so storage starts
+    while the crawl is still running and only one batch is held in memory.
+
+    Parameters:
+    - articles (iterable): Scraped {'url': ..., 'text': ...} items.
+    - news_index (dict): url_hash -> article metadata, from collect_news_urls.
+    """
+    batch = []
+    seen_keys = []
     try:
-        for news in news_data:
-            urls.append(news['link'])
-        p = multiprocessing.Process(target=fetch_text_using_scrapy, args=(urls,))
-        p.start()
-        p.join()
-        # Read the scraped data from the output.json file
-        if os.path.exists('output.json'):
-            with open('output.json', 'r') as f:
-                content = json.load(f)
-                # After reading the content, delete the output file
-                os.remove('output.json')
-                for article in content:
-                    article_url = article['url']
-                    #print(f"url: {article_url}")
-                    content = article['text']
-                    a = 'Bid Wealth Invest ETF Report Streaming'
-                    b = 'View comments'
-                    cc = content.split(a)[-1]
-                    article_content = cc.split(b)[0]
-                    #print(f"content {article_content}")
-
-                    if article_content:
-                        # Check if the content is AI-related
-                        if is_ai_related(article_content):
-
-                            # Create a document with title, content, date, and ticker
-                            article = {
-                                "ticker": ticker,
-                                "url": article_url,
-                                "content": article_content,  # Store the content of the article
-                            }
-
-                            # Insert the article into MongoDB collection
-                            collection.insert_one(article)
-                            print(f"Saved AI-related article for: {article_url}")
-                        else:
-                            print(f"Article is not AI-related: {article_url}")
-                    else:
-                        print(f"Failed to fetch content for article: {article_url}")
+        for article in articles:
+            article_url = article['url']
+            key = url_hash(article_url)
+            info = news_index.get(key)
+            if info is None:
+                print(f"Scraped an unexpected URL: {article_url}")
+                continue
+            #print(f"url: {article_url}")
+            # The spider already reduced the page to the article body
+            article_content = article['text']
+            SCRAPED_ARTICLES.labels(article.get('tier', 'unknown'), "ok" if article_content else "empty").inc()
+
+            if article_content:
+                seen_keys.append(key)
+                # Check if the content is AI-related
+                relevance = ai_matcher.score(article_content)
+                if relevance["hits"] >= AI_MIN_HITS:
+                    # Create a document with content, date, tickers and dedupe keys
+                    batch.append({
+                        "url_hash": key,
+                        "url": info['url'],
+                        "ticker": info['tickers'],
+                        "content": article_content,  # Store the content of the article
+                        "content_hash": content_hash(article_content),
+                        "published_at": info['published_at'],
+                        "ai_keywords": relevance["keywords"],  # Hit count per keyword
+                        "ai_score": relevance["score"],  # Keyword hits per 1,000 words
+                        "chunks": chunk_text(article_content),  # Retrieval units for ai-news queries
+                    })
+                else:
+                    print(f"Article is not AI-related: {article_url}")
+            else:
+                print(f"Failed to fetch content for article: {article_url}")
+            if len(batch) >= NEWS_WRITE_BATCH or len(seen_keys) >= NEWS_WRITE_BATCH * 4:
+                flush_articles(batch, seen_keys)
+                batch = []
+                seen_keys = []
+        flush_articles(batch, seen_keys)
     except Exception as e:
         print(f"exception {str(e)}")
 
 
 
 # Function to run the script in "once" mode or "schedule" mode
+@profiled("news_run")
 def run():
     try:
-        for ticker in tickers:
-            print(f"Fetching news for {ticker}")
-            news_data = fetch_stock_news(ticker)
-
-            if news_data:
-                save_news_to_mongo(news_data, ticker)
-            else:
-                print(f"No news data found for {ticker}")
-
-            # Wait before fetching news for the next ticker
-            time.sleep(5)
+        # One crawl per run: every ticker's articles, each URL fetched once
+        news_index = filter_unseen(collect_news_urls(tickers), collection, seen_collection)
+        if not news_index:
+            print("No new news articles to fetch")
+            return
+        print(f"Crawling {len(news_index)} articles for tickers: {', '.join(tickers)}")
+        articles = crawl_articles([info['url'] for info in news_index.values()])
+        save_news_to_mongo(articles, news_index)
     except Exception as e:
         print(f"Exception as {str(e)}")
 
@@ -127,6 +275,9 @@ def run():
 # Main function
 def main():
     try:
+        # Prometheus endpoint for the scrape metrics, when METRICS_PORT is set
+        start_metrics_server()
+        ensure_news_indexes(collection, seen_collection)
         run()
         if mode == "schedule":
             print(f"Scheduling stock news fetch for tickers: {tickers}")
@@ -0,0 +1,296 @@
+import asyncio
+import os
+from datetime import datetime, time, timedelta
+
+import async_db
+from db_connector import get_connection_from_pool
+from parquet_store import read_price_row
+
+# Where the FastAPI layer reads prices from: "mysql" or "parquet" (the OUTPUT=parquet dataset)
+READ_BACKEND = os.getenv("READ_BACKEND", "mysql")
+
+
+# Full history for a ticker in time order (served by the (ticker, timestamp) unique key)
+STOCK_DATA_QUERY = """
+SELECT * FROM stock_prices WHERE ticker = %s ORDER BY timestamp
+"""
+
+
+def build_rows_query(ticker, after_timestamp=None, limit=None):
+    """
+    Build the SQL for a ticker's rows in time order, optionally one keyset page at a time.
+
+    Parameters:
+    - ticker (str): Stock ticker symbol.
+    - after_timestamp (datetime, optional): Only rows strictly after this time.
+    - limit (int, optional): Maximum number of rows.
+
+    Returns:
+    - tuple: (sql, params) ready for cursor.execute.
+    """
+    if after_timestamp is None and limit is None:
+        return STOCK_DATA_QUERY, (ticker,)
+    conditions = ["ticker = %s"]
+    params = [ticker]
+    if after_timestamp is not None:
+        # Keyset pagination: seeks into the (ticker, timestamp) key instead of skipping rows
+        conditions.append("timestamp > %s")
+        params.append(after_timestamp)
+    query = f"""
+    SELECT * FROM stock_prices WHERE {" AND ".join(conditions)} ORDER BY timestamp
+    """
+    if limit is not None:
+        query += "LIMIT %s\n"
+        params.append(limit)
+    return query, tuple(params)
+
+
+# Single-row price lookups. Each one is answered by MySQL with an ORDER BY ... LIMIT 1
+# over the ticker's index, so only the requested row leaves the database. The extremes skip
+# NULL prices (bars saved from NaN), which MySQL would otherwise sort first in ASC order.
+PRICE_ROW_QUERIES = {
+    "highest": ("high_price", "high_price IS NOT NULL", "ORDER BY high_price DESC, timestamp DESC"),
+    "lowest": ("low_price", "low_price IS NOT NULL", "ORDER BY low_price ASC, timestamp ASC"),
+    "closing": ("close_price", None, "ORDER BY timestamp DESC"),
+}
+
+# Lookups without a date window are primary-key reads of ticker_stats, which save_to_mysql
+# keeps current (see ticker_stats.py)
+STATS_ROW_QUERIES = {
+    "highest": "SELECT high_at AS timestamp, high_price FROM ticker_stats WHERE ticker = %s",
+    "lowest": "SELECT low_at AS timestamp, low_price FROM ticker_stats WHERE ticker = %s",
+    "closing": "SELECT last_timestamp AS timestamp, last_close AS close_price FROM ticker_stats WHERE ticker = %s",
+}
+TICKER_STATS_QUERY = "SELECT * FROM ticker_stats WHERE ticker = %s"
+ALL_TICKER_STATS_QUERY = "SELECT * FROM ticker_stats ORDER BY ticker"
+
+
+def _ticker_placeholders(tickers):
+    return ", ".join(["%s"] * len(tickers))
+
+
+def build_batch_stats_closing_query(tickers):
+    """Latest close of several tickers from ticker_stats (primary-key lookups)."""
+    return f"""
+    SELECT ticker, last_timestamp AS timestamp, last_close AS close_price FROM ticker_stats
+    WHERE ticker IN ({_ticker_placeholders(tickers)}) ORDER BY ticker
+    """, tuple(tickers)
+
+
+def build_batch_closing_query(tickers, start=None, end=None):
+    """
+    Latest row of several tickers within an optional window, in one query.
+
+    The per-ticker MAX(timestamp) is a loose index scan of the (ticker, timestamp) key, so
+    each ticker costs one index dive rather than a scan of its history.
+    """
+    start, end = _window_bounds(start, end)
+    conditions = [f"ticker IN ({_ticker_placeholders(tickers)})"]
+    params = list(tickers)
+    if start is not None:
+        conditions.append("timestamp >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("timestamp < %s")
+        params.append(end)
+    query = f"""
+    SELECT p.ticker, p.timestamp, p.close_price FROM stock_prices p
+    JOIN (
+        SELECT ticker, MAX(timestamp) AS timestamp FROM stock_prices
+        WHERE {" AND ".join(conditions)} GROUP BY ticker
+    ) latest ON p.ticker = latest.ticker AND p.timestamp = latest.timestamp
+    ORDER BY p.ticker
+    """
+    return query, tuple(params)
+
+
+def build_batch_ohlc_query(tickers, start=None, end=None, limit=None):
+    """Bars of several tickers within an optional window, ordered by ticker then time."""
+    start, end = _window_bounds(start, end)
+    conditions = [f"ticker IN ({_ticker_placeholders(tickers)})"]
+    params = list(tickers)
+    if start is not None:
+        conditions.append("timestamp >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("timestamp < %s")
+        params.append(end)
+    query = f"""
+    SELECT ticker, timestamp, open_price, high_price, low_price, close_price, volume FROM stock_prices
+    WHERE {" AND ".join(conditions)} ORDER BY ticker, timestamp
+    """
+    if limit is not None:
+        query += "LIMIT %s\n"
+        params.append(limit)
+    return query, tuple(params)
+
+
+def build_ohlc_rows_query(ticker, since=None):
+    """Bars of a ticker from `since` on (inclusive), in time order, without the id column."""
+    query = """
+    SELECT timestamp, open_price, high_price, low_price, close_price, volume FROM stock_prices
+    WHERE ticker = %s{} ORDER BY timestamp
+    """
+    if since is None:
+        return query.format(""), (ticker,)
+    return query.format(" AND timestamp >= %s"), (ticker, since)
+
+
+def _window_bounds(start=None, end=None):
+    """
+    Convert optional start/end dates into half-open DATETIME bounds.
+
+    `end` is inclusive when given as a date, so the whole last day is part of the window.
+    """
+    if start is not None and not isinstance(start, datetime):
+        start = datetime.combine(start, time.min)
+    if end is not None and not isinstance(end, datetime):
+        end = datetime.combine(end + timedelta(days=1), time.min)
+    elif end is not None:
+        end = end + timedelta(microseconds=1)
+    return start, end
+
+
+def build_price_row_query(kind, ticker, start=None, end=None):
+    """
+    Build the SQL for a single-row price lookup.
+
+    Parameters:
+    - kind (str): One of 'highest', 'lowest' or 'closing'.
+    - ticker (str): Stock ticker symbol.
+    - start (date|datetime, optional): First day of the window.
+    - end (date|datetime, optional): Last day of the window (inclusive).
+
+    Returns:
+    - tuple: (sql, params) ready for cursor.execute.
+    """
+    if kind not in PRICE_ROW_QUERIES:
+        raise ValueError(f"Unknown price query: {kind}")
+    column, condition, order_by = PRICE_ROW_QUERIES[kind]
+    start, end = _window_bounds(start, end)
+
+    conditions = ["ticker = %s"]
+    params = [ticker]
+    if condition is not None:
+        conditions.append(condition)
+    if start is not None:
+        conditions.append("timestamp >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("timestamp < %s")
+        params.append(end)
+
+    query = f"""
+    SELECT timestamp, {column} FROM stock_prices
+    WHERE {" AND ".join(conditions)}
+    {order_by}
+    LIMIT 1
+    """
+    return query, tuple(params)
+
+
+def fetch_one(query, params):
+    """
+    Run a query on a pooled connection and return the first row as a dict (or None).
+    """
+    db_connection = get_connection_from_pool()
+    try:
+        cursor = db_connection.cursor(dictionary=True)
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+    finally:
+        db_connection.close()
+
+
+def query_price_row(kind, ticker, start=None, end=None):
+    """
+    Return the highest/lowest/latest price row for a ticker, optionally within a date window.
+
+    Parameters:
+    - kind (str): One of 'highest', 'lowest' or 'closing'.
+    - ticker (str): Stock ticker symbol.
+    - start (date, optional): First day of the window.
+    - end (date, optional): Last day of the window (inclusive).
+
+    Returns:
+    - dict | None: {'timestamp': ..., '<column>': ...} or None if there is no data.
+    """
+    if READ_BACKEND == "parquet":
+        return read_price_row(kind, ticker, *_window_bounds(start, end))
+    if start is None and end is None:
+        row = fetch_one(STATS_ROW_QUERIES[kind], (ticker,))
+        # No stats yet (data saved before ticker_stats existed and not rebuilt): scan instead
+        if row is not None:
+            return row
+    query, params = build_price_row_query(kind, ticker, start, end)
+    return fetch_one(query, params)
+
+
+async def query_price_row_async(kind, ticker, start=None, end=None):
+    """
+    Async counterpart of query_price_row for the FastAPI handlers.
+    """
+    if READ_BACKEND == "parquet":
+        return await asyncio.to_thread(read_price_row, kind, ticker, *_window_bounds(start, end))
+    if start is None and end is None:
+        row = await async_db.fetch_one(STATS_ROW_QUERIES[kind], (ticker,))
+        if row is not None:
+            return row
+    query, params = build_price_row_query(kind, ticker, start, end)
+    return await async_db.fetch_one(query, params)
+
+
+async def query_ticker_stats_async(ticker=None):
+    """
+    Precomputed statistics from ticker_stats.
+
+    Parameters:
+    - ticker (str, optional): One ticker; all tickers if omitted.
+
+    Returns:
+    - dict | list | None: The ticker's row (None if unknown), or every row ordered by ticker.
+    """
+    if ticker is None:
+        return await async_db.fetch_all(ALL_TICKER_STATS_QUERY)
+    return await async_db.fetch_one(TICKER_STATS_QUERY, (ticker,))
+
+
+def query_highest_price(ticker, start=None, end=None):
+    """Row with the highest high_price for the ticker."""
+    return query_price_row("highest", ticker, start, end)
+
+
+def query_lowest_price(ticker, start=None, end=None):
+    """Row with the lowest low_price for the ticker."""
+    return query_price_row("lowest", ticker, start, end)
+
+
+def query_closing_price(ticker, start=None, end=None):
+    """Most recent close_price for the ticker."""
+    return query_price_row("closing", ticker, start, end)
+
+
+def explain_targets(ticker, start, end):
+    """
+    Every query the FastAPI app sends to MySQL, with sample parameters, for query_plan_check.
+
+    Returns:
+    - list: (name, sql, params, allow_filesort) tuples. Windowed highest/lowest lookups sort
+      the rows inside the window, so they are the only ones allowed to filesort.
+    """
+    targets = [("stock data", STOCK_DATA_QUERY, (ticker,), False),
+               ("stock data (page)", *build_rows_query(ticker, start, 1000), False),
+               ("ticker stats", TICKER_STATS_QUERY, (ticker,), False),
+               ("all ticker stats", ALL_TICKER_STATS_QUERY, (), False),
+               ("batch closing", *build_batch_closing_query([ticker, "MSFT"]), False),
+               ("batch closing (window)", *build_batch_closing_query([ticker, "MSFT"], start, end), False),
+               ("batch ohlc (window)", *build_batch_ohlc_query([ticker, "MSFT"], start, end, 1000), False),
+               ("ohlc rows (since)", *build_ohlc_rows_query(ticker, _window_bounds(start)[0]), False)]
+    for kind in PRICE_ROW_QUERIES:
+        targets.append((f"{kind} (stats)", STATS_ROW_QUERIES[kind], (ticker,), False))
+        targets.append((kind, *build_price_row_query(kind, ticker), False))
+        targets.append((f"{kind} (window)", *build_price_row_query(kind, ticker, start, end),
+                        kind != "closing"))
+    return targets
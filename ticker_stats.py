@@ -0,0 +1,139 @@
+import sys
+from datetime import timedelta
+
+# Rolling windows, anchored at each ticker's newest bar
+STATS_WINDOWS = {"52w": timedelta(weeks=52), "30d": timedelta(days=30)}
+# Tickers per transaction when rebuilding
+STATS_REBUILD_BATCH = 50
+
+STATS_COLUMNS = [
+    "ticker", "row_count", "first_timestamp", "last_timestamp", "last_close",
+    "high_price", "high_at", "low_price", "low_at",
+    "high_52w", "high_52w_at", "low_52w", "low_52w_at",
+    "high_30d", "high_30d_at", "low_30d", "low_30d_at",
+    "avg_volume_52w", "avg_volume_30d",
+]
+
+UPSERT_TICKER_STATS = f"""
+INSERT INTO ticker_stats ({", ".join(STATS_COLUMNS)}, updated_at)
+VALUES ({", ".join(["%s"] * len(STATS_COLUMNS))}, NOW(6))
+ON DUPLICATE KEY UPDATE
+    {", ".join(f"{column} = VALUES({column})" for column in STATS_COLUMNS[1:])},
+    updated_at = VALUES(updated_at)
+"""
+
+# Each of these reads one ticker's slice of an index: (ticker, timestamp) for the counts,
+# the last close and the window scan, and (ticker, high/low_price, timestamp) for the extremes
+COUNT_QUERY = "SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM stock_prices WHERE ticker = %s"
+LAST_CLOSE_QUERY = "SELECT close_price FROM stock_prices WHERE ticker = %s ORDER BY timestamp DESC LIMIT 1"
+HIGH_QUERY = """
+SELECT high_price, timestamp FROM stock_prices WHERE ticker = %s AND high_price IS NOT NULL
+ORDER BY high_price DESC, timestamp DESC LIMIT 1
+"""
+LOW_QUERY = """
+SELECT low_price, timestamp FROM stock_prices WHERE ticker = %s AND low_price IS NOT NULL
+ORDER BY low_price ASC, timestamp ASC LIMIT 1
+"""
+WINDOW_QUERY = """
+SELECT timestamp, high_price, low_price, volume FROM stock_prices
+WHERE ticker = %s AND timestamp > %s ORDER BY timestamp
+"""
+
+
+def _window_stats(rows, since):
+    """(high, high_at, low, low_at, average volume) of the rows after `since`."""
+    high = low = None
+    volumes = []
+    for timestamp, high_price, low_price, volume in rows:
+        if timestamp <= since:
+            continue
+        # Latest bar wins ties for the high, earliest for the low, as in the endpoint queries
+        if high_price is not None and (high is None or high_price >= high[0]):
+            high = (high_price, timestamp)
+        if low_price is not None and (low is None or low_price < low[0]):
+            low = (low_price, timestamp)
+        if volume is not None:
+            volumes.append(volume)
+    high = high or (None, None)
+    low = low or (None, None)
+    return (*high, *low, round(sum(volumes) / len(volumes)) if volumes else None)
+
+
+def compute_ticker_stats(cursor, ticker):
+    """
+    Compute a ticker's ticker_stats row from stock_prices.
+
+    Parameters:
+    - cursor: An open MySQL cursor (tuple rows).
+    - ticker (str): Stock ticker symbol.
+
+    Returns:
+    - tuple | None: Values in STATS_COLUMNS order, or None if the ticker has no rows.
+    """
+    cursor.execute(COUNT_QUERY, (ticker,))
+    row_count, first_timestamp, last_timestamp = cursor.fetchone()
+    if not row_count:
+        return None
+    cursor.execute(LAST_CLOSE_QUERY, (ticker,))
+    last_close = cursor.fetchone()[0]
+    cursor.execute(HIGH_QUERY, (ticker,))
+    high = cursor.fetchone() or (None, None)
+    cursor.execute(LOW_QUERY, (ticker,))
+    low = cursor.fetchone() or (None, None)
+
+    longest = max(STATS_WINDOWS.values())
+    cursor.execute(WINDOW_QUERY, (ticker, last_timestamp - longest))
+    window_rows = cursor.fetchall()
+    windows = {name: _window_stats(window_rows, last_timestamp - length) for name, length in STATS_WINDOWS.items()}
+
+    return (ticker, row_count, first_timestamp, last_timestamp, last_close, *high, *low,
+            *windows["52w"][:4], *windows["30d"][:4], windows["52w"][4], windows["30d"][4])
+
+
+def refresh_ticker_stats(cursor, tickers):
+    """
+    Recompute ticker_stats for the given tickers on an open cursor (the caller commits).
+
+    save_frames_to_mysql calls this in the transaction that wrote the rows, so the stats
+    change together with the data.
+
+    Returns:
+    - int: Number of tickers with stats.
+    """
+    rows = [row for row in (compute_ticker_stats(cursor, ticker) for ticker in tickers) if row is not None]
+    if rows:
+        cursor.executemany(UPSERT_TICKER_STATS, rows)
+    return len(rows)
+
+
+def rebuild_ticker_stats(tickers=None):
+    """
+    Rebuild ticker_stats from the stored rows, e.g. for data saved before the table existed.
+
+    Parameters:
+    - tickers (list, optional): Only these tickers; by default every ticker in stock_prices,
+      and stats of tickers without rows are removed.
+    """
+    from db_connector import get_connection_from_pool
+
+    db_connection = get_connection_from_pool()
+    try:
+        cursor = db_connection.cursor()
+        if not tickers:
+            cursor.execute("SELECT DISTINCT ticker FROM stock_prices")
+            tickers = [row[0] for row in cursor.fetchall()]
+            cursor.execute("DELETE FROM ticker_stats WHERE ticker NOT IN (SELECT DISTINCT ticker FROM stock_prices)")
+        rebuilt = 0
+        for start in range(0, len(tickers), STATS_REBUILD_BATCH):
+            rebuilt += refresh_ticker_stats(cursor, tickers[start:start + STATS_REBUILD_BATCH])
+            db_connection.commit()
+        cursor.close()
+        print(f"Rebuilt ticker_stats for {rebuilt} tickers")
+        return rebuilt
+    finally:
+        db_connection.close()
+
+
+if __name__ == "__main__":
+    # python ticker_stats.py [TICKER ...]
+    rebuild_ticker_stats(sys.argv[1:])